@@ -4,36 +4,75 @@ import numpy as np
 from datetime import datetime
 from sklearn.linear_model import LinearRegression
 
+# Every function below accepts any of:
+#   - a DataFrame (db.get_expenses)
+#   - an ExpenseColumns (db.get_expenses_columnar)
+#   - an iterable of either, e.g. db.iter_expenses(user_id, start=...)
+# Iterables are consumed chunk by chunk, so only per-chunk aggregates are kept.
+
+def _frames(data):
+    if data is None:
+        return
+    if isinstance(data, pd.DataFrame):
+        yield data
+    elif hasattr(data, "to_frame"):
+        yield data.to_frame()
+    else:
+        for part in data:
+            yield from _frames(part)
+
 def to_datetime(df, date_col="date"):
     df = df.copy()
     df[date_col] = pd.to_datetime(df[date_col])
     return df
 
 def monthly_category_totals(df):
-    df = to_datetime(df)
-    df['year_month'] = df['date'].dt.to_period('M').astype(str)
-    return df.groupby(['category','year_month'])['amount'].sum().reset_index()
+    partials = []
+    for frame in _frames(df):
+        if frame.empty:
+            continue
+        frame = to_datetime(frame)
+        frame['year_month'] = frame['date'].dt.to_period('M').astype(str)
+        partials.append(frame.groupby(['category', 'year_month'], observed=True)['amount'].sum())
+    if not partials:
+        return pd.DataFrame(columns=['category', 'year_month', 'amount'])
+    totals = pd.concat(partials).groupby(level=['category', 'year_month'], observed=True).sum()
+    return totals.reset_index()
 
 def detect_high_single_expenses(df, threshold=60):
     # returns rows with amount > threshold
-    if df is None or df.empty:
-        return df
-    return df[df['amount'] > threshold].sort_values('date', ascending=False)
+    if isinstance(df, pd.DataFrame) or df is None:
+        if df is None or df.empty:
+            return df
+        return df[df['amount'] > threshold].sort_values('date', ascending=False)
+    hits = [frame[frame['amount'] > threshold] for frame in _frames(df)]
+    if not hits:
+        return pd.DataFrame()
+    return pd.concat(hits, ignore_index=True).sort_values('date', ascending=False)
 
 def biweekly_summary(df, ref_date=None):
-    if df is None or df.empty:
-        return pd.DataFrame(), 0.0, 0.0
     if ref_date is None:
         ref_date = datetime.today()
-    df = to_datetime(df)
     end = pd.Timestamp(ref_date).normalize()
     start = end - pd.Timedelta(days=13)  # include today: last 14 days
-    last_period = df[(df['date'] >= start) & (df['date'] <= end)]
     prev_start = start - pd.Timedelta(days=14)
     prev_end = start - pd.Timedelta(days=1)
+
+    # Keep only the 28-day window from each chunk
+    windows = []
+    for frame in _frames(df):
+        if frame.empty:
+            continue
+        frame = to_datetime(frame)
+        windows.append(frame[(frame['date'] >= prev_start) & (frame['date'] <= end)])
+    if not windows:
+        return pd.DataFrame(), 0.0, 0.0
+    df = pd.concat(windows, ignore_index=True)
+
+    last_period = df[(df['date'] >= start) & (df['date'] <= end)]
     prev_period = df[(df['date'] >= prev_start) & (df['date'] <= prev_end)]
-    last_sum = last_period.groupby('category')['amount'].sum()
-    prev_sum = prev_period.groupby('category')['amount'].sum()
+    last_sum = last_period.groupby('category', observed=True)['amount'].sum()
+    prev_sum = prev_period.groupby('category', observed=True)['amount'].sum()
     pct = ((last_sum - prev_sum) / (prev_sum.replace(0, np.nan))) * 100
     pct = pct.fillna(0)
     summary = pd.DataFrame({
@@ -47,8 +86,6 @@ def biweekly_summary(df, ref_date=None):
     return summary, total_last, total_prev
 
 def simple_category_prediction(df, target_category):
-    if df is None or df.empty:
-        return None
     mdf = monthly_category_totals(df)
     cat = mdf[mdf['category'] == target_category].copy()
     if cat.empty or len(cat) < 2:
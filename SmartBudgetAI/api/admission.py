@@ -0,0 +1,186 @@
+# SmartBudgetAI/api/admission.py
+"""
+Admission control for chat turns.
+
+A turn can hold a thread for two LLM round trips, so the API runs turns
+on its own bounded executor rather than FastAPI's shared threadpool, and
+decides up front whether a request gets to wait for it:
+
+    503  the process already has max_active turns running and max_queued
+         waiting: more queueing would only add latency
+    429  this user already has max_per_user messages in flight
+
+Both carry Retry-After, estimated from recent turn times. A user's
+messages run one at a time in arrival order, so a quick double-send
+can't race the confirmation state machine.
+"""
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Turns running at once (threads in the turn executor)
+MAX_ACTIVE = int(os.getenv("CHAT_MAX_ACTIVE", "8"))
+# Turns admitted but waiting for a thread; past this, 503
+MAX_QUEUED = int(os.getenv("CHAT_MAX_QUEUED", "16"))
+# One user's messages in flight (running or waiting); past this, 429
+MAX_PER_USER = int(os.getenv("CHAT_MAX_PER_USER", "4"))
+# Retry-After stays within these bounds (seconds)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+# Weight of the newest turn in the running average of turn time
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Request refused at the door; `status` is 429 or 503."""
+
+    def __init__(self, status, retry_after, detail):
+        super().__init__(detail)
+        self.status = status
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class _User:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class Ticket:
+    """
+    A place in line, from AdmissionControl.reserve(). `async with` waits
+    for the user's earlier messages and a free slot, and gives both back
+    on exit.
+    """
+
+    def __init__(self, control, user_id, user):
+        self.control = control
+        self.user_id = user_id
+        self.user = user
+        self._started = None
+        self._done = False
+
+    async def __aenter__(self):
+        try:
+            await self.user.lock.acquire()
+            try:
+                await self.control._slots.acquire()
+            except BaseException:
+                self.user.lock.release()
+                raise
+        except BaseException:
+            self.release()
+            raise
+        self.control._active += 1
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.control._active -= 1
+        self.control._slots.release()
+        self.user.lock.release()
+        self.control._observe(time.monotonic() - self._started)
+        self.release()
+
+    def release(self):
+        """Gives up the place in line; for a ticket that will never be entered."""
+        if not self._done:
+            self._done = True
+            self.control._leave(self.user_id, self.user)
+
+
+class AdmissionControl:
+    """
+    Per-process gate in front of the turn executor. Must be created on
+    the event loop that uses it (asyncio locks bind to their loop).
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE, max_queued=MAX_QUEUED, max_per_user=MAX_PER_USER):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.executor = ThreadPoolExecutor(max_workers=max_active, thread_name_prefix="chat-turn")
+        self._slots = asyncio.Semaphore(max_active)
+        self._users = {}
+        self._pending = 0   # admitted and not finished, running or waiting
+        self._active = 0
+        self._turn_seconds = 1.0
+        self.rejected = {429: 0, 503: 0}
+
+    @property
+    def capacity(self):
+        """Turns admitted at most: running plus queued."""
+        return self.max_active + self.max_queued
+
+    def reserve(self, user_id):
+        """A Ticket, or Overloaded straight away if the request would only wait."""
+        user = self._users.get(user_id)
+        if user is not None and user.pending >= self.max_per_user:
+            self.rejected[429] += 1
+            raise Overloaded(429, self._retry_after(user.pending),
+                             f"too many messages in flight for user {user_id}")
+        self._check_capacity()
+        return self._admit(user_id)
+
+    def reserve_batch(self, user_ids):
+        """
+        Tickets for one batch request, one per user. Every user counts
+        against the queue like a separate request, and the batch is
+        admitted or refused as a whole (503 unless all of them fit). It is
+        exempt from the per-user cap; its users still wait their turn
+        behind their other messages, and run at most max_active at a time.
+        """
+        self._check_capacity(len(user_ids))
+        return [self._admit(user_id) for user_id in user_ids]
+
+    async def run(self, fn, *args):
+        """fn(*args) on the turn executor; call inside a ticket."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def snapshot(self):
+        return {
+            "active": self._active,
+            "pending": self._pending,
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "turn_ms": round(self._turn_seconds * 1000),
+            "rejected": dict(self.rejected),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------------
+    # Internals
+    # -------------------------------
+    def _check_capacity(self, turns=1):
+        if self._pending + turns > self.capacity:
+            self.rejected[503] += 1
+            waiting = self._pending - self.max_active + turns
+            raise Overloaded(503, self._retry_after(waiting / self.max_active), "server is at capacity")
+
+    def _admit(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _User()
+        user.pending += 1
+        self._pending += 1
+        return Ticket(self, user_id, user)
+
+    def _leave(self, user_id, user):
+        self._pending -= 1
+        user.pending -= 1
+        if user.pending == 0 and self._users.get(user_id) is user:
+            del self._users[user_id]
+
+    def _observe(self, seconds):
+        self._turn_seconds += EWMA_ALPHA * (seconds - self._turn_seconds)
+
+    def _retry_after(self, turns_ahead):
+        seconds = math.ceil(turns_ahead * self._turn_seconds)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, seconds))
@@ -1,13 +1,39 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from SmartBudgetAI.chat_engine import handle_user_message
+import asyncio
+import json
+import anyio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from SmartBudgetAI.api import reads
+from SmartBudgetAI.api.admission import AdmissionControl, Overloaded
+from SmartBudgetAI.chat_engine import handle_user_message, handle_user_message_stream, handle_user_messages
+from SmartBudgetAI.llm_client import get_client
+from SmartBudgetAI.reminder_scheduler import get_scheduler
+
+# -----------------------------
+# Background reminder scheduler, turn executor
+# -----------------------------
+@asynccontextmanager
+async def lifespan(app):
+    get_scheduler().start()
+    # Created here so its asyncio locks belong to the serving loop
+    app.state.admission = AdmissionControl()
+    yield
+    app.state.admission.close()
+    get_scheduler().stop()
+
 
 app = FastAPI(
     title="SmartBudgetAI",
     description="AI-powered personal finance & loan assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Paginated, ETag-cached reads of loans, expenses and reminders
+app.include_router(reads.router)
+
 # -----------------------------
 # Request / Response models
 # -----------------------------
@@ -18,26 +44,141 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
 
+# Messages accepted in one /chat/batch request
+MAX_BATCH_ITEMS = 1000
+
+class BatchRequest(BaseModel):
+    items: list[ChatRequest] = Field(max_length=MAX_BATCH_ITEMS)
+
+class BatchResponse(BaseModel):
+    replies: list[str]  # one per item, same order
+
 
 # -----------------------------
 # Health check
 # -----------------------------
+# async, so it answers on the event loop even with every turn thread busy
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health(request: Request):
+    llm = get_client().health()
+    # The app still works with the LLM down (rules + canned replies), just degraded
+    status = "ok" if llm["breaker"]["state"] == "closed" else "degraded"
+    return {"status": status, "llm": llm, "chat": request.app.state.admission.snapshot()}
 
 @app.get("/")
 def root():
     return {"message": "SmartBudgetAI API is running"}
 
 
+# -----------------------------
+# Overload: refuse early instead of queueing forever
+# -----------------------------
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse(
+        {"detail": exc.detail},
+        status_code=exc.status,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # -----------------------------
 # Chat endpoint
 # -----------------------------
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    reply = handle_user_message(
-        text=req.message,
-        user_id=req.user_id
-    )
+async def chat(req: ChatRequest, request: Request):
+    admission = request.app.state.admission
+    async with admission.reserve(req.user_id):
+        reply = await admission.run(handle_user_message, req.message, req.user_id)
     return {"reply": reply}
+
+
+# -----------------------------
+# Batch chat (bulk ingestion: SMS forwarders, chat backfills)
+# -----------------------------
+@app.post("/chat/batch", response_model=BatchResponse)
+async def chat_batch(req: BatchRequest, request: Request):
+    admission = request.app.state.admission
+    # Each user's messages in order; different users in parallel
+    positions = {}
+    for i, item in enumerate(req.items):
+        positions.setdefault(item.user_id, []).append(i)
+    if len(positions) > admission.capacity:
+        # Would be refused however long the client waited
+        raise HTTPException(413, f"batch spans {len(positions)} users, at most {admission.capacity} allowed")
+    tickets = admission.reserve_batch(list(positions))
+    replies = [None] * len(req.items)
+
+    async def run_user(ticket):
+        async with ticket:
+            indices = positions[ticket.user_id]
+            texts = [req.items[i].message for i in indices]
+            user_replies = await admission.run(handle_user_messages, texts, ticket.user_id)
+        for i, reply in zip(indices, user_replies):
+            replies[i] = reply
+
+    await asyncio.gather(*(run_user(ticket) for ticket in tickets))
+    return {"replies": replies}
+
+
+# -----------------------------
+# Streaming chat (Server-Sent Events)
+# -----------------------------
+async def _sse_events(admission, ticket, req):
+    # The ticket is held for the whole stream: the turn isn't over until
+    # the last token, and the user's next message must wait for it
+    async with ticket:
+        parts = handle_user_message_stream(text=req.message, user_id=req.user_id)
+        step = None
+        try:
+            while True:
+                # Shielded: a disconnect can't abandon next() mid-run in its thread
+                step = asyncio.ensure_future(admission.run(next, parts, None))
+                part = await asyncio.shield(step)
+                if part is None:
+                    break
+                if part:
+                    yield f"data: {json.dumps({'delta': part})}\n\n"
+        finally:
+            # Runs even when the client has gone: the turn finishes (and its
+            # session is saved) before the ticket lets the next message in
+            with anyio.CancelScope(shield=True):
+                if step is not None:
+                    await asyncio.wait([step])
+                await admission.run(parts.close)
+    yield "event: done\ndata: {}\n\n"
+
+
+class _TicketedStream(StreamingResponse):
+    """
+    A StreamingResponse that always closes its body and gives the ticket
+    back, also when the client leaves before the first byte and the body
+    is never (or only partly) iterated.
+    """
+
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                # Runs _sse_events' cleanup if it stopped at a yield...
+                await self.body_iterator.aclose()
+            # ...and frees the place in line if it never started
+            self.ticket.release()
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    admission = request.app.state.admission
+    # Reserved before the response starts, so a refusal is still a 429/503
+    ticket = admission.reserve(req.user_id)
+    return _TicketedStream(
+        _sse_events(admission, ticket, req),
+        ticket,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,130 @@
+# SmartBudgetAI/api/reads.py
+"""
+Read-only REST views of a user's data, for dashboards that used to send
+"who owes me" through the chat and parse the reply.
+
+    GET /users/{user_id}/loans            active loans, newest first
+    GET /users/{user_id}/loans/history    every loan and repayment, newest first
+    GET /users/{user_id}/expenses         newest first
+    GET /users/{user_id}/reminders        pending, soonest first
+
+?limit= sets the page size, ?cursor= continues from a page's next_cursor,
+?fields=entity,remaining_amount picks columns.
+
+Responses carry an ETag made from db.data_version(user_id), which every
+write to the user's rows bumps, and from the route and query string, so
+no two views of the same data share a tag. A poll whose If-None-Match
+still matches gets 304 before any SQL runs.
+
+The version counters live in one process and only see that process's
+writes. A per-process tag means a poll landing on another worker gets a
+fresh 200, but a tag minted by worker A, followed by a write handled by
+worker B and a poll back on A, is a stale 304: A never saw the write.
+With several workers, route each user's reads and writes to the same one
+(or serve these routes from a single worker) if polls must see every
+write; SESSION_STORE=sqlite alone doesn't make the ETags shared.
+"""
+import base64
+import hashlib
+import json
+import os
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from SmartBudgetAI import db, memory
+
+MAX_LIMIT = 500
+# Clients must revalidate, and nothing shared may keep a user's data
+CACHE_CONTROL = "private, no-cache"
+
+# Tells this process's version counters apart from another worker's
+_PROCESS_TAG = os.urandom(4).hex()
+
+router = APIRouter()
+
+
+def etag(request, user_id):
+    # The route and its normalized query (?fields=, ?cursor=, ?limit=, in
+    # any order) name the view; the data version says which state of it
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    view = hashlib.blake2b(f"{request.url.path}?{query}".encode(), digest_size=6).hexdigest()
+    return f'W/"{_PROCESS_TAG}-{view}-{db.data_version(user_id)}"'
+
+
+def _not_modified(request, tag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or tag in (t.strip() for t in header.split(","))
+
+
+def encode_cursor(row, date_field):
+    raw = json.dumps([row[date_field], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if cursor is None:
+        return None
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (date, int(row_id))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "invalid cursor")
+
+
+def _fields(fields, allowed):
+    if not fields:
+        return list(allowed)
+    columns = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise HTTPException(400, f"unknown fields {unknown}, expected some of {list(allowed)}")
+    return columns
+
+
+async def _page(request, user_id, read, date_field, allowed, fields, cursor, limit):
+    # The version is read before the rows: a write landing in between
+    # bumps it again, so the next poll refetches
+    tag = etag(request, user_id)
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, tag):
+        return Response(status_code=304, headers=headers)
+
+    columns = _fields(fields, allowed)
+    # One row past the page says whether there is a next one
+    rows = await run_in_threadpool(read, user_id, columns, decode_cursor(cursor), limit + 1)
+    next_cursor = encode_cursor(rows[limit - 1], date_field) if len(rows) > limit else None
+    items = [{c: row[c] for c in columns} for row in rows[:limit]]
+    return JSONResponse({"items": items, "next_cursor": next_cursor}, headers=headers)
+
+
+def _pending_reminders(user_id, columns, after, limit):
+    return db.get_pending_reminders(user_id, after=after, limit=limit, columns=columns)
+
+
+Limit = Query(db.PAGE_SIZE, ge=1, le=MAX_LIMIT)
+
+
+@router.get("/users/{user_id}/loans")
+async def active_loans(request: Request, user_id: int, fields: str = None, cursor: str = None, limit: int = Limit):
+    return await _page(request, user_id, memory.get_active_loan_items, "created_at",
+                       db.MEMORY_FACT_FIELDS, fields, cursor, limit)
+
+
+@router.get("/users/{user_id}/loans/history")
+async def loan_history(request: Request, user_id: int, fields: str = None, cursor: str = None, limit: int = Limit):
+    return await _page(request, user_id, memory.get_loan_history, "created_at",
+                       db.MEMORY_FACT_FIELDS, fields, cursor, limit)
+
+
+@router.get("/users/{user_id}/expenses")
+async def expenses(request: Request, user_id: int, fields: str = None, cursor: str = None, limit: int = Limit):
+    return await _page(request, user_id, db.get_expenses_page, "date",
+                       db.EXPENSE_FIELDS, fields, cursor, limit)
+
+
+@router.get("/users/{user_id}/reminders")
+async def pending_reminders(request: Request, user_id: int, fields: str = None, cursor: str = None, limit: int = Limit):
+    return await _page(request, user_id, _pending_reminders, "remind_at",
+                       db.REMINDER_FIELDS, fields, cursor, limit)
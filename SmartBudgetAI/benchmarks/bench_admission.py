@@ -0,0 +1,119 @@
+# SmartBudgetAI/benchmarks/bench_admission.py
+"""
+/chat under saturation: CLIENTS closed-loop clients (each sends its next
+message as soon as the last one is answered, or after Retry-After when
+refused) against a real uvicorn, with a fake Ollama that generates PARALLEL replies at a time.
+
+Two gates are compared: the default admission limits, and one that
+admits everything (what the threadpool-backed sync endpoint amounted to).
+For each: p50/p99 latency of answered turns, how many were refused, and
+p99 of /health polled alongside.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_admission [clients] [seconds]
+"""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from SmartBudgetAI import db, llm_client, llm_fallback
+from SmartBudgetAI.api import admission
+from SmartBudgetAI.api.admission import AdmissionControl
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.benchmarks.bench_stream import _serve_api
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+LLM_LATENCY = 0.2
+PARALLEL = 2
+# Open-ended, so every turn waits on the persona
+MESSAGE = "tell me a joke"
+HEALTH_EVERY = 0.1
+
+
+def _reply(payload):
+    if "financial parser" in payload["messages"][0]["content"]:
+        return '{"intent": "clarify"}'
+    return "lol same 💀"
+
+
+def _percentile(samples, p):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def _load(base, clients, seconds):
+    started = time.perf_counter()
+    stop = started + seconds
+    latencies, refused, health = [], {429: 0, 503: 0}, []
+    lock = threading.Lock()
+
+    def client(user_id):
+        http = requests.Session()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = http.post(f"{base}/chat", json={"user_id": user_id, "message": MESSAGE})
+            with lock:
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    refused[response.status_code] += 1
+            if response.status_code != 200:
+                time.sleep(int(response.headers["Retry-After"]))
+
+    def poll_health():
+        http = requests.Session()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            http.get(f"{base}/health")
+            health.append(time.perf_counter() - start)
+            time.sleep(HEALTH_EVERY)
+
+    threads = [threading.Thread(target=client, args=(u,)) for u in range(clients)]
+    threads.append(threading.Thread(target=poll_health))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Turns admitted before the stop still finish, however long they queued
+    return latencies, refused, health, time.perf_counter() - started
+
+
+def report(label, latencies, refused, health, elapsed):
+    print(f"{label:<22}: {len(latencies) / elapsed:5.1f} turns/s   "
+          f"p50 {_percentile(latencies, 0.5) * 1000:6.0f} ms   p99 {_percentile(latencies, 0.99) * 1000:6.0f} ms   "
+          f"refused 429={refused[429]} 503={refused[503]}   "
+          f"/health p99 {_percentile(health, 0.99) * 1000:5.0f} ms")
+
+
+def main(clients=64, seconds=10):
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOllama(reply=_reply, latency=LLM_LATENCY, parallel=PARALLEL) as fake:
+        db.DB_PATH = str(Path(tmp) / "admission.db")
+        llm_fallback.TRAINING_FILE = str(Path(tmp) / "none.jsonl")
+        llm_client._CLIENT = llm_client.OllamaClient(url=fake.url)
+        db.ensure_table()
+        server, base = _serve_api()
+
+        print(f"{clients} clients, {seconds} s each, LLM {LLM_LATENCY * 1000:.0f} ms x {PARALLEL} parallel")
+        gates = [
+            ("admission (default)", AdmissionControl()),
+            ("admit everything", AdmissionControl(max_active=admission.MAX_ACTIVE,
+                                                  max_queued=10 ** 6, max_per_user=10 ** 6)),
+        ]
+        for label, gate in gates:
+            app.state.admission.close()
+            app.state.admission = gate
+            report(label, *_load(base, clients, seconds))
+
+        server.should_exit = True
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
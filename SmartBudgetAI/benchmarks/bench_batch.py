@@ -0,0 +1,99 @@
+# SmartBudgetAI/benchmarks/bench_batch.py
+"""
+Concurrent LLM parses against a fake Ollama that, like a CPU-bound local
+model, generates one reply at a time: one call per request vs coalescing
+vs coalescing plus micro-batching.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_batch [requests] [arrival_window_s]
+"""
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from SmartBudgetAI import llm_client, llm_fallback
+from SmartBudgetAI.llm_batcher import BATCH_WINDOW, MAX_BATCH, ParseBatcher
+from SmartBudgetAI.llm_cache import normalize_text
+from SmartBudgetAI.tests.fake_ollama import FakeOllama, parser_reply
+
+PROMPT_LATENCY = 0.5    # prompt evaluation per call
+TOKEN_LATENCY = 0.01    # per generated word; a batch reply is proportionally longer
+DUPLICATE_SHARE = 0.3   # e.g. the same "spot alex 20" from a retry or a second tab
+
+VERBS = ["Spot", "Lent", "Fronted", "Covered", "Gave"]
+NAMES = ["Alex", "Sam", "Jo", "Chris", "Pat", "Lee", "Kim", "Dana", "Ravi", "Mia"]
+
+
+def workload(n, seed=11):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        if texts and rng.random() < DUPLICATE_SHARE:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(f"{rng.choice(VERBS)} {rng.choice(NAMES)} {rng.randint(1, 300)}")
+    return texts
+
+
+def run(parse, texts, arrival_window):
+    rng = random.Random(3)
+    offsets = sorted(rng.uniform(0, arrival_window) for _ in texts)
+    latencies = [None] * len(texts)
+    start = time.perf_counter()
+
+    def user(i):
+        time.sleep(max(0.0, start + offsets[i] - time.perf_counter()))
+        sent = time.perf_counter()
+        parse(texts[i])
+        latencies[i] = time.perf_counter() - sent
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(label, server, wall, latencies):
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<20}: {len(server.requests):3d} LLM calls  wall {wall:6.2f}s  "
+          f"p50 {p50:6.2f}s  p95 {p95:6.2f}s")
+
+
+def main(requests=48, arrival_window=2.0):
+    texts = workload(requests)
+    print(f"{requests} parses ({len(set(texts))} distinct) arriving over {arrival_window:.1f}s; "
+          f"window {BATCH_WINDOW * 1000:.0f} ms, max batch {MAX_BATCH}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        llm_fallback.TRAINING_FILE = str(Path(tmp) / "none.jsonl")
+        scenarios = [
+            ("one call each", None),
+            ("coalesce", dict(window=0, max_batch=1)),
+            ("coalesce + batch", dict()),
+        ]
+        for label, config in scenarios:
+            with FakeOllama(reply=parser_reply, latency=PROMPT_LATENCY,
+                            token_latency=TOKEN_LATENCY, parallel=1) as server:
+                llm_client._CLIENT = llm_client.OllamaClient(url=server.url)
+                if config is None:
+                    parse = lambda text: llm_fallback.parse_batch([text])
+                    batcher = None
+                else:
+                    batcher = ParseBatcher(llm_fallback.parse_batch, **config)
+                    parse = lambda text: batcher.parse(normalize_text(text), text)
+
+                wall, latencies = run(parse, texts, arrival_window)
+                report(label, server, wall, latencies)
+                if batcher:
+                    batcher.close()
+                llm_client._CLIENT.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 48, float(args[1]) if len(args) > 1 else 2.0)
@@ -0,0 +1,53 @@
+# SmartBudgetAI/benchmarks/bench_bulk.py
+"""
+Importing history: add_expense() per row vs add_expenses_bulk().
+
+Run: python -m SmartBudgetAI.benchmarks.bench_bulk [rows]
+"""
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from SmartBudgetAI import db
+
+CATEGORIES = ["food", "rent", "travel", "fun", "bills"]
+
+
+def make_rows(n):
+    start = date(2020, 1, 1)
+    for i in range(n):
+        yield (
+            (start + timedelta(days=i % 2000)).isoformat(),
+            CATEGORIES[i % len(CATEGORIES)],
+            (i % 500) + 0.99,
+            None,
+        )
+
+
+def main(n=100_000):
+    # Row-at-a-time is far too slow for the full count; time a sample and scale.
+    sample = min(n, 2_000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "single.db")
+        start = time.perf_counter()
+        for d, category, amount, note in make_rows(sample):
+            db.add_expense(1, d, category, amount, note)
+        single_s = (time.perf_counter() - start) / sample * n
+
+        db.DB_PATH = str(Path(tmp) / "bulk.db")
+        start = time.perf_counter()
+        ranges = db.add_expenses_bulk(1, make_rows(n))
+        bulk_s = time.perf_counter() - start
+        db.close_connections()
+
+    print(f"rows: {n}  (inserted ids {ranges})")
+    print(f"add_expense loop : {single_s:8.2f} s  (extrapolated from {sample} rows)")
+    print(f"add_expenses_bulk: {bulk_s:8.2f} s  ({n / bulk_s:,.0f} rows/s)")
+    print(f"speedup          : {single_s / bulk_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,67 @@
+# SmartBudgetAI/benchmarks/bench_chat_batch.py
+"""
+Bulk ingestion: USERS users x MESSAGES messages ("Lent Name N" / "yes"
+pairs, so every other turn writes a loan) sent as one /chat call per
+message, in order, vs one /chat/batch request. Served by a real uvicorn
+on localhost, once per session store.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_chat_batch [users] [messages]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from SmartBudgetAI import db, session_store
+from SmartBudgetAI.benchmarks.bench_stream import _serve_api
+
+NAMES = ["John", "Sam", "Priya", "Alex", "Maria", "Chen"]
+
+
+def _items(users, messages, first_user):
+    items = []
+    for n in range(messages // 2):
+        for user_id in range(first_user, first_user + users):
+            items.append({"user_id": user_id, "message": f"Lent {NAMES[n % len(NAMES)]} {n + 1}"})
+            items.append({"user_id": user_id, "message": "yes"})
+    return items
+
+
+def main(users=20, messages=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "batch.db")
+        db.ensure_table()
+        server, base = _serve_api()
+        http = requests.Session()
+
+        print(f"{users} users x {messages} messages")
+        first_user = 1
+        for store in ("memory", "sqlite"):
+            session_store._STORE = session_store.STORES[store]()
+
+            items = _items(users, messages, first_user)
+            start = time.perf_counter()
+            singles = [http.post(f"{base}/chat", json=item).json()["reply"] for item in items]
+            single_s = time.perf_counter() - start
+            first_user += users
+
+            items = _items(users, messages, first_user)
+            start = time.perf_counter()
+            batched = http.post(f"{base}/chat/batch", json={"items": items}).json()["replies"]
+            batch_s = time.perf_counter() - start
+            first_user += users
+
+            assert batched == singles
+            n = len(items)
+            print(f"{store + ' sessions':<16}: /chat x{n} {single_s * 1000:7.0f} ms ({n / single_s:6.0f} msg/s)   "
+                  f"/chat/batch {batch_s * 1000:7.0f} ms ({n / batch_s:6.0f} msg/s)   {single_s / batch_s:4.1f}x")
+
+        server.should_exit = True
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,95 @@
+# SmartBudgetAI/benchmarks/bench_db.py
+"""
+Per-turn DB overhead: connect-per-call (old db.py) vs pooled connections.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_db [turns]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from SmartBudgetAI import db
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, date TEXT,
+        category TEXT, amount REAL, note TEXT)""",
+    """CREATE TABLE IF NOT EXISTS memory_facts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, memory_type TEXT,
+        entity TEXT, amount REAL, remaining_amount REAL, currency TEXT,
+        event_date TEXT, due_date TEXT, description TEXT,
+        status TEXT DEFAULT 'active', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        closed_at TEXT)""",
+    """CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, message TEXT,
+        remind_at TEXT, created_at TEXT, status TEXT DEFAULT 'pending')""",
+]
+
+
+def _legacy_call(path, sql, params, ensure=True):
+    # What every db.py function used to do: connect, ensure_table(), run, commit, close.
+    if ensure:
+        conn = sqlite3.connect(path)
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def legacy_turn(path, user_id):
+    now = datetime.now().isoformat()
+    _legacy_call(path, "SELECT id, message, created_at FROM reminders "
+                       "WHERE user_id=? AND status='pending' AND remind_at <= ?", (user_id, now))
+    loan = _legacy_call(path, "SELECT id, remaining_amount FROM memory_facts WHERE user_id = ? "
+                              "AND status = 'active' AND lower(entity) = ? LIMIT 1", (user_id, "mike"))
+    _legacy_call(path, "UPDATE memory_facts SET remaining_amount = ? WHERE id = ?",
+                 (loan[0][1], loan[0][0]), ensure=False)
+    _legacy_call(path, "INSERT INTO memory_facts (user_id, memory_type, entity, amount, "
+                       "remaining_amount) VALUES (?, 'repayment', 'Mike', 1, 1)", (user_id,))
+    _legacy_call(path, "SELECT * FROM memory_facts WHERE user_id = ? AND status = 'active'", (user_id,))
+
+
+def pooled_turn(user_id):
+    db.get_due_reminders(user_id)
+    loan = db.get_memory_facts(user_id, memory_type="loan", active_only=True)[0]
+    db.update_remaining(loan["id"], loan["remaining_amount"])
+    db.add_memory_fact(user_id, "repayment", "Mike", 1, description="bench")
+    db.get_memory_facts(user_id, active_only=True)
+
+
+def _time(fn, turns):
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main(turns=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = str(Path(tmp) / "legacy.db")
+        _legacy_call(legacy_path, "INSERT INTO memory_facts (user_id, memory_type, entity, amount, "
+                                  "remaining_amount) VALUES (1, 'loan', 'Mike', 100, 100)", ())
+        legacy_us = _time(lambda: legacy_turn(legacy_path, 1), turns)
+
+        db.DB_PATH = str(Path(tmp) / "pooled.db")
+        db.ensure_table()
+        db.add_memory_fact(1, "loan", "Mike", 100)
+        pooled_us = _time(lambda: pooled_turn(1), turns)
+        db.close_connections()
+
+    print(f"turns: {turns} (5 DB operations each)")
+    print(f"connect-per-call : {legacy_us:9.1f} us/turn")
+    print(f"pooled + WAL     : {pooled_us:9.1f} us/turn")
+    print(f"speedup          : {legacy_us / pooled_us:9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,99 @@
+# SmartBudgetAI/benchmarks/bench_entity_index.py
+"""
+Finding the counterparty a repayment means, for users with thousands of
+them: the exact lower(entity) lookup apply_repayment does (a typo simply
+misses), a difflib scan over every name, and the trigram EntityIndex (cold
+build from loan_balances, then warm searches).
+
+Queries are real names with one typo (dropped, doubled or swapped letter)
+or just lowercased; "top-1" is how often the intended name ranks first.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_entity_index [queries]
+"""
+import difflib
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from SmartBudgetAI import db
+from SmartBudgetAI.entity_index import get_entity_index
+
+FIRST = ["John", "Alex", "Sam", "Priya", "Mika", "Ravi", "Dana", "Chris", "Lee", "Kim", "Omar", "Ana",
+         "Jonas", "Joan", "Pat", "Ben", "Mia", "Noah", "Zoe", "Ivan", "Lena", "Raj", "Tara", "Hugo"]
+LAST = ["Smith", "Patel", "Garcia", "Kim", "Nguyen", "Brown", "Singh", "Lopez", "Chen", "Khan",
+        "Rossi", "Novak", "Silva", "Cohen", "Ito", "Okafor", "Jensen", "Moreau", "Haddad", "Kowal"]
+
+
+def names(n, rng):
+    pool = [f"{f} {l}" for f in FIRST for l in LAST]
+    out = set()
+    while len(out) < n:
+        out.add(f"{rng.choice(pool)} {rng.randint(1, 99)}" if len(out) >= len(pool) // 2 else rng.choice(pool))
+    return sorted(out)
+
+
+def typo(name, rng):
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    kind = rng.choice(["drop", "double", "swap", "lower"])
+    if kind == "drop":
+        del chars[i]
+    elif kind == "double":
+        chars.insert(i, chars[i])
+    elif kind == "swap":
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        return name.lower()
+    return "".join(chars)
+
+
+def exact_lookup(user_id, name):
+    """apply_repayment's lookup: oldest active loan whose lower(entity) matches."""
+    return db.get_connection().execute("""
+        SELECT entity FROM memory_facts
+        WHERE user_id = ? AND memory_type = ? AND status = 'active' AND lower(entity) = ?
+        ORDER BY created_at ASC, id ASC LIMIT 1
+    """, (user_id, db.LOAN_TYPE, name.lower())).fetchone()
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def main(queries=300):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "entities.db")
+        for user_id, n in enumerate([1_000, 5_000, 20_000], start=1):
+            people = names(n, rng)
+            db.add_memory_facts_bulk(user_id, [("loan", name, 10.0) for name in people])
+            targets = [rng.choice(people) for _ in range(queries)]
+            asked = [typo(name, rng) for name in targets]
+
+            sql_ms, rows = timed(lambda q: exact_lookup(user_id, q), asked)
+            sql_hits = sum(row is not None and row[0] == t for row, t in zip(rows, targets))
+
+            scan_ms, scanned = timed(lambda q: difflib.get_close_matches(q, people, n=1, cutoff=0.6), asked[:30])
+            scan_hits = sum(found[:1] == [t] for found, t in zip(scanned, targets))
+
+            start = time.perf_counter()
+            index = get_entity_index(user_id)
+            build_ms = (time.perf_counter() - start) * 1000
+            index_ms, found = timed(lambda q: get_entity_index(user_id).search(q), asked)
+            index_hits = sum(bool(f) and f[0][0] == t for f, t in zip(found, targets))
+
+            print(f"{len(index):>6,} counterparties")
+            print(f"  exact SQL lookup      : {sql_ms:7.3f} ms/query   top-1 {sql_hits / queries:6.1%}")
+            print(f"  difflib over all names: {scan_ms:7.3f} ms/query   top-1 {scan_hits / 30:6.1%} (30 queries)")
+            print(f"  EntityIndex build     : {build_ms:7.1f} ms once per write")
+            print(f"  EntityIndex search    : {index_ms:7.3f} ms/query   top-1 {index_hits / queries:6.1%}")
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,73 @@
+# SmartBudgetAI/benchmarks/bench_few_shot.py
+"""
+Few-shot selection per LLM parse: re-reading training_data.jsonl (old
+get_few_shot_examples) vs the incremental FewShotIndex.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_few_shot [examples] [queries]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from SmartBudgetAI.few_shot_index import FewShotIndex
+
+VERBS = ["lent", "spot", "gave", "paid back", "repaid", "fronted", "covered", "got back", "owes me"]
+NAMES = ["Alex", "Sam", "Jo", "Chris", "Pat", "Lee", "Kim", "Dana", "Ravi", "Mia"]
+
+
+def legacy_examples(path):
+    """get_few_shot_examples() as it was: whole file, last 3 confirmed."""
+    examples = []
+    with open(path, "r") as f:
+        lines = f.readlines()
+        for line in reversed(lines):
+            if len(examples) >= 3:
+                break
+            rec = json.loads(line)
+            if rec.get("confirmed_intent") and rec["confirmed_intent"] != "rejected":
+                examples.append(rec["text"])
+    return examples
+
+
+def seed(path, n):
+    rng = random.Random(3)
+    with open(path, "w") as f:
+        for _ in range(n):
+            text = f"{rng.choice(VERBS)} {rng.choice(NAMES)} {rng.randint(1, 500)}"
+            intent = rng.choice(["loan_given", "loan_received", "rejected"])
+            f.write(json.dumps({"text": text, "confirmed_intent": intent}) + "\n")
+
+
+def main(examples=10_000, queries=2_000):
+    rng = random.Random(5)
+    texts = [f"{rng.choice(VERBS)} {rng.choice(NAMES)} {rng.randint(1, 500)} bucks" for _ in range(queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "training_data.jsonl"
+        seed(path, examples)
+
+        start = time.perf_counter()
+        for _ in texts:
+            legacy_examples(path)
+        legacy_ms = (time.perf_counter() - start) / queries * 1000
+
+        start = time.perf_counter()
+        index = FewShotIndex(str(path)).refresh()
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            index.refresh().search(text)
+        index_ms = (time.perf_counter() - start) / queries * 1000
+
+    print(f"{examples:,} lines, {len(index):,} confirmed examples (index built in {build_s:.2f}s)")
+    print(f"re-read file, last 3   : {legacy_ms:7.3f} ms/parse")
+    print(f"index refresh + top-3  : {index_ms:7.3f} ms/parse")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,95 @@
+# SmartBudgetAI/benchmarks/bench_lexer.py
+"""
+Lexer throughput, and the cost of one turn's worth of extraction before and
+after it: the four extractors that used to re-scan the message each
+(parser, rule_parser, nlp_utils, memory_extractor) against one cached
+tokenize() whose tokens they all read.
+
+Messages come from sample_requests.jsonl, multiplied with distinct suffixes
+so the uncached runs never hit the lexer's cache.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_lexer [copies]
+"""
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from SmartBudgetAI import lexer, memory_extractor, nlp_utils, rule_parser
+from SmartBudgetAI.intent_specs import INTENT_SPECS
+from SmartBudgetAI.keyword_matcher import spec_matcher
+from SmartBudgetAI.parser import STOPWORDS, parse_message
+
+SAMPLE = Path(__file__).with_name("sample_requests.jsonl")
+
+_LEGACY_AMOUNT = re.compile(r"\b\d+(\.\d{1,2})?\b")
+_LEGACY_NLP_AMOUNT = re.compile(r"(\$|usd|rs|₹|€)?\s?(\d+(?:\.\d+)?)")
+_LEGACY_DATE = re.compile(r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+(\d{1,2})")
+
+
+def legacy_extractors(text):
+    """What a turn cost before: every module splits and scans on its own."""
+    text_lower = text.lower()
+    m = _LEGACY_AMOUNT.search(text)
+    amount = float(m.group()) if m else None
+    entity = next((w.strip(".,?!") for w in text.split()
+                   if w.strip(".,?!").istitle() and w.strip(".,?!").lower() not in STOPWORDS), None)
+    intent = next((i for i, spec in INTENT_SPECS.items() for kw in spec["keywords"] if kw in text_lower), None)
+    normalized = " ".join(text.strip().split())
+    m = _LEGACY_AMOUNT.search(normalized)
+    rule_amount = float(m.group()) if m else None
+    rule_entity = next((w for w in normalized.split() if w.istitle() and w.lower() not in STOPWORDS), None)
+    m = _LEGACY_NLP_AMOUNT.search(text_lower)
+    nlp_amount = float(m.group(2)) if m else None
+    nlp_entity = next((w for w in text.split() if w.istitle()), None)
+    date = _LEGACY_DATE.search(text_lower)
+    return intent, amount, entity, rule_amount, rule_entity, nlp_amount, nlp_entity, date
+
+
+def lexer_extractors(text):
+    """The same answers from one token stream."""
+    tokens = lexer.tokenize(text)
+    return (parse_message(text), rule_parser.extract_amount(text), rule_parser.extract_entity(text),
+            nlp_utils.extract_amount(text), nlp_utils.extract_entity(text),
+            memory_extractor.parse_simple_date(text), lexer.words(tokens))
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return time.perf_counter() - start
+
+
+def report(label, seconds, texts):
+    chars = sum(len(t) for t in texts)
+    print(f"  {label:<34}: {seconds / len(texts) * 1e6:6.2f} us/message"
+          f"  {len(texts) / seconds:9.0f} messages/s  {chars / seconds / 1e6:5.1f} MB/s")
+
+
+def main(copies=500):
+    with open(SAMPLE) as f:
+        base = [json.loads(line)["message"] for line in f]
+    texts = [f"{text} #{i}" for i in range(copies) for text in base]
+    raw_lex = lexer._lex.__wrapped__
+    matcher = spec_matcher(INTENT_SPECS)
+
+    print(f"{len(texts)} distinct messages")
+    report("tokenize, uncached", timed(lambda t: raw_lex(t, matcher), texts), texts)
+    lexer._lex.cache_clear()
+    for t in base:
+        lexer.tokenize(t)
+    report("tokenize, cached", timed(lexer.tokenize, base * copies), texts)
+
+    print("all extractors for one turn")
+    report("legacy, one scan per module", timed(legacy_extractors, texts), texts)
+    lexer._lex.cache_clear()
+    report("lexer, first sight of the message", timed(lexer_extractors, texts), texts)
+    report("lexer, message seen this turn", timed(lexer_extractors, texts[-lexer._lex.cache_info().maxsize:]),
+           texts[-lexer._lex.cache_info().maxsize:])
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
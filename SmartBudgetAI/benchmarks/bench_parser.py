@@ -0,0 +1,103 @@
+# SmartBudgetAI/benchmarks/bench_parser.py
+"""
+Per-message cost of the rule parser: parse_message before and after the
+compiled keyword matcher, and the keyword step on its own with the
+alternatives that were tried (one alternation regex over all keywords,
+as overlapping lookahead matches or named groups per intent). Since the
+lexer, keywords match whole words, so the legacy substring scans are
+timed for reference only; bench_lexer covers the lexer itself.
+
+Messages come from sample_requests.jsonl.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_parser [repeats]
+"""
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.intent_specs import INTENT_SPECS
+from SmartBudgetAI.keyword_matcher import spec_matcher
+from SmartBudgetAI.parser import STOPWORDS, parse_message
+
+SAMPLE = Path(__file__).with_name("sample_requests.jsonl")
+AMOUNT_REGEX = r"\b\d+(\.\d{1,2})?\b"
+
+
+def legacy_parse_message(text):
+    """parse_message as it was: per-call keyword loops and an uncompiled amount regex."""
+    text_lower = text.lower()
+    m = re.search(AMOUNT_REGEX, text)
+    amount = float(m.group()) if m else None
+    entity = next((w.strip(".,?!") for w in text.split()
+                   if w.strip(".,?!").istitle() and w.strip(".,?!").lower() not in STOPWORDS), None)
+    for intent, spec in INTENT_SPECS.items():
+        for kw in spec["keywords"]:
+            if kw in text_lower:
+                return ParsedIntent(intent=intent, entity=entity, amount=amount, confidence=1.0)
+    if entity and amount:
+        return ParsedIntent(intent="clarify", entity=entity, amount=amount, confidence=0.5,
+                            needs_confirmation=True)
+    return ParsedIntent(intent="clarify", confidence=0.0)
+
+
+def _keyword_alternatives():
+    keywords = [(kw, intent) for intent, spec in INTENT_SPECS.items() for kw in spec["keywords"]]
+    rank = {intent: i for i, intent in enumerate(INTENT_SPECS)}
+    owner = dict(keywords)
+
+    lookahead = re.compile("(?=(" + "|".join(re.escape(kw) for kw, _ in keywords) + "))")
+
+    def regex_lookahead(text_lower):
+        found = [owner[m.group(1)] for m in lookahead.finditer(text_lower)]
+        return min(found, key=rank.get) if found else None
+
+    groups = {f"i{i}": intent for i, intent in enumerate(INTENT_SPECS)}
+    named = re.compile("|".join(
+        f"(?P<i{i}>" + "|".join(re.escape(kw) for kw in spec["keywords"]) + ")"
+        for i, spec in enumerate(INTENT_SPECS.values())
+    ))
+
+    def regex_named_groups(text_lower):
+        # Non-overlapping, so only equivalent while no keyword hides inside another
+        found = [m.lastgroup for m in named.finditer(text_lower)]
+        return groups[min(found)] if found else None
+
+    def legacy_loop(text_lower):
+        for intent, spec in INTENT_SPECS.items():
+            for kw in spec["keywords"]:
+                if kw in text_lower:
+                    return intent
+        return None
+
+    return {
+        "legacy nested loops": legacy_loop,
+        "regex, lookahead": regex_lookahead,
+        "regex, named groups": regex_named_groups,
+        "phrase index (words)": lambda text_lower: spec_matcher(INTENT_SPECS).first(text_lower.split()),
+    }
+
+
+def per_message_us(fn, texts, repeats):
+    seconds = timeit.timeit(lambda: [fn(t) for t in texts], number=repeats)
+    return seconds / repeats / len(texts) * 1e6
+
+
+def main(repeats=2000):
+    with open(SAMPLE) as f:
+        texts = [json.loads(line)["message"] for line in f]
+    lowered = [t.lower() for t in texts]
+
+    print(f"{len(texts)} messages x {repeats}")
+    print(f"  parse_message, legacy   : {per_message_us(legacy_parse_message, texts, repeats):6.2f} us/message")
+    print(f"  parse_message, lexer    : {per_message_us(parse_message, texts, repeats):6.2f} us/message (cached tokens)")
+    print("keyword step only")
+    for label, fn in _keyword_alternatives().items():
+        print(f"  {label:<24}: {per_message_us(fn, lowered, repeats):6.2f} us/message")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
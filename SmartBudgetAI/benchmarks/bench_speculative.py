@@ -0,0 +1,83 @@
+# SmartBudgetAI/benchmarks/bench_speculative.py
+"""
+Low-confidence turns with and without the speculative persona call
+(chat_engine.SPECULATIVE_PERSONA), against a fake Ollama: PROMPT_LATENCY
+before the first token, then TOKEN_LATENCY per word.
+
+"party" turns parse as non-financial and need the persona reply; "money"
+turns parse as a loan, so a speculative persona call is wasted and
+cancelled. Run once with Ollama serving two requests in parallel
+(OLLAMA_NUM_PARALLEL=2) and once serializing them, as a CPU-only box does.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_speculative [turns]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from SmartBudgetAI import chat_engine, db, llm_client, llm_fallback
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+PROMPT_LATENCY = 0.8
+TOKEN_LATENCY = 0.03
+PERSONA = " ".join(["lol"] * 30) + " 💸"
+
+
+def _reply(payload):
+    if "financial parser" not in payload["messages"][0]["content"]:
+        return PERSONA
+    if "tab" in payload["messages"][-1]["content"]:
+        return '{"intent": "loan_given", "entity": "John", "amount": 50}'
+    return '{"intent": "clarify"}'
+
+
+def _turns(kind, n, offset):
+    # Distinct texts and users: no parse cache hits, no pending confirmations
+    for i in range(n):
+        text = f"tell me a joke #{offset + i}" if kind == "party" else f"put {offset + i} on john's tab"
+        yield text, 1000 + offset + i
+
+
+def run(kind, turns, offset):
+    latencies = []
+    for text, user_id in _turns(kind, turns, offset):
+        start = time.perf_counter()
+        handle_user_message(text, user_id=user_id)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return sum(latencies) / len(latencies), latencies[-1]
+
+
+def main(turns=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "speculative.db")
+        llm_fallback.TRAINING_FILE = str(Path(tmp) / "none.jsonl")
+        db.ensure_table()
+
+        offset = 0
+        for parallel in (2, 1):
+            print(f"Ollama running {parallel} request(s) at a time")
+            for speculative in (False, True):
+                chat_engine.SPECULATIVE_PERSONA = speculative
+                with FakeOllama(reply=_reply, latency=PROMPT_LATENCY,
+                                token_latency=TOKEN_LATENCY, parallel=parallel) as fake:
+                    llm_client._CLIENT = llm_client.OllamaClient(url=fake.url)
+                    for kind in ("party", "money"):
+                        mean, worst = run(kind, turns, offset)
+                        offset += turns
+                        label = f"{'speculative' if speculative else 'sequential'} / {kind}"
+                        print(f"  {label:<24}: mean {mean * 1000:6.0f} ms   worst {worst * 1000:6.0f} ms")
+                    # Let cancelled persona streams notice before the server goes
+                    time.sleep(TOKEN_LATENCY * 3)
+                    print(f"  {'':<24}  {len(fake.requests)} LLM requests")
+                    llm_client._CLIENT.close()
+
+        llm_fallback.get_parse_batcher().close()
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,100 @@
+# SmartBudgetAI/benchmarks/bench_stream.py
+"""
+Time to first byte for a persona reply: blocking handle_user_message and
+/chat vs the token stream and /chat/stream, against a fake Ollama that
+streams one word every TOKEN_LATENCY seconds. The API is served by a real
+uvicorn on localhost (TestClient buffers whole responses).
+
+Run: python -m SmartBudgetAI.benchmarks.bench_stream [turns]
+"""
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+import uvicorn
+
+from SmartBudgetAI import db, llm_client, llm_fallback
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.chat_engine import handle_user_message, handle_user_message_stream
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+PROMPT_LATENCY = 0.3   # prompt evaluation before the first token
+TOKEN_LATENCY = 0.03   # ~33 tokens/s
+REPLY = " ".join(["lol"] * 40) + " 💸"
+# Open-ended, so it reaches the persona (small talk like "hi" is answered locally)
+MESSAGE = "tell me a joke"
+
+
+def _reply(payload):
+    if "financial parser" in payload["messages"][0]["content"]:
+        return '{"intent": "clarify"}'
+    return REPLY
+
+
+def _time(make_parts):
+    start = time.perf_counter()
+    first = None
+    for part in make_parts():
+        if first is None and part:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def _serve_api():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def report(label, samples):
+    ttfb = sorted(s[0] for s in samples)[len(samples) // 2]
+    total = sorted(s[1] for s in samples)[len(samples) // 2]
+    print(f"{label:<26}: first byte {ttfb * 1000:6.0f} ms   full reply {total * 1000:6.0f} ms")
+
+
+def main(turns=5):
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOllama(reply=_reply, latency=PROMPT_LATENCY, token_latency=TOKEN_LATENCY) as fake:
+        db.DB_PATH = str(Path(tmp) / "stream.db")
+        llm_fallback.TRAINING_FILE = str(Path(tmp) / "none.jsonl")
+        llm_client._CLIENT = llm_client.OllamaClient(url=fake.url)
+        db.ensure_table()
+
+        handle_user_message(MESSAGE, user_id=1)  # warm the parse cache, like a repeat visitor
+
+        report("handle_user_message",
+               [_time(lambda: [handle_user_message(MESSAGE, user_id=1)]) for _ in range(turns)])
+        report("handle_user_message_stream",
+               [_time(lambda: handle_user_message_stream(MESSAGE, user_id=1)) for _ in range(turns)])
+
+        server, base = _serve_api()
+        http = requests.Session()
+        body = {"user_id": 2, "message": MESSAGE}
+
+        def plain():
+            response = http.post(f"{base}/chat", json=body)
+            yield response.content
+
+        def streamed():
+            with http.post(f"{base}/chat/stream", json=body, stream=True) as response:
+                yield from response.iter_content(chunk_size=None)
+
+        report("POST /chat", [_time(plain) for _ in range(turns)])
+        report("POST /chat/stream", [_time(streamed) for _ in range(turns)])
+
+        server.should_exit = True
+        db.close_connections()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,73 @@
+# SmartBudgetAI/benchmarks/bench_sweep.py
+"""
+Daily due-loan job: one get_due_reminders() per user vs the cross-user sweep.
+
+Run: python -m SmartBudgetAI.benchmarks.bench_sweep [facts] [users]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from SmartBudgetAI import db, reminder_engine
+
+TODAY = date(2026, 6, 1)
+
+
+def seed(facts, users):
+    rng = random.Random(7)
+    rows = []
+    for i in range(facts):
+        # Due dates spread over the coming year; ~10% fall in the 7-day window
+        due = TODAY + timedelta(days=rng.randint(-30, 335))
+        status = "closed" if rng.random() < 0.3 else "active"
+        rows.append((i % users + 1, "loan", f"Friend{rng.randint(1, 200)}",
+                     50.0, 50.0, due.isoformat(), status))
+    with db.transaction(immediate=True) as conn:
+        conn.executemany("""
+            INSERT INTO memory_facts (user_id, memory_type, entity, amount, remaining_amount, due_date, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    db.rebuild_loan_balances()
+
+
+def main(facts=1_000_000, users=50_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "sweep.db")
+        start = time.perf_counter()
+        seed(facts, users)
+        print(f"seeded {facts:,} facts for {users:,} users in {time.perf_counter() - start:.1f}s")
+
+        # Baseline: what a naive job would do today, one query per user.
+        # Timed on a sample and scaled up.
+        sample = min(users, 5_000)
+        start = time.perf_counter()
+        for user_id in range(1, sample + 1):
+            reminder_engine.get_due_reminders(user_id, days_ahead=7, today=TODAY)
+        per_user_s = (time.perf_counter() - start) / sample * users
+
+        start = time.perf_counter()
+        serial = [reminder_engine.count_reminders(b)
+                  for b in reminder_engine.sweep_due_loans(today=TODAY)]
+        sweep_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = reminder_engine.sweep_due_loans_parallel(today=TODAY, shards=4)
+        parallel_s = time.perf_counter() - start
+
+        db.close_connections()
+
+    found = sum(n for _, n in serial)
+    assert found == sum(n for _, n in parallel)
+    print(f"due reminders found   : {found:,}")
+    print(f"per-user queries      : {per_user_s:7.2f} s  (extrapolated from {sample:,} users)")
+    print(f"sweep (1 process)     : {sweep_s:7.2f} s")
+    print(f"sweep (4 date shards) : {parallel_s:7.2f} s  ({os.cpu_count()} CPUs)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,168 @@
+# SmartBudgetAI/benchmarks/eval_classifier.py
+"""
+Accuracy and per-message latency of four ways to read a message's intent:
+
+    rules                  parse_message alone
+    rules + LLM            today's path: the LLM parse when the rules are unsure
+    rules + classifier     the trained classifier first, the LLM only below
+      + LLM                its probability threshold
+    rules + classifier     the same with no LLM, for the classifier's own cost
+
+The labelled data is a training_data.jsonl-style file (text,
+confirmed_intent). Without one, a synthetic set is generated from the
+phrasings below; either way the first 80% trains the classifier and the
+rest is scored, together with OFF_TOPIC chat that must stay "clarify"
+(false positives send chit-chat into the loan flow).
+
+The LLM is a fake Ollama that knows every right answer (the best case for
+the LLM path) and takes LLM_LATENCY per parse, about a 3B model on CPU.
+Pass --live to use the Ollama at OLLAMA_URL instead.
+
+Run: python -m SmartBudgetAI.benchmarks.eval_classifier [labelled.jsonl] [--live]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from SmartBudgetAI import db, intent_classifier, llm_client, llm_fallback
+from SmartBudgetAI.llm_fallback import llm_fallback_parse
+from SmartBudgetAI.parser import parse_message
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+LLM_LATENCY = 0.8
+TRAIN_SHARE = 0.8
+
+NAMES = ["Alex", "Sam", "Jo", "Chris", "Pat", "Lee", "Kim", "Dana", "Ravi", "Mia", "Noor", "Theo"]
+PHRASINGS = {
+    "loan_given": [
+        "lent {name} {amount}", "spot {name} {amount}", "fronted {name} {amount}",
+        "covered {name} {amount} for dinner", "{name} borrowed {amount}", "gave {name} {amount}",
+        "sent {name} {amount} till friday", "{name} owes me {amount} now", "paid for {name} {amount}",
+        "helped {name} out with {amount}", "{name} needed {amount} so I sent it",
+    ],
+    "loan_received": [
+        "{name} paid back {amount}", "{name} repaid {amount}", "got {amount} back from {name}",
+        "{name} sent me {amount} back", "{name} settled up {amount}", "{name} returned {amount}",
+        "{name} venmoed me {amount}", "received {amount} from {name}", "{name} squared up {amount}",
+        "{name} finally gave back {amount}",
+    ],
+    "query_debts": [
+        "who owes me", "who owes me money", "my debts", "what am I owed", "list my loans",
+        "who still hasn't paid me", "how much is out there", "who do I need to chase",
+        "show outstanding", "anyone owe me?", "what's pending",
+    ],
+}
+OFF_TOPIC = [
+    "tell me a joke", "how do I make a budget", "roast my spending", "what should I do with my bonus",
+    "can you explain compound interest", "is 20% savings rate good", "im broke help", "why is rent so high",
+    "should I pay off my credit card first", "what's a good emergency fund size",
+]
+
+
+def synthesize(path, n=1500, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(n):
+            intent = rng.choice(list(PHRASINGS))
+            text = rng.choice(PHRASINGS[intent]).format(name=rng.choice(NAMES), amount=rng.randint(5, 400))
+            if rng.random() < 0.3:
+                text = text.lower()
+            f.write(json.dumps({"text": text, "confirmed_intent": intent}) + "\n")
+
+
+def load(path):
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(r["text"], r["confirmed_intent"]) for r in records
+            if r.get("text") and r.get("confirmed_intent") in intent_classifier.CLASSES]
+
+
+def rules(text):
+    parsed = parse_message(text)
+    return parsed if parsed.confidence >= 0.6 else None
+
+
+def rules_llm(text):
+    return rules(text) or llm_fallback_parse(text)
+
+
+def rules_classifier(text):
+    return rules(text) or intent_classifier.classify_intent(text)
+
+
+def rules_classifier_llm(text):
+    return rules(text) or intent_classifier.classify_intent(text) or llm_fallback_parse(text)
+
+
+def evaluate(label, parse, samples, fake):
+    calls_before = len(fake.requests) if fake else 0
+    correct, latencies = 0, []
+    for text, intent in samples:
+        start = time.perf_counter()
+        parsed = parse(text)
+        latencies.append(time.perf_counter() - start)
+        correct += (parsed.intent if parsed else "clarify") == intent
+    latencies.sort()
+    mean_ms = sum(latencies) / len(latencies) * 1000
+    p95_ms = latencies[int(len(latencies) * 0.95)] * 1000
+    llm = f"{len(fake.requests) - calls_before:5d} LLM calls" if fake else ""
+    print(f"{label:<26}: accuracy {correct / len(samples):6.1%}   "
+          f"mean {mean_ms:8.2f} ms   p95 {p95_ms:8.2f} ms   {llm}")
+
+
+def main(path=None, live=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = Path(tmp) / "labelled.jsonl"
+            synthesize(path)
+        samples = load(path)
+        split = int(len(samples) * TRAIN_SHARE)
+        train, test = samples[:split], samples[split:] + [(text, "clarify") for text in OFF_TOPIC]
+
+        training_file = Path(tmp) / "training_data.jsonl"
+        with open(training_file, "w") as f:
+            for text, intent in train:
+                f.write(json.dumps({"text": text, "confirmed_intent": intent}) + "\n")
+
+        db.DB_PATH = str(Path(tmp) / "eval.db")
+        db.ensure_table()
+        llm_fallback.TRAINING_FILE = str(training_file)
+        intent_classifier.TRAINING_FILE = str(training_file)
+        intent_classifier.MODEL_FILE = str(Path(tmp) / "intent_model.joblib")
+
+        start = time.perf_counter()
+        classifier = intent_classifier.train(str(training_file), intent_classifier.MODEL_FILE)
+        print(f"{len(samples)} labelled messages {dict(Counter(i for _, i in samples))}")
+        print(f"classifier trained on {classifier.examples} in {time.perf_counter() - start:.2f}s, "
+              f"scored on {len(test)}, threshold {classifier.threshold}")
+
+        answers = {" ".join(text.split()): intent for text, intent in samples}
+
+        def oracle(payload):
+            return json.dumps({"intent": answers.get(" ".join(payload["messages"][-1]["content"].split()), "clarify"),
+                               "entity": None, "amount": None})
+
+        fake = None if live else FakeOllama(reply=oracle, latency=LLM_LATENCY).start()
+        try:
+            if fake:
+                llm_client._CLIENT = llm_client.OllamaClient(url=fake.url)
+            evaluate("rules", rules, test, fake)
+            evaluate("rules + LLM", rules_llm, test, fake)
+            # Cache off for a fair comparison: every text was just parsed once
+            llm_fallback.get_llm_cache().invalidate()
+            evaluate("rules + classifier + LLM", rules_classifier_llm, test, fake)
+            evaluate("rules + classifier", rules_classifier, test, fake)
+        finally:
+            if fake:
+                fake.stop()
+            llm_fallback.get_parse_batcher().close()
+            db.close_connections()
+
+
+if __name__ == "__main__":
+    live = "--live" in sys.argv[1:]
+    main(*[a for a in sys.argv[1:] if a != "--live"], live=live)
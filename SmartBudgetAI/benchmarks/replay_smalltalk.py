@@ -0,0 +1,79 @@
+# SmartBudgetAI/benchmarks/replay_smalltalk.py
+"""
+Replays logged /chat requests and reports who would answer each turn:
+the rule parser, the local small-talk responder, or the LLM.
+
+Input is JSONL with one request per line ({"user_id": .., "message": ..},
+the /chat body; a "text" key works too). Without an argument it replays
+the bundled sample_requests.jsonl.
+
+Run: python -m SmartBudgetAI.benchmarks.replay_smalltalk [requests.jsonl]
+"""
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from SmartBudgetAI.parser import parse_message
+from SmartBudgetAI.smalltalk import classify_smalltalk, smalltalk_reply
+
+SAMPLE = Path(__file__).with_name("sample_requests.jsonl")
+
+
+def load_turns(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record.get("message") or record.get("text") or ""
+
+
+def route(text):
+    """Mirrors chat_engine's idle-state order: rules, then small talk, then LLM."""
+    lower = text.lower()
+    if "close loan" in lower or ("remind me in" in lower and "days" in lower):
+        return "rules", None
+    parsed = parse_message(text)
+    if parsed.confidence >= 0.6 or parsed.needs_confirmation:
+        return "rules", None
+    kind = classify_smalltalk(text)
+    if kind:
+        return "smalltalk", kind
+    return "llm", None
+
+
+def main(path=SAMPLE):
+    turns = list(load_turns(path))
+    routes = Counter()
+    kinds = Counter()
+    llm_examples = []
+    for text in turns:
+        where, kind = route(text)
+        routes[where] += 1
+        if kind:
+            kinds[kind] += 1
+        elif where == "llm" and len(llm_examples) < 5:
+            llm_examples.append(text)
+
+    local = [t for t in turns if classify_smalltalk(t)] or ["hi"]
+    repeats = max(1, 100_000 // len(local))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in local:
+            smalltalk_reply(text)
+    per_turn_us = (time.perf_counter() - start) / (repeats * len(local)) * 1e6
+
+    total = len(turns) or 1
+    print(f"{len(turns)} turns from {path}")
+    for where in ("rules", "smalltalk", "llm"):
+        print(f"  {where:<10}: {routes[where]:5d}  ({routes[where] / total:6.1%})")
+    print(f"served locally (rules + small talk): {(routes['rules'] + routes['smalltalk']) / total:.1%}")
+    print(f"small-talk classes: {dict(kinds.most_common())}")
+    print(f"small-talk reply time: {per_turn_us:.1f} us/turn")
+    if llm_examples:
+        print(f"still LLM, e.g.: {llm_examples}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -1,44 +1,161 @@
-from datetime import datetime, timedelta
+import os
+import time
+from dataclasses import replace
+from datetime import timedelta
 from SmartBudgetAI.parser import parse_message
 from SmartBudgetAI.executor import execute_intent
 from SmartBudgetAI.memory import get_active_loan_items
-from SmartBudgetAI.db import close_memory_fact, add_reminder, get_due_reminders
+from SmartBudgetAI import db
+from SmartBudgetAI.db import close_memory_fact
+from SmartBudgetAI.entity_index import find_entity_in_text, normalize, search_entities, unambiguous
+from SmartBudgetAI.reminder_scheduler import get_scheduler
 from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.intent_classifier import classify_intent
+from SmartBudgetAI.llm_client import llm_deadline
+from SmartBudgetAI.smalltalk import smalltalk_reply
+from SmartBudgetAI.session_store import STATE_IDLE, get_session_store, is_idle
+from SmartBudgetAI.speculation import Speculation
 # Import the new functions from your updated llm_fallback
-from SmartBudgetAI.llm_fallback import llm_fallback_parse, chat_with_persona
+from SmartBudgetAI.llm_fallback import llm_fallback_parse, chat_with_persona, stream_persona
 
-SESSION_CONTEXT = {}
-
-# State Constants
-STATE_IDLE = "IDLE"
+# State Constants (STATE_IDLE comes from session_store)
 STATE_CLARIFY_INTENT = "CLARIFY_INTENT"
 STATE_CONFIRM_ACTION = "CONFIRM_ACTION"
 STATE_SELECT_LOAN = "SELECT_LOAN"
 
+# Total time all LLM calls in one turn may take (parse + persona). Past it,
+# the turn finishes with the rule parser and canned replies.
+TURN_BUDGET = 20.0
+
+# When the rules are unsure, ask the LLM to parse and to chat at the same
+# time and drop whichever reply the route doesn't use: one round trip
+# instead of two on chit-chat, at the cost of a cancelled persona call on
+# money messages. Only worth it if Ollama runs requests in parallel
+# (OLLAMA_NUM_PARALLEL > 1).
+SPECULATIVE_PERSONA = os.getenv("LLM_SPECULATIVE", "0") == "1"
+
 def handle_user_message(text, user_id=1):
+    return "".join(_within_budget(_reply_parts(text, user_id, persona=lambda t: [chat_with_persona(t)])))
+
+def handle_user_message_stream(text, user_id=1):
+    """
+    Same turn as handle_user_message, yielded in pieces: the reminder
+    header and fixed text as soon as they're known, persona replies token
+    by token.
+    """
+    return _within_budget(_reply_parts(text, user_id, persona=stream_persona))
+
+def handle_user_messages(texts, user_id=1):
+    """
+    Replies to several messages from one user, in order, exactly as if they
+    had been sent one at a time, but with one session load and one reminder
+    check for the lot.
+
+    Each turn runs in its own db.lazy_transaction(), saving the session with
+    its writes. The transaction only begins at the turn's first write,
+    which comes after its LLM calls, so SQLite's write lock is held from
+    there to the commit and no longer; and since the turn's earlier reads
+    pin no snapshot, a write such as apply_repayment's BEGIN IMMEDIATE
+    can't be invalidated by another connection committing in between.
+    If a turn raises, its writes and session change are rolled back,
+    earlier turns stay committed, and fired reminders stay in the outbox
+    for the next message.
+    """
+    persona = lambda t: [chat_with_persona(t)]
+    store = get_session_store()
+    ctx = store.load(user_id)
+    replies = []
+    for text in texts:
+        was_idle = is_idle(ctx)
+        with db.lazy_transaction():
+            replies.append("".join(_within_budget(_turn(text, user_id, persona, ctx))))
+            # Last, inside the transaction: SqliteSessionStore writes ride
+            # along, and a turn that raises never reaches the store
+            if not (was_idle and is_idle(ctx)):
+                store.save(user_id, ctx)
+    header = _reminder_header(user_id)
+    if replies and header:
+        replies[0] = header + replies[0]
+    return replies
+
+def _within_budget(parts, budget=None):
+    """
+    Runs every step of the turn under one shared LLM deadline. The deadline
+    is re-entered around each next() rather than held across yields, since
+    a streaming response may resume the generator from another thread.
+    """
+    deadline = time.monotonic() + (TURN_BUDGET if budget is None else budget)
+    while True:
+        with llm_deadline(deadline):
+            part = next(parts, None)
+        if part is None:
+            return
+        yield part
+
+def _chitchat(text, persona):
+    """Small talk is answered locally; anything open-ended goes to the persona."""
+    local_reply = smalltalk_reply(text)
+    if local_reply:
+        yield local_reply
+    else:
+        yield from persona(text)
+
+def _resolve_counterparty(user_id, parsed, text):
+    """
+    Points a repayment at the user's actual counterparty: "Jon" -> "John",
+    or "alex" (lowercase, so never parsed as a name) -> "Alex". Only a
+    clear winner is taken; the confirmation question shows it either way.
+    """
+    if parsed.entity and parsed.entity != "None":
+        candidates = search_entities(user_id, parsed.entity)
+    else:
+        candidates = find_entity_in_text(user_id, text)
+    name = unambiguous(candidates)
+    return replace(parsed, entity=name) if name and name != parsed.entity else parsed
+
+
+def _reminder_header(user_id):
+    """
+    PASSIVE REMINDER CHECK (The "2 Days Ago" Logic). The scheduler has
+    already fired anything due into this user's outbox; we just drain it.
+    Reminders go out first, ahead of the answer.
+    """
+    due_reminders = get_scheduler().drain(user_id)
+    return "\n\n".join(due_reminders) + "\n\n---\n" if due_reminders else ""
+
+
+def _reply_parts(text, user_id, persona):
+    """The turn, with the user's session loaded before and saved after, however it ends."""
+    header = _reminder_header(user_id)
+    if header:
+        yield header
+
+    store = get_session_store()
+    ctx = store.load(user_id)
+    was_idle = is_idle(ctx)
+    try:
+        yield from _turn(text, user_id, persona, ctx)
+    finally:
+        # Most turns start and end idle: nothing to write
+        if not (was_idle and is_idle(ctx)):
+            store.save(user_id, ctx)
+
+
+def _turn(text, user_id, persona, ctx):
     original_text = text.strip()
     text_lower = original_text.lower()
-    
-    # ==================================================
-    # 1️⃣ PASSIVE REMINDER CHECK (The "2 Days Ago" Logic)
-    # ==================================================
-    # This runs silently every time the user messages.
-    due_reminders = get_due_reminders(user_id)
-    # If there are reminders, we prep a string to prepend to the final answer
-    reminder_text = ("\n\n".join(due_reminders) + "\n\n---\n") if due_reminders else ""
+    scheduler = get_scheduler()
 
     # ==================================================
-    # 2️⃣ CONTEXT SETUP & GLOBAL CANCEL
+    # 2️⃣ GLOBAL CANCEL
     # ==================================================
-    if user_id not in SESSION_CONTEXT:
-        SESSION_CONTEXT[user_id] = { "state": STATE_IDLE, "data": {} }
-    ctx = SESSION_CONTEXT[user_id]
     state = ctx["state"]
 
     if text_lower in ["cancel", "stop", "forget it", "nevermind"] and state != STATE_IDLE:
         ctx["state"] = STATE_IDLE
         ctx["data"] = {}
-        return reminder_text + "Bet, cancelled. 👍"
+        yield "Bet, cancelled. 👍"
+        return
 
     # ==================================================
     # 3️⃣ STATE MACHINE (The "Smart Agent" Logic)
@@ -58,14 +175,23 @@ def handle_user_message(text, user_id=1):
                 if loan["entity"].lower() in text_lower:
                     selected_loan = loan
                     break
+            else:
+                # "jon" / "alx": the closest counterparty, if only one is close
+                name = unambiguous(find_entity_in_text(user_id, original_text))
+                if name:
+                    selected_loan = next(
+                        (loan for loan in options if normalize(loan["entity"]) == normalize(name)), None
+                    )
         
         if selected_loan:
             close_memory_fact(selected_loan["id"])
             ctx["state"] = STATE_IDLE
             ctx["data"] = {}
-            return reminder_text + f"Closed the loan with {selected_loan['entity']}."
+            yield f"Closed the loan with {selected_loan['entity']}."
+            return
         else:
-            return reminder_text + "I didn't catch which one. Say 'first' or the name."
+            yield "I didn't catch which one. Say 'first' or the name."
+            return
 
     # --- B. CLARIFYING INTENT (Lent vs Received) ---
     if state == STATE_CLARIFY_INTENT:
@@ -77,13 +203,16 @@ def handle_user_message(text, user_id=1):
             pending_intent.intent = "loan_received"
         else:
             # Smart Fallback: If they chat instead of answering
-            return reminder_text + chat_with_persona(original_text) + "\n\n_(Still waiting: Did you LEND money or RECEIVE it?)_"
+            yield from _chitchat(original_text, persona)
+            yield "\n\n_(Still waiting: Did you LEND money or RECEIVE it?)_"
+            return
 
         ctx["data"]["pending_intent"] = pending_intent
         ctx["state"] = STATE_CONFIRM_ACTION
         
         action_verb = "lend" if pending_intent.intent == "loan_given" else "receive repayment from"
-        return reminder_text + f"Got it. Record that you {action_verb} {pending_intent.entity} ${pending_intent.amount:.0f}?"
+        yield f"Got it. Record that you {action_verb} {pending_intent.entity} ${pending_intent.amount:.0f}?"
+        return
 
     # --- C. SMART CONFIRMATION (Handles Yes/No AND Corrections) ---
     if state == STATE_CONFIRM_ACTION:
@@ -93,13 +222,15 @@ def handle_user_message(text, user_id=1):
             response = execute_intent(user_id, pending_intent)
             ctx["state"] = STATE_IDLE
             ctx["data"] = {}
-            return reminder_text + response
+            yield response
+            return
         
         # 2. Explicit Rejection
         elif text_lower in ["no", "nah", "nope", "wrong"]:
             ctx["state"] = STATE_IDLE
             ctx["data"] = {}
-            return reminder_text + "Cancelled. 👍"
+            yield "Cancelled. 👍"
+            return
 
         # 3. Handle Missing Name / Corrections
         pending = ctx["data"]["pending_intent"]
@@ -116,20 +247,22 @@ def handle_user_message(text, user_id=1):
             ctx["data"]["pending_intent"] = pending
             
             verb = "lend" if pending.intent == "loan_given" else "receive repayment from"
-            return reminder_text + f"Got it. Do you want to record that you {verb} **{pending.entity}** ${pending.amount:.0f}?"
+            yield f"Got it. Do you want to record that you {verb} **{pending.entity}** ${pending.amount:.0f}?"
+            return
 
         # 4. Context Switch (Chit-Chat)
         # If we are here, the user said something that isn't Yes/No/Name.
         # We answer with the persona, but KEEP THE STATE active.
-        persona_reply = chat_with_persona(original_text)
+        yield from _chitchat(original_text, persona)
         
         verb = "lend" if pending.intent == "loan_given" else "receive repayment from"
         name_display = pending.entity if pending.entity else "???"
         
-        return (
-            f"{reminder_text}{persona_reply}\n\n"
+        yield (
+            "\n\n"
             f"_(BTW, still pending: Did you {verb} **{name_display}** ${pending.amount:.0f}? Say 'Yes' or give me the name.)_"
         )
+        return
 
     # ==================================================
     # 4️⃣ NEW: "Remind Me" Command
@@ -141,11 +274,13 @@ def handle_user_message(text, user_id=1):
             days = int(days_str)
             message_body = original_text.split("to", 1)[1].strip() if "to" in original_text else "check this"
             
-            future_time = (datetime.now() + timedelta(days=days)).isoformat()
-            add_reminder(user_id, message_body, future_time)
-            return reminder_text + f"Got u. I'll remind you to **{message_body}** in {days} days. 📅"
+            future_time = (scheduler.clock() + timedelta(days=days)).isoformat()
+            scheduler.add_reminder(user_id, message_body, future_time)
         except:
             pass # Parsing failed, let LLM try or Party Mode handle it
+        else:
+            yield f"Got u. I'll remind you to **{message_body}** in {days} days. 📅"
+            return
 
     # ==================================================
     # 5️⃣ MAIN ROUTER (Idle State)
@@ -155,34 +290,57 @@ def handle_user_message(text, user_id=1):
     if "close loan" in text_lower:
         loans = get_active_loan_items(user_id)
         if not loans:
-            return reminder_text + "I don’t see any active loans to close. 🤷‍♂️"
+            yield "I don’t see any active loans to close. 🤷‍♂️"
+            return
         if len(loans) == 1:
             close_memory_fact(loans[0]["id"])
-            return reminder_text + f"Closed the loan with {loans[0]['entity']}."
+            yield f"Closed the loan with {loans[0]['entity']}."
+            return
         
         ctx["state"] = STATE_SELECT_LOAN
         ctx["data"]["loan_options"] = loans
         msg = "You have multiple active loans. Which one?\n"
         for i, loan in enumerate(loans, 1):
             msg += f"{i}. {loan['entity']} (${loan['remaining_amount']:.0f})\n"
-        return reminder_text + msg
+        yield msg
+        return
 
     # B. Try Regex (Fast)
     parsed = parse_message(original_text)
 
-    # C. Try LLM (TinyLlama) if Regex is unsure
+    # C. Small talk ("hi", "thanks", "lol"): answered locally, no LLM round trip
+    if parsed.confidence < 0.6:
+        local_reply = smalltalk_reply(original_text)
+        if local_reply:
+            yield local_reply
+            return
+
+    # D. Trained classifier (confirmed corrections); the LLM only when it's unsure
+    speculation = None
     if parsed.confidence < 0.6:
-        llm_result = llm_fallback_parse(original_text)
-        # Only trust LLM if it found a financial intent
-        if llm_result.intent in ["loan_given", "loan_received", "query_debts"]:
-            parsed = llm_result
+        fallback = classify_intent(original_text)
+        if fallback is None:
+            # Speculative: start the persona reply now, in case the parse says "party".
+            # Always the streamed persona: only a stream can be dropped mid-generation.
+            if SPECULATIVE_PERSONA and not parsed.needs_confirmation:
+                speculation = Speculation(stream_persona, original_text)
+            fallback = llm_fallback_parse(original_text)
+        # Only trust it if it found a financial intent
+        if fallback.intent in ["loan_given", "loan_received", "query_debts"]:
+            parsed = fallback
 
-    # D. Decision: Money or Party?
+    # E. Decision: Money or Party?
     # This check decides if we use Financial Logic or Persona Chat
     is_financial = (parsed.confidence > 0.6) or (getattr(parsed, "needs_confirmation", False))
     
+    if is_financial and speculation is not None:
+        speculation.cancel()
+
     if is_financial:
         # --- BUSINESS MODE 💼 ---
+        if parsed.intent == "loan_received":
+            parsed = _resolve_counterparty(user_id, parsed, original_text)
+
         if getattr(parsed, "needs_confirmation", False):
             ctx["state"] = STATE_CLARIFY_INTENT
             ctx["data"]["pending_intent"] = parsed
@@ -191,23 +349,28 @@ def handle_user_message(text, user_id=1):
                  ctx["state"] = STATE_CONFIRM_ACTION
                  # Check if we are missing the name
                  if parsed.entity is None or parsed.entity == "None":
-                     return reminder_text + f"I found the amount (${parsed.amount}), but who is this for?"
+                     yield f"I found the amount (${parsed.amount}), but who is this for?"
+                     return
                  
                  verb = "lend" if parsed.intent == "loan_given" else "receive repayment from"
-                 return reminder_text + f"Do you want to record that you {verb} {parsed.entity} ${parsed.amount:.0f}?"
+                 yield f"Do you want to record that you {verb} {parsed.entity} ${parsed.amount:.0f}?"
+                 return
             
-            return reminder_text + f"Did you lend {parsed.entity} ${parsed.amount:.0f} or did they repay you?"
+            yield f"Did you lend {parsed.entity} ${parsed.amount:.0f} or did they repay you?"
+            return
 
         # High confidence match
         if parsed.confidence >= 0.8:
             ctx["state"] = STATE_CONFIRM_ACTION
             ctx["data"]["pending_intent"] = parsed
             verb = "lend" if parsed.intent == "loan_given" else "receive repayment from"
-            return reminder_text + f"Do you want to record that you {verb} {parsed.entity} ${parsed.amount:.0f}?"
+            yield f"Do you want to record that you {verb} {parsed.entity} ${parsed.amount:.0f}?"
+            return
             
-        return reminder_text + execute_intent(user_id, parsed)
+        yield execute_intent(user_id, parsed)
+        return
 
     else:
         # --- PARTY MODE 🎉 ---
         # CRITICAL: This else block catches "Hi", "Hello", etc.
-        return reminder_text + chat_with_persona(original_text)
\ No newline at end of file
+        yield from speculation if speculation is not None else persona(original_text)
\ No newline at end of file
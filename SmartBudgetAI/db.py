@@ -1,20 +1,258 @@
+import os
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
 from datetime import date, datetime, timedelta  # Added datetime & timedelta
 
 DB_PATH = "smartbudget.db"
 
+# Applied to every new connection. WAL lets readers run while a writer
+# commits, and NORMAL sync is safe under WAL (only the last commit can be
+# lost on power failure, the file never corrupts).
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,      # negative = KiB, so ~16 MB of page cache
+    "mmap_size": 268435456,    # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,      # ms to wait on a locked DB instead of failing
+}
+
 # ==================================================
-# INITIALIZATION
+# CONNECTION MANAGER
 # ==================================================
-def ensure_table():
-    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# One long-lived connection per (thread, DB_PATH). sqlite3 connections are
+# not safe to share between threads mid-transaction, so each thread gets its
+# own and keeps it for the life of the process.
+_local = threading.local()
+_pool_lock = threading.Lock()
+_open_connections = []
+_generation = 0
+
+
+def _open_connection(path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # isolation_level=None: we issue BEGIN/COMMIT ourselves in transaction()
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def _thread_state():
+    # Reset the cache after fork() or close_connections(); inherited
+    # connections must never be reused.
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid or getattr(_local, "generation", None) != _generation:
+        _local.pid = pid
+        _local.generation = _generation
+        _local.conns = {}
+        _local.depth = {}
+        _local.touched = {}
+        _local.on_commit = {}
+        _local.unbegun = {}
+        _local.immediate = {}
+        _local.changes = {}
+    return _local
+
+
+def get_connection():
+    """Returns this thread's pooled connection to DB_PATH, opening it on first use."""
+    state = _thread_state()
+    conn = state.conns.get(DB_PATH)
+    if conn is None:
+        conn = _open_connection(DB_PATH)
+        migrate(conn)
+        state.conns[DB_PATH] = conn
+        with _pool_lock:
+            _open_connections.append(conn)
+    return conn
+
+
+def close_connections():
+    """Closes every pooled connection (all threads). Used on shutdown and in tests."""
+    global _generation
+    with _pool_lock:
+        _generation += 1
+        for conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _open_connections.clear()
+
+
+@contextmanager
+def transaction(immediate=False):
+    """
+    Runs the block in a single transaction on the pooled connection.
+    Commits on success, rolls back on error. Nested calls become savepoints,
+    so helpers can open their own transaction inside a caller's.
+
+    `immediate=True` takes the write lock up front (BEGIN IMMEDIATE), so
+    the block's reads can't be invalidated by another writer before its
+    writes. Nested, that only holds if the outer transaction is immediate
+    too or has already written (and so already has the lock); inside a
+    deferred one that hasn't, it raises sqlite3.ProgrammingError rather
+    than quietly becoming a plain savepoint. lazy_transaction() is the
+    outer block that lets such helpers nest.
+    """
+    conn = get_connection()
+    state = _thread_state()
+    depth = state.depth.get(DB_PATH, 0)
+
+    if depth == 0 or state.unbegun.pop(DB_PATH, False):
+        # (or the first write inside a lazy_transaction(): the real one starts here)
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        state.immediate[DB_PATH] = immediate
+        state.changes[DB_PATH] = conn.total_changes
+    elif immediate and not state.immediate[DB_PATH] and conn.total_changes == state.changes[DB_PATH]:
+        raise sqlite3.ProgrammingError(
+            "transaction(immediate=True) inside a deferred transaction that hasn't written: "
+            "open the outer one with immediate=True, or use lazy_transaction()"
+        )
+    if depth > 0:
+        conn.execute(f"SAVEPOINT sp_{depth}")
+
+    callbacks = state.on_commit.setdefault(DB_PATH, [])
+    registered = len(callbacks)
+    state.depth[DB_PATH] = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        if depth == 0:
+            _rollback(conn, state)
+        else:
+            # Whatever the rolled-back block asked to run after commit never happened
+            del callbacks[registered:]
+            conn.execute(f"ROLLBACK TO sp_{depth}")
+            conn.execute(f"RELEASE sp_{depth}")
+        raise
+    else:
+        if depth == 0:
+            _commit(conn, state)
+        else:
+            conn.execute(f"RELEASE sp_{depth}")
+    finally:
+        state.depth[DB_PATH] = depth
+
+
+@contextmanager
+def lazy_transaction():
+    """
+    Like transaction(), but BEGIN waits for the first transaction() inside
+    the block and takes that call's `immediate`. Reads before it run in
+    autocommit and pin no snapshot, so a helper's BEGIN IMMEDIATE still
+    locks before its own lookup; from there to the end of the block, every
+    write commits or rolls back together. A block that never writes runs
+    no transaction at all. Inside an open transaction it is just a savepoint.
+    """
+    state = _thread_state()
+    if state.depth.get(DB_PATH, 0):
+        with transaction() as conn:
+            yield conn
+        return
+
+    conn = get_connection()
+    state.depth[DB_PATH] = 1
+    state.unbegun[DB_PATH] = True
+    try:
+        yield conn
+    except BaseException:
+        _rollback(conn, state)
+        raise
+    else:
+        _commit(conn, state)
+    finally:
+        state.depth[DB_PATH] = 0
+        state.unbegun.pop(DB_PATH, None)
+
+
+def _commit(conn, state):
+    if conn.in_transaction:
+        try:
+            conn.execute("COMMIT")
+        except BaseException:
+            # A failed COMMIT (deferred constraint, I/O error, SQLITE_BUSY)
+            # leaves the transaction open: end it, or this thread's next
+            # BEGIN fails and its callbacks fire on someone else's commit
+            _rollback(conn, state)
+            raise
+    _bump_data_versions(state.touched.pop(DB_PATH, ()))
+    for callback in state.on_commit.pop(DB_PATH, ()):
+        callback()
+
+
+def _rollback(conn, state):
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+    state.touched.pop(DB_PATH, None)
+    state.on_commit.pop(DB_PATH, None)
+
+
+def after_commit(callback):
+    """
+    Calls `callback()` once the current transaction() commits, or right away
+    outside one. Dropped if the transaction (or the savepoint it was
+    registered in) rolls back: for in-memory state that must only reflect
+    committed rows.
+    """
+    state = _thread_state()
+    if state.depth.get(DB_PATH, 0):
+        state.on_commit.setdefault(DB_PATH, []).append(callback)
+    else:
+        callback()
+
+
+# ==================================================
+# DATA VERSIONS
+# ==================================================
+# A per-user counter, bumped after every committed write to that user's
+# expenses, memory facts or reminders. Anything derived from a user's rows
+# (entity_index, HTTP ETags) stays valid while it is unchanged, and reading
+# it never touches SQLite. It lives in this process: writes made by another
+# process to the same DB file are not seen.
+_data_versions = {}
+_versions_lock = threading.Lock()
+ALL_USERS = "*"
+
+
+def data_version(user_id):
+    """Current data version of `user_id` in DB_PATH (0 until its first write)."""
+    versions = _data_versions
+    return versions.get((DB_PATH, user_id), 0) + versions.get((DB_PATH, ALL_USERS), 0)
+
+
+def _touch(*user_ids):
+    """
+    Marks users as written by the current transaction(); their versions are
+    bumped once it commits, so a reader never caches pre-commit rows under
+    the new version. ALL_USERS bumps everyone.
+    """
+    _thread_state().touched.setdefault(DB_PATH, set()).update(user_ids)
+
+
+def _bump_data_versions(user_ids):
+    with _versions_lock:
+        for user_id in user_ids:
+            key = (DB_PATH, user_id)
+            _data_versions[key] = _data_versions.get(key, 0) + 1
+
 
-    # 1. Expenses Table (Existing)
-    cursor.execute("""
+# ==================================================
+# INITIALIZATION (SCHEMA MIGRATIONS)
+# ==================================================
+# Each entry moves the schema up one PRAGMA user_version. Never edit an
+# applied migration; append a new one instead.
+MIGRATIONS = [
+    # 1. Base tables (what ensure_table() used to create on every call)
+    [
+        """
         CREATE TABLE IF NOT EXISTS expenses (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
@@ -22,11 +260,9 @@ def ensure_table():
             category TEXT,
             amount REAL,
             note TEXT
-        );
-    """)
-
-    # 2. Memory Facts Table (Existing)
-    cursor.execute("""
+        )
+        """,
+        """
         CREATE TABLE IF NOT EXISTS memory_facts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
@@ -41,11 +277,9 @@ def ensure_table():
             status TEXT DEFAULT 'active',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             closed_at TEXT
-        );
-    """)
-
-    # 3. NEW: Reminders Table (For the "Passive Check")
-    cursor.execute("""
+        )
+        """,
+        """
         CREATE TABLE IF NOT EXISTS reminders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
@@ -53,36 +287,168 @@ def ensure_table():
             remind_at TEXT,
             created_at TEXT,
             status TEXT DEFAULT 'pending'
-        );
-    """)
+        )
+        """,
+    ],
+    # 2. Indexes matching the hot query shapes
+    [
+        "CREATE INDEX IF NOT EXISTS idx_memory_facts_user_status_type "
+        "ON memory_facts (user_id, status, memory_type)",
+        # get_loan_by_entity filters on lower(entity)
+        "CREATE INDEX IF NOT EXISTS idx_memory_facts_user_entity "
+        "ON memory_facts (user_id, lower(entity))",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_user_status_time "
+        "ON reminders (user_id, status, remind_at)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date "
+        "ON expenses (user_id, date)",
+    ],
+    # 3. Materialized per-counterparty loan balances (see LOAN BALANCES)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS loan_balances (
+            user_id INTEGER NOT NULL,
+            entity TEXT NOT NULL,
+            remaining_amount REAL NOT NULL DEFAULT 0,
+            loan_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, entity)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT OR REPLACE INTO loan_balances (user_id, entity, remaining_amount, loan_count)
+        SELECT user_id, COALESCE(entity, ''), SUM(COALESCE(remaining_amount, 0)), COUNT(*)
+        FROM memory_facts
+        WHERE memory_type = 'loan' AND status = 'active'
+        GROUP BY user_id, COALESCE(entity, '')
+        """,
+    ],
+    # 4. Cross-user pending reminder scan (reminder_scheduler start-up load)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_reminders_status_time "
+        "ON reminders (status, remind_at)",
+    ],
+    # 5. Cross-user due-date range scan (reminder_engine.sweep_due_loans)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_memory_facts_due "
+        "ON memory_facts (due_date) WHERE status = 'active' AND due_date IS NOT NULL",
+    ],
+    # 6. On-disk level of the LLM parse cache (llm_cache.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)",
+    ],
+    # 7. Conversation state shared by every worker (session_store.py)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            user_id INTEGER PRIMARY KEY,
+            payload BLOB NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)",
+    ],
+    # 8. Keyset pages of memory facts in (created_at, id) order, so a page
+    #    is an index range scan rather than a sort of the user's history
+    [
+        # One type: active loans
+        "CREATE INDEX IF NOT EXISTS idx_memory_facts_user_type_created "
+        "ON memory_facts (user_id, memory_type, created_at, id)",
+        # Several types (loan history): IN over the index above would sort
+        "CREATE INDEX IF NOT EXISTS idx_memory_facts_user_created "
+        "ON memory_facts (user_id, created_at, id)",
+    ],
+]
 
-    conn.commit()
-    conn.close()
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Applies any pending MIGRATIONS. Cheap no-op once the DB is current."""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock: another process may have just migrated.
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def ensure_table():
+    """Kept for callers that want the schema up front; migrations run on connect anyway."""
+    migrate(get_connection())
 
 
 # ==================================================
-# EXPENSES
+# PAGED READS
 # ==================================================
-def add_expense(user_id, date_str, category, amount, note):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+# Keyset pagination for the REST API: rows come ordered by (date, id) and
+# a page resumes strictly after the last row's (date, id), so pages stay
+# stable while rows are added and never cost an OFFSET scan.
+PAGE_SIZE = 50
 
-    cur.execute(
-        """
-        INSERT INTO expenses (user_id, date, category, amount, note)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (user_id, date_str, category, float(amount), note)
-    )
+# Columns callers may ask for (never user_id: the caller already knows it)
+EXPENSE_FIELDS = ("id", "date", "category", "amount", "note")
+MEMORY_FACT_FIELDS = (
+    "id", "memory_type", "entity", "amount", "remaining_amount", "currency",
+    "event_date", "due_date", "description", "status", "created_at", "closed_at",
+)
+REMINDER_FIELDS = ("id", "message", "remind_at", "created_at")
+
+
+def _select_list(columns, allowed, date_column):
+    """SQL select list for `columns`, plus the cursor columns; ValueError on unknown names."""
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields {unknown}, expected some of {list(allowed)}")
+    return ", ".join(dict.fromkeys([*columns, "id", date_column]))
 
-    conn.commit()
-    conn.close()
+
+def _keyset(query, params, date_column, after=None, limit=None, descending=False):
+    """Adds the resume-after-cursor condition, the (date, id) order and LIMIT."""
+    params = list(params)
+    if after is not None:
+        query += f" AND ({date_column}, id) {'<' if descending else '>'} (?, ?)"
+        params.extend(after)
+    direction = " DESC" if descending else ""
+    query += f" ORDER BY {date_column}{direction}, id{direction}"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+# ==================================================
+# EXPENSES
+# ==================================================
+def add_expense(user_id, date_str, category, amount, note):
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO expenses (user_id, date, category, amount, note)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (user_id, date_str, category, float(amount), note)
+        )
+        _touch(user_id)
 
 
 def get_expenses(user_id):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
 
     df = pd.read_sql_query(
         """
@@ -95,10 +461,108 @@ def get_expenses(user_id):
         params=(user_id,)
     )
 
-    conn.close()
     return df
 
 
+# Streaming / columnar reads: bounded by date so long-lived users never
+# pull their whole history just to summarize the last few months.
+EXPENSE_CHUNK_SIZE = 10000
+
+
+def _expense_range_query(columns, user_id, start=None, end=None, after=None, limit=None, descending=False):
+    query = f"SELECT {columns} FROM expenses WHERE user_id = ?"
+    params = [user_id]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(str(start))
+    if end is not None:
+        query += " AND date <= ?"
+        params.append(str(end))
+    return _keyset(query, params, "date", after, limit, descending)
+
+
+def iter_expenses(user_id, start=None, end=None, chunk_size=EXPENSE_CHUNK_SIZE):
+    """
+    Yields the user's expenses as DataFrame chunks of at most `chunk_size`
+    rows, oldest first. `start` / `end` are inclusive ISO dates.
+    """
+    query, params = _expense_range_query("id, date, category, amount, note", user_id, start, end)
+    yield from pd.read_sql_query(query, get_connection(), params=params, chunksize=chunk_size)
+
+
+def get_expenses_page(user_id, columns=None, after=None, limit=PAGE_SIZE, start=None, end=None):
+    """
+    Up to `limit` expenses as dicts, newest first, starting after the
+    (date, id) cursor `after`. `columns` picks from EXPENSE_FIELDS.
+    """
+    select = _select_list(columns or EXPENSE_FIELDS, EXPENSE_FIELDS, "date")
+    query, params = _expense_range_query(select, user_id, start, end, after, limit, descending=True)
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+    return [dict(r) for r in cur.execute(query, params)]
+
+
+@dataclass
+class ExpenseColumns:
+    """Expenses as compact NumPy columns (see get_expenses_columnar)."""
+    id: np.ndarray              # int64
+    date: np.ndarray            # datetime64[D]
+    category_codes: np.ndarray  # int32 index into `categories`
+    categories: list
+    amount: np.ndarray          # float32
+
+    def __len__(self):
+        return len(self.id)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "id": self.id,
+            "date": self.date,
+            "category": pd.Categorical.from_codes(self.category_codes, self.categories),
+            "amount": self.amount,
+        })
+
+
+def get_expenses_columnar(user_id, start=None, end=None, chunk_size=EXPENSE_CHUNK_SIZE):
+    """
+    Reads expenses in a date range straight into NumPy arrays, skipping the
+    per-row Python objects a DataFrame of strings would keep alive.
+    """
+    query, params = _expense_range_query("id, date, category, amount", user_id, start, end)
+    cur = get_connection().execute(query, params)
+
+    codes_by_category = {}
+    ids, dates, codes, amounts = [], [], [], []
+
+    def _code(category):
+        # -1 is the Categorical code for "missing"
+        if category is None:
+            return -1
+        return codes_by_category.setdefault(category, len(codes_by_category))
+
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        ids.append(np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)))
+        # The schema allows NULL dates and amounts: NaT and NaN, like pandas
+        dates.append(np.array([r[1][:10] if r[1] is not None else "NaT" for r in rows], dtype="datetime64[D]"))
+        codes.append(np.fromiter((_code(r[2]) for r in rows), dtype=np.int32, count=len(rows)))
+        amounts.append(np.fromiter((r[3] if r[3] is not None else np.nan for r in rows),
+                                   dtype=np.float32, count=len(rows)))
+
+    def _join(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return ExpenseColumns(
+        id=_join(ids, np.int64),
+        date=_join(dates, "datetime64[D]"),
+        category_codes=_join(codes, np.int32),
+        categories=list(codes_by_category),
+        amount=_join(amounts, np.float32),
+    )
+
+
 # ==================================================
 # MEMORY FACTS (LOW LEVEL)
 # ==================================================
@@ -112,69 +576,205 @@ def add_memory_fact(
     due_date=None,
     description=None
 ):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Default remaining_amount to amount if not provided
-    cur.execute("""
-        INSERT INTO memory_facts (
+    with transaction() as conn:
+        # Default remaining_amount to amount if not provided
+        conn.execute("""
+            INSERT INTO memory_facts (
+                user_id,
+                memory_type,
+                entity,
+                amount,
+                remaining_amount,
+                currency,
+                event_date,
+                due_date,
+                description
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
             user_id,
             memory_type,
             entity,
             amount,
-            remaining_amount,
+            amount,
             currency,
             event_date,
             due_date,
             description
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        memory_type,
-        entity,
-        amount,
-        amount,
-        currency,
-        event_date,
-        due_date,
-        description
-    ))
-
-    conn.commit()
-    conn.close()
-
-
-def get_memory_facts(user_id, memory_type=None, active_only=False):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    query = "SELECT * FROM memory_facts WHERE user_id = ?"
+        ))
+        _touch(user_id)
+        if memory_type == LOAN_TYPE:
+            _adjust_loan_balances(conn, [(user_id, entity, amount, 1)])
+
+
+def get_memory_facts(user_id, memory_type=None, active_only=False, outstanding_only=False,
+                     columns=None, after=None, limit=None):
+    """
+    The user's memory facts as dicts. `memory_type` is one type or a tuple
+    of them. `columns`, `after` and `limit` page through the facts newest
+    first (see PAGED READS); without them, every column of every match.
+    """
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    select = _select_list(columns, MEMORY_FACT_FIELDS, "created_at") if columns else "*"
+    query = f"SELECT {select} FROM memory_facts WHERE user_id = ?"
     params = [user_id]
 
-    if memory_type:
+    if isinstance(memory_type, (tuple, list)):
+        query += f" AND memory_type IN ({', '.join('?' * len(memory_type))})"
+        params.extend(memory_type)
+    elif memory_type:
         query += " AND memory_type = ?"
         params.append(memory_type)
 
     if active_only:
         query += " AND status = 'active'"
 
+    if outstanding_only:
+        query += " AND remaining_amount > 0"
+
+    if after is not None or limit is not None:
+        query, params = _keyset(query, params, "created_at", after, limit, descending=True)
+
     cur.execute(query, params)
-    rows = [dict(r) for r in cur.fetchall()]
+    return [dict(r) for r in cur.fetchall()]
+
+
+# ==================================================
+# BULK WRITES (IMPORTS)
+# ==================================================
+BULK_CHUNK_SIZE = 5000
+
+EXPENSE_COLUMNS = ("date", "category", "amount", "note")
+MEMORY_FACT_COLUMNS = (
+    "memory_type", "entity", "amount", "currency",
+    "event_date", "due_date", "description"
+)
+MEMORY_FACT_DEFAULTS = {"currency": "USD"}
+
+
+def _iter_records(rows, columns, defaults=None):
+    """
+    Normalizes bulk input to tuples in `columns` order.
+    Accepts a DataFrame, or any iterable (generators included) of dicts
+    or of sequences given positionally in `columns` order.
+    """
+    defaults = defaults or {}
+
+    if isinstance(rows, pd.DataFrame):
+        frame = rows.reindex(columns=list(columns))
+        for name in frame.columns:
+            if pd.api.types.is_datetime64_any_dtype(frame[name]):
+                frame[name] = frame[name].dt.strftime("%Y-%m-%d")
+        for name, value in defaults.items():
+            frame[name] = frame[name].fillna(value)
+        # NaN -> None so SQLite stores NULL
+        frame = frame.astype(object).where(frame.notna(), None)
+        yield from frame.itertuples(index=False, name=None)
+        return
+
+    for row in rows:
+        if isinstance(row, dict):
+            yield tuple(row.get(c, defaults.get(c)) for c in columns)
+        else:
+            row = tuple(row)
+            padded = row + tuple(defaults.get(c) for c in columns[len(row):])
+            yield padded[:len(columns)]
+
+
+def _insert_chunks(sql, params, chunk_size, on_chunk=None, user_id=None):
+    """
+    executemany() over `params` in chunks, all inside one transaction.
+    Returns the inserted id ranges. AUTOINCREMENT ids are contiguous while
+    we hold the write lock, so each chunk is last_insert_rowid() - n + 1 .. last.
+    `on_chunk(conn, chunk)` runs after each chunk, in the same transaction.
+    `user_id` gets its data version bumped on commit.
+    """
+    ranges = []
+    params = iter(params)
+
+    with transaction(immediate=True) as conn:
+        if user_id is not None:
+            _touch(user_id)
+        while True:
+            chunk = list(islice(params, chunk_size))
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            if on_chunk:
+                on_chunk(conn, chunk)
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first_id = last_id - len(chunk) + 1
+
+            if ranges and ranges[-1].stop == first_id:
+                ranges[-1] = range(ranges[-1].start, last_id + 1)
+            else:
+                ranges.append(range(first_id, last_id + 1))
+
+    return ranges
 
-    conn.close()
-    return rows
+
+def add_expenses_bulk(user_id, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Inserts many expenses in a single transaction.
+    `rows`: DataFrame or iterable of dicts / (date, category, amount, note) tuples.
+    Returns a list of id ranges, e.g. [range(1, 100001)].
+    """
+    params = (
+        (user_id, d, category, float(amount), note)
+        for d, category, amount, note in _iter_records(rows, EXPENSE_COLUMNS)
+    )
+    return _insert_chunks(
+        """
+        INSERT INTO expenses (user_id, date, category, amount, note)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        params,
+        chunk_size,
+        user_id=user_id
+    )
+
+
+def add_memory_facts_bulk(user_id, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Inserts many memory facts in a single transaction.
+    `rows`: DataFrame or iterable of dicts / tuples in MEMORY_FACT_COLUMNS order
+    (missing trailing fields default to None, currency to USD).
+    Returns a list of id ranges.
+    """
+    params = (
+        (user_id, memory_type, entity, amount, amount, currency, event_date, due_date, description)
+        for memory_type, entity, amount, currency, event_date, due_date, description
+        in _iter_records(rows, MEMORY_FACT_COLUMNS, MEMORY_FACT_DEFAULTS)
+    )
+    return _insert_chunks(
+        """
+        INSERT INTO memory_facts (
+            user_id, memory_type, entity, amount, remaining_amount,
+            currency, event_date, due_date, description
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        params,
+        chunk_size,
+        on_chunk=_track_bulk_loans,
+        user_id=user_id
+    )
+
+
+def _track_bulk_loans(conn, chunk):
+    # chunk rows: (user_id, memory_type, entity, amount, ...)
+    _adjust_loan_balances(conn, [
+        (row[0], row[2], row[3], 1) for row in chunk if row[1] == LOAN_TYPE
+    ])
 
 
 # ==================================================
 # LOANS (HIGH LEVEL)
 # ==================================================
 def get_active_loans(user_id):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
 
     df = pd.read_sql_query("""
         SELECT id, memory_type, entity, remaining_amount, currency, due_date
@@ -184,15 +784,12 @@ def get_active_loans(user_id):
           AND memory_type IN ('loan_given', 'loan_received')
     """, conn, params=(user_id,))
 
-    conn.close()
     return df
 
 
 def get_active_loan_items(user_id):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("""
         SELECT id, entity, remaining_amount, memory_type
@@ -202,49 +799,60 @@ def get_active_loan_items(user_id):
           AND memory_type IN ('loan_given', 'loan_received')
     """, (user_id,))
 
-    loans = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return loans
+    return [dict(row) for row in cur.fetchall()]
 
 
 # ==================================================
 # UPDATES & CLOSING
 # ==================================================
-def close_memory_fact(memory_id):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+def _active_loan_row(conn, memory_id):
+    row = conn.execute("""
+        SELECT user_id, entity, remaining_amount
+        FROM memory_facts
+        WHERE id = ? AND memory_type = ? AND status = 'active'
+    """, (memory_id, LOAN_TYPE)).fetchone()
+    return row
 
-    cur.execute("""
-        UPDATE memory_facts
-        SET status = 'closed',
-            remaining_amount = 0,
-            closed_at = ?
-        WHERE id = ?
-    """, (date.today().isoformat(), memory_id))
 
-    conn.commit()
-    conn.close()
+def _touch_fact(conn, memory_id):
+    owner = conn.execute("SELECT user_id FROM memory_facts WHERE id = ?", (memory_id,)).fetchone()
+    if owner:
+        _touch(owner[0])
 
 
-def update_remaining(memory_id, new_amount):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+def close_memory_fact(memory_id):
+    with transaction(immediate=True) as conn:
+        _touch_fact(conn, memory_id)
+        loan = _active_loan_row(conn, memory_id)
+        conn.execute("""
+            UPDATE memory_facts
+            SET status = 'closed',
+                remaining_amount = 0,
+                closed_at = ?
+            WHERE id = ?
+        """, (date.today().isoformat(), memory_id))
+        if loan:
+            user_id, entity, remaining = loan
+            _adjust_loan_balances(conn, [(user_id, entity, -(remaining or 0), -1)])
 
-    cur.execute("""
-        UPDATE memory_facts
-        SET remaining_amount = ?
-        WHERE id = ?
-    """, (new_amount, memory_id))
 
-    conn.commit()
-    conn.close()
+def update_remaining(memory_id, new_amount):
+    with transaction(immediate=True) as conn:
+        _touch_fact(conn, memory_id)
+        loan = _active_loan_row(conn, memory_id)
+        conn.execute("""
+            UPDATE memory_facts
+            SET remaining_amount = ?
+            WHERE id = ?
+        """, (new_amount, memory_id))
+        if loan:
+            user_id, entity, remaining = loan
+            _adjust_loan_balances(conn, [(user_id, entity, new_amount - (remaining or 0), 0)])
 
 
 def get_loan_by_entity(user_id, entity_name):
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("""
         SELECT id, entity, remaining_amount, amount
@@ -258,63 +866,285 @@ def get_loan_by_entity(user_id, entity_name):
     """, (user_id, entity_name.lower()))
 
     row = cur.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
+# ==================================================
+# LOAN BALANCES (MATERIALIZED)
+# ==================================================
+# loan_balances holds one row per (user, counterparty) with the summed
+# remaining_amount and number of active loans. Every write path that touches
+# an active loan adjusts it in the same transaction, so debt queries read
+# O(active counterparties) rows instead of the user's whole history.
+# Rows are dropped once a counterparty has no active loans left.
+LOAN_TYPE = "loan"
+REPAYMENT_TYPE = "repayment"
+
+
+def _adjust_loan_balances(conn, deltas):
+    """deltas: iterable of (user_id, entity, amount_delta, count_delta)."""
+    merged = {}
+    for user_id, entity, amount, count in deltas:
+        key = (user_id, entity or "")
+        prev_amount, prev_count = merged.get(key, (0.0, 0))
+        merged[key] = (prev_amount + (amount or 0), prev_count + count)
+    if not merged:
+        return
+
+    conn.executemany("""
+        INSERT INTO loan_balances (user_id, entity, remaining_amount, loan_count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, entity) DO UPDATE SET
+            remaining_amount = remaining_amount + excluded.remaining_amount,
+            loan_count = loan_count + excluded.loan_count
+    """, [(u, e, a, c) for (u, e), (a, c) in merged.items()])
+    conn.executemany("""
+        DELETE FROM loan_balances
+        WHERE user_id = ? AND entity = ? AND loan_count <= 0
+    """, list(merged))
+
+
+def get_loan_balances(user_id):
+    """Outstanding total and active loan count per counterparty, largest first."""
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute("""
+        SELECT entity, remaining_amount, loan_count
+        FROM loan_balances
+        WHERE user_id = ?
+          AND remaining_amount > 0
+        ORDER BY remaining_amount DESC
+    """, (user_id,))
+
+    return [dict(row) for row in cur.fetchall()]
+
+
+def _expected_loan_balances(conn):
+    rows = conn.execute("""
+        SELECT user_id, COALESCE(entity, ''), SUM(COALESCE(remaining_amount, 0)), COUNT(*)
+        FROM memory_facts
+        WHERE memory_type = ? AND status = 'active'
+        GROUP BY user_id, COALESCE(entity, '')
+    """, (LOAN_TYPE,))
+    return {(u, e): (amount, count) for u, e, amount, count in rows}
+
+
+def check_loan_balances(tolerance=1e-6):
+    """
+    Consistency check: recomputes every balance from memory_facts and diffs
+    it against loan_balances. Returns a list of mismatches (empty = healthy),
+    each {"user_id", "entity", "expected", "actual"} with (amount, count) pairs.
+    """
+    with transaction() as conn:
+        expected = _expected_loan_balances(conn)
+        actual = {
+            (u, e): (amount, count)
+            for u, e, amount, count in conn.execute(
+                "SELECT user_id, entity, remaining_amount, loan_count FROM loan_balances"
+            )
+        }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=repr):
+        exp = expected.get(key)
+        act = actual.get(key)
+        if exp and act and exp[1] == act[1] and abs(exp[0] - act[0]) <= tolerance:
+            continue
+        mismatches.append({"user_id": key[0], "entity": key[1], "expected": exp, "actual": act})
+    return mismatches
+
+
+def rebuild_loan_balances():
+    """Throws away loan_balances and recomputes it from memory_facts."""
+    with transaction(immediate=True) as conn:
+        expected = _expected_loan_balances(conn)
+        _touch(ALL_USERS)
+        conn.execute("DELETE FROM loan_balances")
+        conn.executemany(
+            "INSERT INTO loan_balances (user_id, entity, remaining_amount, loan_count) VALUES (?, ?, ?, ?)",
+            [(u, e, amount, count) for (u, e), (amount, count) in expected.items()]
+        )
+
+
+# ==================================================
+# REPAYMENTS (ATOMIC)
+# ==================================================
+def apply_repayment(user_id, entity, amount):
+    """
+    Applies a repayment from `entity` in one BEGIN IMMEDIATE transaction:
+    looks up their active loans (oldest first), pays each down, closes the
+    ones that reach zero, records the repayment fact and adjusts
+    loan_balances. Money beyond the total owed is reported as `overpaid`.
+
+    Returns None if the user has no active loan with `entity`, otherwise
+    {"entity", "paid", "applied", "overpaid", "remaining", "closed_ids",
+     "loans": [{"id", "remaining_amount"}, ...]}.
+    """
+    today = date.today().isoformat()
+
+    with transaction(immediate=True) as conn:
+        rows = conn.execute("""
+            SELECT id, entity, remaining_amount
+            FROM memory_facts
+            WHERE user_id = ?
+              AND memory_type = ?
+              AND status = 'active'
+              AND lower(entity) = ?
+            ORDER BY created_at ASC, id ASC
+        """, (user_id, LOAN_TYPE, entity.lower())).fetchall()
+
+        if not rows:
+            return None
+
+        _touch(user_id)
+        left = float(amount)
+        loans, closed_ids, updates, deltas = [], [], [], []
+        for loan_id, name, remaining in rows:
+            remaining = remaining or 0.0
+            pay = min(left, remaining)
+            left -= pay
+            new_remaining = remaining - pay
+
+            if new_remaining <= 0:
+                closed_ids.append(loan_id)
+                deltas.append((user_id, name, -remaining, -1))
+            elif pay > 0:
+                updates.append((new_remaining, loan_id))
+                deltas.append((user_id, name, -pay, 0))
+            loans.append({"id": loan_id, "remaining_amount": max(new_remaining, 0.0)})
+
+        conn.executemany(
+            "UPDATE memory_facts SET remaining_amount = ? WHERE id = ?", updates
+        )
+        conn.executemany("""
+            UPDATE memory_facts
+            SET status = 'closed', remaining_amount = 0, closed_at = ?
+            WHERE id = ?
+        """, [(today, loan_id) for loan_id in closed_ids])
+
+        display_name = rows[0][1]
+        if closed_ids:
+            description = "Closed loan " + ", ".join(str(i) for i in closed_ids)
+        else:
+            description = "Partial payment"
+        conn.execute("""
+            INSERT INTO memory_facts (user_id, memory_type, entity, amount, remaining_amount, currency, description)
+            VALUES (?, ?, ?, ?, ?, 'USD', ?)
+        """, (user_id, REPAYMENT_TYPE, display_name, amount, amount, description))
+
+        _adjust_loan_balances(conn, deltas)
+
+    return {
+        "entity": display_name,
+        "paid": float(amount),
+        "applied": float(amount) - left,
+        "overpaid": left,
+        "remaining": sum(l["remaining_amount"] for l in loans),
+        "closed_ids": closed_ids,
+        "loans": [l for l in loans if l["id"] not in closed_ids],
+    }
+
+
 # ==================================================
 # NEW: PASSIVE REMINDERS
 # ==================================================
-def add_reminder(user_id, message, remind_at):
-    """Stores a new reminder."""
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    created_at = datetime.now().isoformat()
-    c.execute("INSERT INTO reminders (user_id, message, remind_at, created_at) VALUES (?, ?, ?, ?)",
-              (user_id, message, remind_at, created_at))
-    conn.commit()
-    conn.close()
+def add_reminder(user_id, message, remind_at, created_at=None):
+    """Stores a new reminder and returns its id."""
+    created_at = created_at or datetime.now().isoformat()
+    with transaction() as conn:
+        cur = conn.execute("INSERT INTO reminders (user_id, message, remind_at, created_at) VALUES (?, ?, ?, ?)",
+                           (user_id, message, remind_at, created_at))
+        _touch(user_id)
+    return cur.lastrowid
+
+
+def get_pending_reminders(user_id=None, after=None, limit=None, columns=None):
+    """
+    Pending reminders as (id, user_id, message, remind_at, created_at),
+    soonest first: across users for the scheduler, or one user's, paged
+    by the (remind_at, id) cursor `after`. With `columns` (some of
+    REMINDER_FIELDS), dicts of just those instead.
+    """
+    select = _select_list(columns, REMINDER_FIELDS, "remind_at") if columns else \
+        "id, user_id, message, remind_at, created_at"
+    query = f"SELECT {select} FROM reminders WHERE status = 'pending'"
+    params = []
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params.append(user_id)
+    if after is None and limit is None:
+        query += " ORDER BY remind_at"
+    else:
+        query, params = _keyset(query, params, "remind_at", after, limit, descending=False)
+
+    cur = get_connection().cursor()
+    if columns:
+        cur.row_factory = sqlite3.Row
+        return [dict(r) for r in cur.execute(query, params)]
+    return cur.execute(query, params).fetchall()
+
+
+def claim_reminders(reminder_ids, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Marks the given reminders 'sent' and returns the ids that were still
+    pending, so a reminder is only ever delivered once even if two
+    processes race for it. One transaction, one UPDATE per `chunk_size`
+    ids: a backlog after downtime can't outgrow SQLite's variable limit.
+    """
+    reminder_ids = iter(reminder_ids)
+    claimed, users = set(), set()
+    with transaction() as conn:
+        while chunk := list(islice(reminder_ids, chunk_size)):
+            rows = conn.execute(f"""
+                UPDATE reminders SET status = 'sent'
+                WHERE id IN ({", ".join("?" * len(chunk))}) AND status = 'pending'
+                RETURNING id, user_id
+            """, chunk).fetchall()
+            claimed.update(r[0] for r in rows)
+            users.update(r[1] for r in rows)
+        _touch(*users)
+    return claimed
+
+
+def format_due_reminder(message, created_at_str, now=None):
+    """Human-friendly reminder line with a "time ago" relative to `now`."""
+    now = now or datetime.now()
+    created_dt = datetime.fromisoformat(created_at_str)
+    delta = now - created_dt
+
+    if delta.days == 0:
+        time_str = "earlier today"
+    elif delta.days == 1:
+        time_str = "yesterday"
+    else:
+        time_str = f"{delta.days} days ago"
+
+    return f"🔔 **Reminder:** {time_str} you asked me to remind you: _{message}_"
+
 
 def get_due_reminders(user_id):
     """
     Checks if any reminders are due right now.
     Returns a list of formatted strings and marks them as 'sent'.
+    (The chat path uses reminder_scheduler instead of polling this.)
     """
-    ensure_table()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    now = datetime.now().isoformat()
-    
+    now = datetime.now()
+    cur = get_connection().cursor()
     # Find pending reminders where time <= now
-    c.execute("SELECT id, message, created_at FROM reminders WHERE user_id=? AND status='pending' AND remind_at <= ?", 
-              (user_id, now))
-    rows = c.fetchall()
-    
+    cur.execute("SELECT id, message, created_at FROM reminders WHERE user_id=? AND status='pending' AND remind_at <= ?",
+                (user_id, now.isoformat()))
+    rows = cur.fetchall()
+
+    claimed = claim_reminders([r[0] for r in rows])
     messages = []
-    for r in rows:
-        rem_id, msg, created_at_str = r
-        # Calculate human-friendly "Time ago"
+    for rem_id, msg, created_at_str in rows:
+        if rem_id not in claimed:
+            continue
         try:
-            created_dt = datetime.fromisoformat(created_at_str)
-            delta = datetime.now() - created_dt
-            
-            if delta.days == 0:
-                time_str = "earlier today"
-            elif delta.days == 1:
-                time_str = "yesterday"
-            else:
-                time_str = f"{delta.days} days ago"
-                
-            formatted_msg = f"🔔 **Reminder:** {time_str} you asked me to remind you: _{msg}_"
-            messages.append(formatted_msg)
-            
-            # Mark as sent
-            c.execute("UPDATE reminders SET status='sent' WHERE id=?", (rem_id,))
+            messages.append(format_due_reminder(msg, created_at_str, now))
         except Exception as e:
             print(f"Error processing reminder {rem_id}: {e}")
             continue
-            
-    conn.commit()
-    conn.close()
-    return messages
\ No newline at end of file
+
+    return messages
@@ -0,0 +1,207 @@
+# SmartBudgetAI/entity_index.py
+"""
+Fuzzy lookup of a user's active counterparties, so "Jon" finds the loan to
+"John" and a lowercase "alex" finds "Alex".
+
+Names are indexed by character trigrams (padded, so "jo" and "n" at the
+ends count). A query's trigrams pick the names sharing the most of them,
+and those are re-ranked by mixing trigram overlap (Dice) with edit
+distance: trigrams alone undersell typos in short names ("Jonh"), edit
+distance alone oversells one-letter swaps ("Sam" / "Pam").
+
+One index per user, built on first use from loan_balances and rebuilt
+when db.data_version() says the user's loans changed.
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from SmartBudgetAI import db, lexer
+
+# Below this score a name is not offered at all
+MIN_SCORE = 0.55
+# A match is taken without asking only if it beats the runner-up by this much
+MARGIN = 0.1
+# Names re-ranked by edit distance after the trigram pass
+RERANK = 10
+# Users whose index stays in memory
+MAX_INDEXES = 1024
+
+
+def normalize(name):
+    """'José's ' -> 'jose': lowercase, accents and possessive dropped, spaces collapsed."""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in name if not unicodedata.combining(c))
+    name = " ".join(name.lower().split())
+    return name[:-2] if name.endswith(("'s", "’s")) else name
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """
+    Levenshtein distance with adjacent transpositions ("jonh" -> "john" is
+    1), or limit + 1 once it must exceed `limit`: only the diagonal band
+    |i - j| <= limit is filled in.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    prev2, prev = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        row = [over] * (len(b) + 1)
+        row[0] = i if i <= limit else over
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            d = prev[j - 1] if ca == cb else 1 + min(prev[j], row[j - 1], prev[j - 1])
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < d:
+                d = prev2[j - 2] + 1
+            row[j] = d
+        if min(row[lo - 1:hi + 1]) > limit:
+            return over
+        prev2, prev = prev, row
+    return min(prev[-1], over)
+
+
+class EntityIndex:
+    """Trigram index over a fixed list of names."""
+
+    def __init__(self, names):
+        self.names = []      # display name per entry, first spelling wins
+        self._keys = []      # what is matched: full names and the words of longer ones
+        self._owners = []    # key -> positions in self.names ("john" may be several Johns)
+        self._exact = {}     # full name -> owner
+        self._alias = {}     # word of a longer name -> owner, None if several share it
+        key_ids = {}
+        postings = {}
+        sizes = []
+        for name in names:
+            full = normalize(name or "")
+            if not full or full in self._exact:
+                continue
+            owner = len(self.names)
+            self.names.append(name)
+            self._exact[full] = owner
+            parts = full.split()
+            keys = [full] + [p for p in parts if len(parts) > 1 and not p.isdigit()]
+            for part in keys[1:]:
+                self._alias[part] = owner if self._alias.get(part, owner) == owner else None
+            for key in keys:
+                i = key_ids.get(key)
+                if i is None:
+                    i = key_ids[key] = len(self._keys)
+                    self._keys.append(key)
+                    self._owners.append([])
+                    grams = _trigrams(key)
+                    sizes.append(len(grams))
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(i)
+                self._owners[i].append(owner)
+        # Arrays, so a query counts shared trigrams for every key at once
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=3):
+        """[(name, score)] best first, scores in [MIN_SCORE, 1]; an exact match scores 1.0 and comes alone."""
+        key = normalize(query or "")
+        if not key:
+            return []
+        # A full name beats another name's word ("Sam" over "Sam Lee"'s "sam")
+        exact = self._exact.get(key, self._alias.get(key))
+        if exact is not None:
+            return [(self.names[exact], 1.0)]
+
+        grams = _trigrams(key)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._keys))
+        dice = 2 * shared / (len(grams) + self._sizes)
+        top = np.argpartition(-dice, RERANK)[:RERANK] if len(dice) > RERANK else np.arange(len(dice))
+        top = top[np.argsort(-dice[top], kind="stable")]
+
+        # Best Dice first; a name's score is at most (dice + 1) / 2, so stop
+        # once that can't beat what is already in hand
+        best = {}
+        for i in top.tolist():
+            bound = (dice[i] + 1) / 2
+            floor = sorted(best.values(), reverse=True)[limit - 1] if len(best) >= limit else MIN_SCORE
+            if bound < floor:
+                break
+            other = self._keys[i]
+            longest = max(len(key), len(other))
+            # The most edits that still leave (dice + similarity) / 2 >= floor
+            max_edits = int((1 - (2 * floor - dice[i])) * longest + 1e-9)
+            similarity = 1 - _edit_distance(key, other, max_edits) / longest
+            score = round(float(dice[i] + similarity) / 2, 3)
+            if score < MIN_SCORE:
+                continue
+            # Every owner of a key ties; limit + 1 of them already say "ambiguous"
+            for owner in self._owners[i][:limit + 1]:
+                name = self.names[owner]
+                if score > best.get(name, 0):
+                    best[name] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def search_text(self, text, limit=3):
+        """search() for whichever word of the message matches a name best."""
+        best = []
+        for token in lexer.tokenize(text or ""):
+            if token.kind not in (lexer.NAME, lexer.WORD) or token.value.lower() in lexer.STOPWORDS:
+                continue
+            found = self.search(token.value, limit)
+            if found and (not best or found[0][1] > best[0][1]):
+                best = found
+        return best
+
+
+def unambiguous(candidates):
+    """The top candidate's name if it clearly beats the rest, else None."""
+    if not candidates:
+        return None
+    if len(candidates) == 1 or candidates[0][1] - candidates[1][1] >= MARGIN:
+        return candidates[0][0]
+    return None
+
+
+_INDEXES = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_entity_index(user_id):
+    """The user's index over active counterparties, rebuilt if their data changed."""
+    key = (db.DB_PATH, user_id)
+    # Read the version before the rows: a write landing in between bumps it
+    # again after commit, so the next call rebuilds
+    version = db.data_version(user_id)
+    with _lock:
+        cached = _INDEXES.get(key)
+        if cached is not None and cached[0] == version:
+            _INDEXES.move_to_end(key)
+            return cached[1]
+
+    index = EntityIndex(row["entity"] for row in db.get_loan_balances(user_id))
+    with _lock:
+        _INDEXES[key] = (version, index)
+        _INDEXES.move_to_end(key)
+        while len(_INDEXES) > MAX_INDEXES:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def search_entities(user_id, name, limit=3):
+    """Ranked (name, score) active counterparties of `user_id` resembling `name`."""
+    return get_entity_index(user_id).search(name, limit)
+
+
+def find_entity_in_text(user_id, text, limit=3):
+    """Ranked counterparties named anywhere in the message, lowercase or misspelt."""
+    return get_entity_index(user_id).search_text(text, limit)
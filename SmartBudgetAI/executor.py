@@ -1,6 +1,7 @@
 # SmartBudgetAI/executor.py
-from SmartBudgetAI.memory import add_memory_fact, get_active_loan_items
-from SmartBudgetAI.db import update_remaining, close_memory_fact, get_loan_by_entity
+from SmartBudgetAI.memory import add_memory_fact, get_debt_summary
+from SmartBudgetAI.db import apply_repayment
+from SmartBudgetAI.entity_index import search_entities
 from SmartBudgetAI.formatter import format_loans
 
 def execute_intent(user_id, parsed):
@@ -27,33 +28,31 @@ def execute_intent(user_id, parsed):
     if parsed.intent == "loan_received":
         repayment = parsed.amount or 0
         entity = parsed.entity
-        
-        # A. Find the loan
-        target_loan = get_loan_by_entity(user_id, entity)
-        
-        if not target_loan:
+
+        # Lookup, decrement, close and repayment record in ONE transaction
+        result = apply_repayment(user_id, entity, repayment) if entity else None
+
+        if not result:
+            # Never pay down a lookalike's loan unasked: offer the names instead
+            candidates = search_entities(user_id, entity) if entity else []
+            if candidates:
+                names = " or ".join(f"**{name}**" for name, _ in candidates[:3])
+                return f"I couldn't find an active loan for **{entity}**. Did you mean {names}?"
             return f"I couldn't find an active loan for **{entity}**."
 
-        # B. Calculate new balance
-        current_balance = target_loan['remaining_amount']
-        new_balance = current_balance - repayment
-        
-        # C. Update Database & Return Signal
-        if new_balance <= 0:
-            close_memory_fact(target_loan['id'])
-            add_memory_fact(user_id, "repayment", entity, repayment, f"Closed loan {target_loan['id']}")
-            
+        # The loan's own spelling ("john" paid -> "John"), not what was typed
+        entity = result["entity"]
+        if result["remaining"] <= 0:
             # SIGNAL: The word "settled" is what we will use later for notifications
-            return f"Loan settled! {entity} paid off the full balance."
-            
-        else:
-            update_remaining(target_loan['id'], new_balance)
-            add_memory_fact(user_id, "repayment", entity, repayment, f"Partial payment")
-            
-            return (
-                f"Recorded. {entity} paid **${repayment:.0f}**.\n"
-                f"Remaining balance: **${new_balance:.0f}**."
-            )
+            reply = f"Loan settled! {entity} paid off the full balance."
+            if result["overpaid"] > 0:
+                reply += f" (${result['overpaid']:.0f} more than they owed.)"
+            return reply
+
+        return (
+            f"Recorded. {entity} paid **${repayment:.0f}**.\n"
+            f"Remaining balance: **${result['remaining']:.0f}**."
+        )
 
     # ... (Keep query_debts logic as is) ...
 
@@ -62,7 +61,7 @@ def execute_intent(user_id, parsed):
     # 3. QUERY DEBTS
     # ==================================================
     if parsed.intent == "query_debts":
-        loans = get_active_loan_items(user_id)
+        loans = get_debt_summary(user_id)
         if not loans:
             return "You don’t have any active loans 🙂"
         return format_loans(loans)
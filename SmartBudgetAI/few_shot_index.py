@@ -0,0 +1,161 @@
+# SmartBudgetAI/few_shot_index.py
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+TOP_K = 3
+# Character n-grams inside word boundaries: robust to typos and slang
+# ("lent"/"lend", "spot"/"spotted") without a fitted vocabulary, so new
+# examples never force a refit.
+VECTORIZER = HashingVectorizer(
+    analyzer="char_wb", ngram_range=(2, 4), n_features=2 ** 16,
+    alternate_sign=False, norm="l2", lowercase=True,
+)
+_ANALYZER = VECTORIZER.build_analyzer()
+
+
+def query_vector(text):
+    """
+    Same features as VECTORIZER.transform([text]), as (columns, weights).
+    transform() costs ~0.5 ms of sklearn overhead per call; for a single
+    short message hashing the n-grams directly is ~10x cheaper.
+    """
+    counts = Counter(abs(murmurhash3_32(gram)) % VECTORIZER.n_features for gram in _ANALYZER(text))
+    columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    norm = np.linalg.norm(weights)
+    return columns, (weights / norm if norm else weights)
+
+
+class FewShotIndex:
+    """
+    Memory-resident nearest-neighbour index over the confirmed examples in
+    training_data.jsonl.
+
+    refresh() only reads what was appended since the last call (tracked by
+    byte offset); a truncated or replaced file triggers a rebuild. `version`
+    is a running hash of the indexed examples, so two processes that have
+    read the same file agree on it.
+    """
+
+    def __init__(self, path, k=TOP_K):
+        self.path = path
+        self.k = k
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._file_id = None
+        self._texts = []
+        self._intents = []
+        # Column-major: a query only touches the columns of its own n-grams
+        self._matrix = sp.csc_matrix((0, VECTORIZER.n_features), dtype=np.float64)
+        self._digest = hashlib.sha256()
+        self.version = self._digest.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self._texts)
+
+    def refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._file_id is not None:
+                with self._lock:
+                    self._reset()
+            return self
+
+        file_id = (st.st_dev, st.st_ino)
+        if file_id == self._file_id and st.st_size == self._offset:
+            return self
+
+        with self._lock:
+            if file_id != self._file_id or st.st_size < self._offset:
+                self._reset()
+                self._file_id = file_id
+            self._read_new()
+        return self
+
+    def _read_new(self):
+        # caller holds self._lock
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+
+        # A writer may be mid-line; leave the partial tail for next time
+        end = chunk.rfind(b"\n") + 1
+        texts, intents = [], []
+        for line in chunk[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            intent = rec.get("confirmed_intent")
+            if rec.get("text") and intent and intent != "rejected":
+                texts.append(rec["text"])
+                intents.append(intent)
+                self._digest.update(f"{rec['text']}\0{intent}\n".encode())
+        self._offset += end
+
+        if texts:
+            self._matrix = sp.vstack([self._matrix, VECTORIZER.transform(texts)], format="csc")
+            self._texts.extend(texts)
+            self._intents.extend(intents)
+            self.version = self._digest.hexdigest()[:16]
+
+    def _scores(self, text):
+        with self._lock:
+            matrix, texts, intents = self._matrix, self._texts, self._intents
+        if not texts:
+            return None, texts, intents
+        columns, weights = query_vector(text)
+        return matrix[:, columns] @ weights, texts, intents  # cosine, rows are l2-normalized
+
+    def similarity(self, text):
+        """Cosine similarity to the closest indexed example (0.0 when empty)."""
+        scores, _, _ = self._scores(text)
+        return float(scores.max()) if scores is not None else 0.0
+
+    def search(self, text, k=None):
+        """Up to k (text, intent) pairs, most similar first, newest wins ties."""
+        k = k or self.k
+        scores, texts, intents = self._scores(text)
+        if scores is None:
+            return []
+
+        # Only the best few need sorting; extra room for duplicate texts
+        m = min(len(scores), k * 8)
+        candidates = np.argpartition(-scores, m - 1)[:m] if m < len(scores) else np.arange(m)
+        # Most similar first; among equals prefer recent (the file is append-only)
+        order = candidates[np.lexsort((-candidates, -scores[candidates]))]
+
+        results, seen = [], set()
+        for i in order:
+            key = texts[i].lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append((texts[i], intents[i]))
+            if len(results) == k:
+                break
+        return results
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_few_shot_index(path):
+    """One shared, refreshed index per training file."""
+    index = _INDEXES.get(path)
+    if index is None:
+        with _INDEXES_LOCK:
+            index = _INDEXES.setdefault(path, FewShotIndex(path))
+    return index.refresh()
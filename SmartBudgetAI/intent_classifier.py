@@ -0,0 +1,264 @@
+# SmartBudgetAI/intent_classifier.py
+import json
+import os
+import sys
+import threading
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from SmartBudgetAI.few_shot_index import VECTORIZER, get_few_shot_index, query_vector
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.intent_specs import INTENT_SPECS
+from SmartBudgetAI.parser import extract_amount, extract_entity
+
+TRAINING_FILE = "training_data.jsonl"
+MODEL_FILE = "intent_model.joblib"
+
+# partial_fit needs every class up front; confirmed intents outside this
+# list (and "rejected") are not training data
+CLASSES = ["loan_given", "loan_received", "query_debts", "clarify"]
+
+# Below this probability the LLM gets the message instead
+THRESHOLD = 0.8
+# Too few confirmations and the probabilities mean nothing: defer to the LLM
+MIN_EXAMPLES = 20
+# Every training example is financial, so off-topic chat still lands on some
+# class. An intent with no required slots (query_debts) is only taken when
+# the message also resembles a confirmed example this closely (cosine).
+MIN_SIMILARITY = 0.5
+# Passes over the data for a full (offline) fit; online updates make one
+EPOCHS = 5
+
+
+def _new_model():
+    return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+
+
+def read_examples(path, offset=0):
+    """
+    Confirmed (texts, intents) appended after byte `offset`, plus the new
+    offset. A half-written last line is left for the next read.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1
+
+    texts, intents = [], []
+    for line in chunk[:end].splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if rec.get("text") and rec.get("confirmed_intent") in CLASSES:
+            texts.append(rec["text"])
+            intents.append(rec["confirmed_intent"])
+    return texts, intents, offset + end
+
+
+class IntentClassifier:
+    """
+    Intent model trained on the confirmed corrections in training_data.jsonl:
+    the few-shot index's hashed char n-grams into a logistic SGDClassifier.
+
+    refresh() keeps it current without restarts. Lines appended to the
+    training file since the last look are learned with partial_fit and the
+    artifact is re-saved; an artifact replaced on disk (e.g. by
+    `python -m SmartBudgetAI.intent_classifier train`) is loaded in place.
+    The artifact records how far into the training file it has learned, so
+    a restart only reads what is new.
+    """
+
+    def __init__(self, training_path=TRAINING_FILE, model_path=MODEL_FILE,
+                 threshold=THRESHOLD, min_examples=MIN_EXAMPLES):
+        self.training_path = training_path
+        self.model_path = model_path
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self._lock = threading.Lock()
+        self._model_mtime = None
+        self._reset()
+
+    def _reset(self):
+        self.model = _new_model()
+        self.examples = 0
+        self.class_counts = dict.fromkeys(CLASSES, 0)
+        self._offset = 0
+        self._file_id = None
+        # (coef, intercept) copies for predict(); partial_fit mutates in place
+        self._weights = None
+
+    @property
+    def ready(self):
+        return self.examples >= self.min_examples and sum(1 for n in self.class_counts.values() if n) > 1
+
+    def _stat(self):
+        try:
+            model_mtime = os.stat(self.model_path).st_mtime_ns
+        except FileNotFoundError:
+            model_mtime = None
+        try:
+            st = os.stat(self.training_path)
+        except FileNotFoundError:
+            st = None
+        return model_mtime, st
+
+    def _is_current(self, model_mtime, st):
+        if model_mtime != self._model_mtime:
+            return False
+        return st is None or ((st.st_dev, st.st_ino) == self._file_id and st.st_size == self._offset)
+
+    def refresh(self):
+        if self._is_current(*self._stat()):
+            return self
+
+        with self._lock:
+            # Another thread may have caught up while we waited
+            model_mtime, st = self._stat()
+            if self._is_current(model_mtime, st):
+                return self
+            if model_mtime is not None and model_mtime != self._model_mtime:
+                self._load(model_mtime)
+            if st is None:
+                return self
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != self._file_id or st.st_size < self._offset:
+                # Training file replaced or truncated: what we learned no longer matches it
+                self._reset()
+                self._file_id = file_id
+                self._learn(epochs=EPOCHS)
+            elif st.st_size > self._offset:
+                self._learn(epochs=1)
+        return self
+
+    def _load(self, model_mtime):
+        # caller holds self._lock
+        self._model_mtime = model_mtime
+        try:
+            artifact = joblib.load(self.model_path)
+        except Exception:
+            # Unreadable artifact: relearn from the training file and overwrite it
+            self._reset()
+            return
+        self.model = artifact["model"]
+        self.examples = artifact["examples"]
+        self.class_counts = artifact["class_counts"]
+        self._offset = artifact["offset"]
+        self._file_id = tuple(artifact["file_id"]) if artifact["file_id"] else None
+        self._snapshot()
+
+    def _learn(self, epochs):
+        # caller holds self._lock
+        texts, intents, offset = read_examples(self.training_path, self._offset)
+        self._offset = offset
+        if not texts:
+            return
+        features = VECTORIZER.transform(texts)
+        labels = np.asarray(intents)
+        rng = np.random.default_rng(len(texts))
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            self.model.partial_fit(features[order], labels[order], classes=CLASSES)
+        self.examples += len(texts)
+        for intent in intents:
+            self.class_counts[intent] += 1
+        self._snapshot()
+        if self.ready:
+            self._save()  # until then relearning on startup costs nothing
+
+    def _snapshot(self):
+        if hasattr(self.model, "coef_"):
+            self._weights = (self.model.coef_.copy(), self.model.intercept_.copy())
+
+    def _save(self):
+        # Write-then-rename: other processes never load a half-written file
+        tmp = f"{self.model_path}.{os.getpid()}.tmp"
+        joblib.dump({
+            "model": self.model,
+            "examples": self.examples,
+            "class_counts": self.class_counts,
+            "offset": self._offset,
+            "file_id": self._file_id,
+        }, tmp)
+        os.replace(tmp, self.model_path)
+        self._model_mtime = os.stat(self.model_path).st_mtime_ns
+
+    def probabilities(self, text):
+        """{intent: probability}, the same numbers as model.predict_proba."""
+        coef, intercept = self._weights
+        columns, weights = query_vector(text)
+        # One-vs-rest logistic scores, normalized across classes
+        proba = 1.0 / (1.0 + np.exp(-(coef[:, columns] @ weights + intercept)))
+        proba /= proba.sum()
+        return dict(zip(self.model.classes_, proba))
+
+    def predict(self, text):
+        """(intent, probability) for the likeliest intent, or None until trained."""
+        if not self.ready:
+            return None
+        intent, probability = max(self.probabilities(text).items(), key=lambda kv: kv[1])
+        return intent, float(probability)
+
+
+def train(training_path=None, model_path=None):
+    """Offline fit on the whole training file; running processes pick up the artifact."""
+    classifier = IntentClassifier(training_path or TRAINING_FILE, model_path or MODEL_FILE)
+    with classifier._lock:
+        st = os.stat(classifier.training_path)
+        classifier._file_id = (st.st_dev, st.st_ino)
+        classifier._learn(epochs=EPOCHS)
+    return classifier
+
+
+_CLASSIFIERS = {}
+_CLASSIFIERS_LOCK = threading.Lock()
+
+
+def get_intent_classifier(training_path=None, model_path=None):
+    """One shared, refreshed classifier per (training file, artifact) pair."""
+    key = (training_path or TRAINING_FILE, model_path or MODEL_FILE)
+    classifier = _CLASSIFIERS.get(key)
+    if classifier is None:
+        with _CLASSIFIERS_LOCK:
+            classifier = _CLASSIFIERS.setdefault(key, IntentClassifier(*key))
+    return classifier.refresh()
+
+
+def classify_intent(text):
+    """
+    The classifier's parse when it is at least THRESHOLD sure, else None
+    (not trained yet, or unsure: ask the LLM). Entity and amount come from
+    the rule parser's extractors, and an intent whose required slots are
+    missing from the message is not taken.
+    """
+    classifier = get_intent_classifier()
+    prediction = classifier.predict(text)
+    if prediction is None or prediction[1] < classifier.threshold:
+        return None
+    intent, probability = prediction
+
+    slots = {"entity": extract_entity(text), "amount": extract_amount(text)}
+    required = INTENT_SPECS.get(intent, {}).get("required")
+    if required is None:
+        return None  # "clarify" is the LLM's call
+    if any(slots[field] is None for field in required):
+        return None
+    if not required and get_few_shot_index(classifier.training_path).similarity(text) < MIN_SIMILARITY:
+        return None
+
+    return ParsedIntent(
+        intent=intent,
+        entity=slots["entity"],
+        amount=slots["amount"],
+        confidence=round(probability, 2),
+        source="classifier",
+        needs_confirmation=True,
+    )
+
+
+if __name__ == "__main__":
+    # python -m SmartBudgetAI.intent_classifier train [training.jsonl] [model.joblib]
+    if sys.argv[1:2] != ["train"]:
+        sys.exit("usage: python -m SmartBudgetAI.intent_classifier train [training.jsonl] [model.joblib]")
+    trained = train(*sys.argv[2:4])
+    print(f"trained on {trained.examples} examples {trained.class_counts} -> {trained.model_path}")
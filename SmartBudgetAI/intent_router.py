@@ -1,4 +1,19 @@
 # SmartBudgetAI/intent_router.py
+from SmartBudgetAI import lexer
+from SmartBudgetAI.keyword_matcher import KeywordMatcher
+
+CLOSE_WORDS = ["returned", "paid", "settled", "closed", "done"]
+CREATE_WORDS = ["lent", "gave", "loaned", "borrowed", "sent"]
+SUMMARY_WORDS = ["who owes", "how much", "total", "owed", "pending"]
+REMINDER_WORDS = ["due", "remind", "reminder"]
+
+# Scored by how many of each list's words appear; ties go to the earlier list
+_KEYWORDS = KeywordMatcher({
+    "close_loan": CLOSE_WORDS,
+    "create_loan": CREATE_WORDS,
+    "summary": SUMMARY_WORDS,
+    "reminder": REMINDER_WORDS,
+})
 
 def detect_intent(text: str) -> str:
     """
@@ -10,35 +25,6 @@ def detect_intent(text: str) -> str:
     - reminder
     - unknown
     """
-    text = text.lower()
-
-    scores = {
-        "close_loan": 0,
-        "create_loan": 0,
-        "summary": 0,
-        "reminder": 0
-    }
-
-    CLOSE_WORDS = ["returned", "paid", "settled", "closed", "done"]
-    CREATE_WORDS = ["lent", "gave", "loaned", "borrowed", "sent"]
-    SUMMARY_WORDS = ["who owes", "how much", "total", "owed", "pending"]
-    REMINDER_WORDS = ["due", "remind", "reminder"]
-
-    for w in CLOSE_WORDS:
-        if w in text:
-            scores["close_loan"] += 1
-
-    for w in CREATE_WORDS:
-        if w in text:
-            scores["create_loan"] += 1
-
-    for w in SUMMARY_WORDS:
-        if w in text:
-            scores["summary"] += 1
-
-    for w in REMINDER_WORDS:
-        if w in text:
-            scores["reminder"] += 1
-
+    scores = _KEYWORDS.counts(lexer.words(lexer.tokenize(text)))
     best_intent = max(scores, key=scores.get)
     return best_intent if scores[best_intent] > 0 else "unknown"
@@ -0,0 +1,77 @@
+# SmartBudgetAI/keyword_matcher.py
+import copy
+
+
+class KeywordMatcher:
+    """
+    Keyword lists of several groups compiled once into a phrase index.
+
+    Keywords are lowercase words or phrases ("lent", "paid back") matched
+    against the whole words of a message, as produced by lexer.words():
+    "pending" does not fire on "spending", nor "paid" on "repaid". Groups
+    rank in the order given.
+    """
+
+    def __init__(self, groups):
+        self.groups = tuple(groups)
+        # first word -> [(phrase words, group, rank)], longest phrase first
+        self._index = {}
+        rank = 0
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                phrase = tuple(keyword.split())
+                if phrase:
+                    self._index.setdefault(phrase[0], []).append((phrase, group, rank))
+                rank += 1
+        for entries in self._index.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+
+    def _occurrences(self, words):
+        """(position, phrase, group, rank) for every keyword occurrence, overlaps included."""
+        index = self._index
+        for i, word in enumerate(words):
+            for phrase, group, rank in index.get(word, ()):
+                if len(phrase) == 1 or tuple(words[i:i + len(phrase)]) == phrase:
+                    yield i, phrase, group, rank
+
+    def first(self, words):
+        """The highest-ranked group with a keyword among the words, or None."""
+        best = None
+        for _, _, group, rank in self._occurrences(words):
+            if best is None or rank < best[0]:
+                best = (rank, group)
+        return best[1] if best else None
+
+    def counts(self, words):
+        """{group: how many of its keywords occur among the words}."""
+        counts = dict.fromkeys(self.groups, 0)
+        present = {rank: group for _, _, group, rank in self._occurrences(words)}
+        for group in present.values():
+            counts[group] += 1
+        return counts
+
+    def find(self, words):
+        """Non-overlapping (position, length, group) matches, leftmost-longest."""
+        hits, end = [], 0
+        for i, phrase, group, _ in self._occurrences(words):
+            if i >= end:
+                hits.append((i, len(phrase), group))
+                end = i + len(phrase)
+        return hits
+
+
+_SPEC_MATCHER = (None, None)
+
+
+def spec_matcher(specs):
+    """
+    KeywordMatcher over the "keywords" of INTENT_SPECS-style specs, in spec
+    order. Rebuilt whenever the specs no longer equal the copy it was built
+    from, so edits to the specs (even in place) take effect on the next call.
+    """
+    global _SPEC_MATCHER
+    snapshot, matcher = _SPEC_MATCHER
+    if snapshot != specs:
+        matcher = KeywordMatcher({intent: spec["keywords"] for intent, spec in specs.items()})
+        _SPEC_MATCHER = (copy.deepcopy(specs), matcher)
+    return matcher
@@ -0,0 +1,182 @@
+# SmartBudgetAI/lexer.py
+import re
+from functools import lru_cache
+from SmartBudgetAI.intent_specs import INTENT_SPECS
+from SmartBudgetAI.keyword_matcher import spec_matcher
+
+# Token kinds
+AMOUNT = "AMOUNT"            # value: float, currency: "USD"/"INR"/... or None
+DATE = "DATE"                # value: (month, day)
+NUMBER_WORD = "NUMBER_WORD"  # value: int ("twenty five" -> 25)
+KEYWORD = "KEYWORD"          # an INTENT_SPECS keyword phrase; value: its intent
+NAME = "NAME"                # Title Case word that isn't a stopword; value: "John" for "John's"
+WORD = "WORD"                # anything else; value: lowercase text
+
+CURRENCIES = {
+    "$": "USD", "usd": "USD", "₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR",
+    "€": "EUR", "eur": "EUR", "£": "GBP", "gbp": "GBP",
+}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+    "hundred": 100, "thousand": 1000,
+}
+
+# Never names, even capitalized at the start of a sentence
+STOPWORDS = {
+    "i", "me", "my", "you", "we", "us", "the", "a", "an", "all", "was", "were",
+    "to", "from", "for", "with", "him", "her",
+}
+
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DAY = r"(?:3[01]|[12]\d|0?[1-9])(?:st|nd|rd|th)?"
+_CURRENCY = r"(?:[$₹€£]|\b(?:rs\.?|usd|inr|eur|gbp)(?=\s?\d))"
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# One pass, leftmost match wins; dates before amounts so "jan 5" isn't $5.
+# The lookahead skips spaces and punctuation before trying each alternative.
+_TOKEN = re.compile(rf"""(?=[\w$₹€£])(?:
+    (?P<date>\b{_MONTH}\.?\s+{_DAY}\b | \b{_DAY}\s+(?:of\s+)?{_MONTH}\b)
+  | (?P<amount>(?:(?P<prefix>{_CURRENCY})\s?|(?<![\w.,]))(?P<number>{_NUMBER})(?!\w)
+        (?:\s?(?P<suffix>usd|inr|eur|gbp|rs)\b)?)
+  | (?P<word>[^\W\d_](?:[\w'’-]*[^\W_])?))
+""", re.IGNORECASE | re.VERBOSE)
+_DATE_PARTS = re.compile(rf"({_MONTH})|(\d+)", re.IGNORECASE)
+
+
+class Token:
+    """One typed token; `start`/`end` index into the original message."""
+    __slots__ = ("kind", "text", "value", "start", "end", "currency")
+
+    def __init__(self, kind, text, value, start, end, currency=None):
+        self.kind = kind
+        self.text = text
+        self.value = value
+        self.start = start
+        self.end = end
+        self.currency = currency
+
+    def __repr__(self):
+        currency = f", {self.currency}" if self.currency else ""
+        return f"Token({self.kind}, {self.text!r}, {self.value!r}{currency})"
+
+    def __eq__(self, other):
+        return isinstance(other, Token) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+
+def _date(m):
+    month = day = None
+    for name, digits in _DATE_PARTS.findall(m.group()):
+        if name:
+            month = MONTHS[name[:3].lower()]
+        elif digits:
+            day = int(digits)
+    return Token(DATE, m.group(), (month, day), m.start(), m.end())
+
+
+def _amount(m):
+    code = m.group("prefix") or m.group("suffix")
+    value = float(m.group("number").replace(",", ""))
+    return Token(AMOUNT, m.group().strip(), value, m.start(), m.end(),
+                 CURRENCIES[code.lower()] if code else None)
+
+
+def _word(m):
+    text = m.group()
+    lower = text.lower()
+    if lower in NUMBER_WORDS:
+        return Token(NUMBER_WORD, text, NUMBER_WORDS[lower], m.start(), m.end())
+    base = text[:-2] if lower.endswith(("'s", "’s")) else text
+    if base.istitle() and base.lower() not in STOPWORDS:
+        return Token(NAME, text, base, m.start(), m.end())
+    return Token(WORD, text, lower, m.start(), m.end())
+
+
+_BUILD = {"date": _date, "amount": _amount, "word": _word}
+
+
+def _join_number_words(tokens):
+    """'two hundred fifty' -> one NUMBER_WORD token of 250."""
+    out = []
+    for token in tokens:
+        prev = out[-1] if out else None
+        if token.kind == NUMBER_WORD and prev is not None and prev.kind == NUMBER_WORD:
+            total, current = prev.value // 1000 * 1000, prev.value % 1000
+            if token.value == 1000:
+                total, current = (total + (current or 1)) * 1000, 0
+            elif token.value == 100:
+                current = (current or 1) * 100
+            else:
+                current += token.value
+            out[-1] = Token(NUMBER_WORD, f"{prev.text} {token.text}", total + current, prev.start, token.end)
+        else:
+            out.append(token)
+    return out
+
+
+def _tag_keywords(tokens, text, matcher):
+    """Merges the words of each INTENT_SPECS keyword phrase into one KEYWORD token."""
+    words = [t.text.lower() for t in tokens]
+    hits = matcher.find(words)
+    if not hits:
+        return tokens
+    out, i = [], 0
+    for start, length, intent in hits:
+        out.extend(tokens[i:start])
+        first, last = tokens[start], tokens[start + length - 1]
+        out.append(Token(KEYWORD, text[first.start:last.end], intent, first.start, last.end))
+        i = start + length
+    out.extend(tokens[i:])
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _lex(text, matcher):
+    tokens = [_BUILD[m.lastgroup](m) for m in _TOKEN.finditer(text)]
+    tokens = _join_number_words(tokens)
+    return tuple(_tag_keywords(tokens, text, matcher))
+
+
+def tokenize(text):
+    """
+    The message as a tuple of Tokens, left to right. Results are cached per
+    text (and per version of INTENT_SPECS), so every parser that looks at
+    the same message shares one scan; treat the tokens as read-only.
+    """
+    return _lex(text, spec_matcher(INTENT_SPECS))
+
+
+def first(tokens, kind):
+    """The first token of this kind, or None."""
+    for token in tokens:
+        if token.kind == kind:
+            return token
+    return None
+
+
+def words(tokens):
+    """Lowercase words in order, keyword phrases split back into their words."""
+    out = []
+    for token in tokens:
+        if token.kind in (WORD, NAME, KEYWORD, NUMBER_WORD):
+            out.extend(token.text.lower().split())
+    return out
+
+
+def amount(tokens):
+    """The first AMOUNT token, else the first NUMBER_WORD ("fifty"), or None."""
+    return first(tokens, AMOUNT) or first(tokens, NUMBER_WORD)
+
+
+def entity(tokens):
+    """The first NAME, possessive stripped, or None."""
+    name = first(tokens, NAME)
+    return name.value if name else None
@@ -0,0 +1,152 @@
+# SmartBudgetAI/llm_batcher.py
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from SmartBudgetAI.llm_client import llm_deadline
+
+# How long the first request of a batch waits for company, and the most
+# texts packed into one extraction prompt. Against a 1-3 s local generation
+# a 15 ms wait is noise.
+BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW_MS", "15")) / 1000
+MAX_BATCH = int(os.getenv("LLM_MAX_BATCH", "8"))
+# Batches dispatched at once; matches the LLM client's concurrency cap
+DISPATCH_WORKERS = 2
+
+
+class ParseBatcher:
+    """
+    Coalesces and micro-batches LLM parse requests.
+
+    submit(key, text) returns a Future. Callers with the same key while a
+    request is in flight share its Future. Distinct texts arriving within
+    `window` seconds of each other (up to `max_batch`) are handed to
+    `run_batch(texts)` together, which returns one result, or an
+    exception instance, per text.
+
+    Each submitter may pass its turn's `deadline` (time.monotonic()). The
+    batch runs under llm_deadline() of the earliest one, so a caller that
+    has given up doesn't leave its LLM call holding a client slot for the
+    full read timeout.
+
+    A batch is only cut when a dispatcher is free, so while the model is
+    busy new arrivals accumulate into the next, fuller batch instead of
+    queueing as many small ones.
+    """
+
+    def __init__(self, run_batch, window=BATCH_WINDOW, max_batch=MAX_BATCH,
+                 workers=DISPATCH_WORKERS):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []    # [key, text, future, arrived_at, deadline], oldest first
+        self._in_flight = {}  # key -> future
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch")
+        self._idle = threading.Semaphore(workers)
+        self._thread = None
+        self._closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    def submit(self, key, text, deadline=None):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ParseBatcher is closed")
+            self.submitted += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                # Not sent yet: it may run as long as its latest waiter needs
+                for entry in self._pending:
+                    if entry[0] == key and entry[4] is not None:
+                        entry[4] = None if deadline is None else max(entry[4], deadline)
+                return future
+
+            future = Future()
+            self._in_flight[key] = future
+            self._pending.append([key, text, future, time.monotonic(), deadline])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return future
+
+    def parse(self, key, text, timeout=None, deadline=None):
+        return self.submit(key, text, deadline).result(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "pending": len(self._pending),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            for key, *_ in pending:
+                self._in_flight.pop(key, None)
+            self._cond.notify_all()
+        for _, _, future, *_ in pending:
+            future.set_exception(RuntimeError("ParseBatcher is closed"))
+        self._pool.shutdown(wait=True)
+
+    # -------------------------------
+    # Internals
+    # -------------------------------
+    def _run(self):
+        while True:
+            self._idle.acquire()
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    self._idle.release()
+                    return
+
+                # The oldest arrival opened the window; a full batch closes it early
+                deadline = self._pending[0][3] + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                if batch:
+                    self.batches += 1
+
+            if batch:
+                self._pool.submit(self._dispatch, batch)
+            else:
+                self._idle.release()
+
+    def _dispatch(self, batch):
+        deadline = min((entry[4] for entry in batch if entry[4] is not None), default=None)
+        try:
+            with nullcontext() if deadline is None else llm_deadline(deadline):
+                results = self.run_batch([text for _, text, *_ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"run_batch returned {len(results)} results for {len(batch)} texts")
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._idle.release()
+
+        with self._cond:
+            for key, *_ in batch:
+                self._in_flight.pop(key, None)
+
+        for (_, _, future, *_), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
@@ -0,0 +1,162 @@
+# SmartBudgetAI/llm_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from SmartBudgetAI import db
+
+# L1: in-process LRU. L2: llm_cache table in the main SQLite DB.
+L1_MAX_ENTRIES = 2048
+TTL_SECONDS = 7 * 24 * 3600
+L2_MAX_ROWS = 50000
+EVICT_EVERY = 200  # L2 puts between eviction sweeps
+
+
+def normalize_text(text: str) -> str:
+    """'  Spot ALEX 20 ' and 'spot alex 20' share a cache entry."""
+    return " ".join(text.lower().split())
+
+
+class LLMCache:
+    """
+    Two-level cache for LLM parse results.
+
+    Keys are sha256(prompt fingerprint + normalized text). The fingerprint
+    hashes everything that shapes the prompt (model, template, few-shot
+    index version), so when new confirmed examples land in training_data.jsonl
+    the fingerprint changes and older entries simply miss; on disk they age
+    out with TTL_SECONDS / L2_MAX_ROWS like any other row.
+    """
+
+    def __init__(self, max_entries=L1_MAX_ENTRIES, ttl=TTL_SECONDS,
+                 max_rows=L2_MAX_ROWS, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.clock = clock
+        self._l1 = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._puts = 0
+        self.hits_l1 = 0
+        self.hits_l2 = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, fingerprint):
+        return hashlib.sha256(f"{fingerprint}\0{normalize_text(text)}".encode()).hexdigest()
+
+    def get(self, text, fingerprint):
+        self._check_fingerprint(fingerprint)
+        key = self.key(text, fingerprint)
+        now = self.clock()
+
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._l1.move_to_end(key)
+                self.hits_l1 += 1
+                return entry[0]
+            if entry:
+                del self._l1[key]
+
+        row = db.get_connection().execute(
+            "SELECT value, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+            (key, now - self.ttl)
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.hits_l2 += 1
+            return value
+
+    def put(self, text, fingerprint, value):
+        self._check_fingerprint(fingerprint)
+        key = self.key(text, fingerprint)
+        now = self.clock()
+
+        with self._lock:
+            self._remember(key, value, now)
+            self._puts += 1
+            evict = self._puts % EVICT_EVERY == 0
+
+        def write():
+            with db.transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, fingerprint, value, created_at) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, json.dumps(value, separators=(",", ":")), now)
+                )
+                if evict:
+                    self._evict(conn, now)
+
+        # Not inside a chat turn's transaction: that would take the write
+        # lock before the turn's persona call and hold it throughout
+        db.after_commit(write)
+
+    def invalidate(self):
+        with self._lock:
+            self._l1.clear()
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_l1 + self.hits_l2 + self.misses
+            return {
+                "hits_l1": self.hits_l1,
+                "hits_l2": self.hits_l2,
+                "misses": self.misses,
+                "hit_rate": (self.hits_l1 + self.hits_l2) / lookups if lookups else 0.0,
+                "l1_entries": len(self._l1),
+            }
+
+    # -------------------------------
+    # Internals
+    # -------------------------------
+    def _remember(self, key, value, created_at):
+        # caller holds self._lock
+        self._l1[key] = (value, created_at)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.max_entries:
+            self._l1.popitem(last=False)
+
+    def _check_fingerprint(self, fingerprint):
+        # The prompt changed (e.g. new confirmed examples): old answers no
+        # longer match any key. L1 is only this process's, so it is emptied;
+        # L2 rows are left to TTL eviction, since during a rolling deploy
+        # workers on the old prompt are still reading them.
+        if fingerprint == self._fingerprint:
+            return
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            self._fingerprint = fingerprint
+            self._l1.clear()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+        overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_rows
+        if overflow > 0:
+            conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY created_at LIMIT ?
+                )
+            """, (overflow,))
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache():
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = LLMCache()
+    return _CACHE
@@ -0,0 +1,241 @@
+# SmartBudgetAI/llm_client.py
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from SmartBudgetAI.circuit_breaker import CircuitBreaker
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
+# Separate budgets: failing to connect should be quick, generating on CPU is slow
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 60.0
+# The local model serializes generations anyway; more in flight just queues in Ollama
+MAX_CONCURRENCY = 2
+POOL_SIZE = 8
+# Ask Ollama to keep the model loaded between calls
+KEEP_ALIVE = "30m"
+
+# Adaptive read timeout: P95_FACTOR x observed p95, within [MIN_READ_TIMEOUT, READ_TIMEOUT]
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+P95_FACTOR = 2.0
+MIN_READ_TIMEOUT = 5.0
+
+# Breaker: this many consecutive failures open it; probe again after RESET_TIMEOUT
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+
+
+class LLMError(Exception):
+    """Any failure talking to the LLM (connect, timeout, HTTP error, bad body)."""
+
+
+class LLMUnavailable(LLMError):
+    """Refused without calling: breaker open or the turn's time budget is spent."""
+
+
+# -------------------------------
+# Per-turn latency budget
+# -------------------------------
+_DEADLINE = contextvars.ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def llm_deadline(at):
+    """All LLM calls in this context must finish by `at` (time.monotonic())."""
+    token = _DEADLINE.set(at)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_budget():
+    """Seconds left in the current turn's budget, or None if there is none."""
+    at = _DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+class OllamaClient:
+    """
+    Shared Ollama chat client: one pooled keep-alive requests.Session,
+    a cap on concurrent requests, and split connect/read timeouts.
+
+    Every call goes through a circuit breaker, and its read timeout is the
+    smallest of the configured ceiling, a multiple of the observed p95,
+    and whatever is left of the current turn's budget (see llm_deadline).
+    """
+
+    def __init__(self, url=OLLAMA_URL, max_concurrency=MAX_CONCURRENCY,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 keep_alive=KEEP_ALIVE, pool_size=POOL_SIZE, breaker=None):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker(FAILURE_THRESHOLD, RESET_TIMEOUT)
+        self.latency = LatencyTracker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, model, messages, options, stream):
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "options": options or {},
+            "keep_alive": self.keep_alive,
+        }
+
+    def adaptive_timeout(self):
+        p95 = self.latency.p95()
+        if p95 is None:
+            return self.read_timeout
+        return min(self.read_timeout, max(MIN_READ_TIMEOUT, p95 * P95_FACTOR))
+
+    def available(self):
+        """False while the breaker is refusing calls; cheap enough to check per turn."""
+        return self.breaker.would_allow()
+
+    @contextmanager
+    def _guarded(self, read_timeout):
+        """
+        Budget check, breaker and concurrency slot around one call.
+        Yields the (connect, read) timeout to use.
+        """
+        read = read_timeout or self.adaptive_timeout()
+        budget = remaining_budget()
+        if budget is not None and budget <= 0:
+            raise LLMUnavailable("turn latency budget spent")
+        if not self.breaker.allow():
+            raise LLMUnavailable("LLM circuit breaker is open")
+
+        # A timeout forced by the turn budget says nothing about Ollama's health
+        capped = budget is not None and budget < read
+        if capped:
+            read = budget
+
+        if not self._slots.acquire(timeout=budget):
+            self.breaker.release()
+            raise LLMUnavailable("turn latency budget spent waiting for a slot")
+        try:
+            yield (min(self.connect_timeout, read), read)
+        except (requests.RequestException, KeyError, ValueError) as e:
+            if capped and isinstance(e, requests.Timeout):
+                self.breaker.release()
+            else:
+                self.breaker.record_failure()
+            raise LLMError(str(e)) from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+
+    def chat(self, model, messages, options=None, read_timeout=None):
+        """Non-streaming chat; returns the assistant message content."""
+        payload = self._payload(model, messages, options, stream=False)
+
+        with self._guarded(read_timeout) as timeout:
+            start = time.monotonic()
+            response = self.session.post(self.url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            content = response.json()["message"]["content"].strip()
+            self.latency.observe(time.monotonic() - start)
+            return content
+
+    def chat_stream(self, model, messages, options=None, read_timeout=None):
+        """
+        Streaming chat: yields content tokens as Ollama produces them.
+        The concurrency slot is held until the generator is exhausted or closed.
+        """
+        payload = self._payload(model, messages, options, stream=True)
+
+        with self._guarded(read_timeout) as timeout:
+            with self.session.post(self.url, json=payload, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("message", {}).get("content", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        break
+
+    def health(self):
+        p95 = self.latency.p95()
+        return {
+            "breaker": self.breaker.snapshot(),
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "read_timeout_s": round(self.adaptive_timeout(), 1),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOllamaClient:
+    """
+    asyncio front for OllamaClient. Waiting for a slot happens on the event
+    loop (no thread is parked); the HTTP call itself reuses the sync
+    client's pooled session on a worker thread.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or get_client()
+        self._slots = asyncio.Semaphore(self.client.max_concurrency)
+
+    async def chat(self, model, messages, options=None, read_timeout=None):
+        async with self._slots:
+            # to_thread copies the context, so the turn budget comes along
+            return await asyncio.to_thread(
+                self.client.chat, model, messages, options, read_timeout
+            )
+
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client():
+    """Process-wide OllamaClient."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = OllamaClient()
+    return _CLIENT
@@ -1,106 +1,221 @@
+import hashlib
 import json
-import requests
-import os
+import threading
+import time
 from datetime import datetime
+from SmartBudgetAI.few_shot_index import get_few_shot_index
 from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.llm_batcher import ParseBatcher
+from SmartBudgetAI.llm_cache import get_llm_cache
+from SmartBudgetAI.llm_client import LLMUnavailable, get_client, remaining_budget
+from SmartBudgetAI.smalltalk import smalltalk_reply
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
 # ✅ SWITCH BACK TO THE SMART MODEL
 MODEL = "llama3.2:3b"
 TRAINING_FILE = "training_data.jsonl"
 
-def get_system_prompt():
-    """Context for the financial parser."""
-    now = datetime.now()
-    return f"""
-    You are a financial parser. Current Time: {now.strftime("%I:%M %p")}
+PARSER_PROMPT = """
+    You are a financial parser. Current Time: {now}
     Extract JSON data.
     Keys: "intent" (loan_given/loan_received/query/clarify), "entity" (Name), "amount" (number).
     """
 
-def get_few_shot_examples():
-    """Reads training data to learn from past corrections."""
-    if not os.path.exists(TRAINING_FILE): return ""
-    examples = []
-    try:
-        with open(TRAINING_FILE, "r") as f:
-            lines = f.readlines()
-            for line in reversed(lines):
-                if len(examples) >= 3: break # Limit to 3 to keep it FAST
-                rec = json.loads(line)
-                if rec.get("confirmed_intent") and rec["confirmed_intent"] != "rejected":
-                    examples.append(f'User: "{rec["text"]}" -> {{"intent": "{rec["confirmed_intent"]}"}}')
-    except: pass
-    return "\nExamples:\n" + "\n".join(examples) if examples else ""
+# Several messages in one call, for the micro-batcher
+BATCH_PROMPT = """
+    You are a financial parser. Current Time: {now}
+    Each numbered line is a separate message. Extract JSON data for every one.
+    Reply with only a JSON array holding one object per message, in the same order.
+    Keys: "intent" (loan_given/loan_received/query/clarify), "entity" (Name), "amount" (number).
+    """
+# Batches share one examples block: the union of each message's nearest
+BATCH_MAX_EXAMPLES = 6
 
-def chat_with_persona(text: str):
+def get_system_prompt():
+    """Context for the financial parser."""
+    now = datetime.now()
+    return PARSER_PROMPT.format(now=now.strftime("%I:%M %p"))
+
+def prompt_fingerprint(examples_version):
     """
-    Party Mode: Handles chit-chat.
+    Hash of everything that shapes a parse besides the message itself.
+    The current time is left out on purpose; it doesn't change the answer.
+    Examples are picked per message from the index, so the index version
+    stands in for them: it changes exactly when new examples are confirmed.
     """
+    prompts = f"{PARSER_PROMPT}\0{BATCH_PROMPT}"
+    return hashlib.sha256(f"{MODEL}\0{prompts}\0{examples_version}".encode()).hexdigest()[:16]
+
+def _format_examples(pairs):
+    examples = [f'User: "{example}" -> {{"intent": "{intent}"}}' for example, intent in pairs]
+    return "\nExamples:\n" + "\n".join(examples) if examples else ""
+
+def get_few_shot_examples(text, index=None):
+    """The confirmed past corrections most similar to this message."""
+    index = index or get_few_shot_index(TRAINING_FILE)
+    return _format_examples(index.search(text))
+
+PERSONA_ERROR = "my brain is buffering... 💀 (cpu timeout)"
+
+# While the LLM is unreachable or the turn is out of time: answer instantly
+# and steer towards what still works (the rule parser)
+CANNED_DEFAULT = "my chat brain is offline rn 💀 but I can still log loans: try 'lent Alex 20' or 'who owes me'."
+
+def canned_reply(text: str) -> str:
+    return smalltalk_reply(text) or CANNED_DEFAULT
+
+def _persona_messages(text: str):
     # Llama 3.2 is smart, so we can use a "System Prompt" again (it's cleaner)
     persona_system = f"""
     You are SmartBudget, a chill Gen Z financial assistant.
     Current Time: {datetime.now().strftime("%I:%M %p")}
     - Use lowercase mostly. Use emojis 💸💀.
     - Be brief (1 sentence).
-    - If user says "hi", just say "yo what's good?".
     """
+    return [
+        {"role": "system", "content": persona_system},
+        {"role": "user", "content": text}
+    ]
 
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": persona_system},
-            {"role": "user", "content": text}
-        ],
-        "stream": False,
-        "options": {"temperature": 0.8}
-    }
+def chat_with_persona(text: str):
+    """
+    Party Mode: Handles chit-chat.
+    """
+    try:
+        return get_client().chat(MODEL, _persona_messages(text), options={"temperature": 0.8})
+    except LLMUnavailable:
+        return canned_reply(text)
+    except Exception as e:
+        print(f"Persona Error: {e}")
+        return PERSONA_ERROR
 
+def stream_persona(text: str):
+    """
+    Party Mode, streamed: yields the reply token by token.
+    """
+    stream = get_client().chat_stream(MODEL, _persona_messages(text), options={"temperature": 0.8})
     try:
-        # ✅ WORKAROUND: Increased to 60s so it doesn't crash on slow CPUs
-        response = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        response.raise_for_status()
-        return response.json()["message"]["content"].strip()
+        for token in stream:
+            yield token
+    except LLMUnavailable:
+        yield canned_reply(text)
     except Exception as e:
         print(f"Persona Error: {e}")
-        return "my brain is buffering... 💀 (cpu timeout)"
+        yield PERSONA_ERROR
+    finally:
+        stream.close()
 
-def llm_fallback_parse(text: str) -> ParsedIntent:
-    full_prompt = get_system_prompt() + get_few_shot_examples()
-
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": full_prompt},
-            {"role": "user", "content": text}
-        ],
-        "stream": False,
-        "options": {"temperature": 0} 
+def _request_parse(system_prompt: str, text: str) -> str:
+    """One parser round trip to Ollama; returns the raw message content."""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text}
+    ]
+    return get_client().chat(MODEL, messages, options={"temperature": 0})
+
+def _fields(data: dict) -> dict:
+    return {
+        "intent": data.get("intent", "clarify"),
+        "entity": data.get("entity"),
+        "amount": data.get("amount"),
     }
 
-    try:
-        # ✅ WORKAROUND: Increased to 60s
-        response = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        response.raise_for_status()
-
-        content = response.json()["message"]["content"].strip()
-        
-        # Llama 3.2 is good at JSON, but we still clean it just in case
-        if "{" in content:
-            start = content.find("{")
-            end = content.rfind("}") + 1
-            content = content[start:end]
-
-        data = json.loads(content)
-        
-        return ParsedIntent(
-            intent=data.get("intent", "clarify"),
-            entity=data.get("entity"),
-            amount=data.get("amount"),
-            confidence=0.75, 
-            source="llm",
-            needs_confirmation=True
-        )
+def _extract_json(content: str) -> dict:
+    # Llama 3.2 is good at JSON, but we still clean it just in case
+    if "{" in content:
+        start = content.find("{")
+        end = content.rfind("}") + 1
+        content = content[start:end]
+
+    return _fields(json.loads(content))
+
+def _extract_array(content: str, n: int) -> list:
+    if "[" in content:
+        content = content[content.find("["):content.rfind("]") + 1]
 
+    items = json.loads(content)
+    if not isinstance(items, list) or len(items) != n or not all(isinstance(i, dict) for i in items):
+        raise ValueError(f"expected a JSON array of {n} objects")
+    return [_fields(item) for item in items]
+
+def _parse_one(text: str, index) -> dict:
+    examples = get_few_shot_examples(text, index)
+    return _extract_json(_request_parse(get_system_prompt() + examples, text))
+
+def parse_batch(texts):
+    """
+    Parses several messages with one LLM call. Returns a dict, or the
+    exception, per text. If the model mangles the array, each text is
+    retried on its own, while the turn budget (llm_deadline) lasts.
+    """
+    index = get_few_shot_index(TRAINING_FILE)
+    if len(texts) > 1:
+        pairs = dict.fromkeys(pair for text in texts for pair in index.search(text))
+        examples = _format_examples(list(pairs)[:BATCH_MAX_EXAMPLES])
+        numbered = "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, 1))
+        system_prompt = BATCH_PROMPT.format(now=datetime.now().strftime("%I:%M %p")) + examples
+        try:
+            return _extract_array(_request_parse(system_prompt, numbered), len(texts))
+        except ValueError:
+            pass  # malformed array: fall through to one call per text
+        except Exception as e:
+            return [e] * len(texts)
+
+    results = []
+    for text in texts:
+        budget = remaining_budget()
+        if budget is not None and budget <= 0:
+            results.append(LLMUnavailable("turn latency budget spent"))
+            continue
+        try:
+            results.append(_parse_one(text, index))
+        except Exception as e:
+            results.append(e)
+    return results
+
+_BATCHER = None
+_BATCHER_LOCK = threading.Lock()
+
+def get_parse_batcher():
+    """Process-wide coalescing/batching front for parse_batch."""
+    global _BATCHER
+    if _BATCHER is None:
+        with _BATCHER_LOCK:
+            if _BATCHER is None:
+                _BATCHER = ParseBatcher(parse_batch)
+    return _BATCHER
+
+def _to_intent(data: dict) -> ParsedIntent:
+    return ParsedIntent(
+        intent=data["intent"],
+        entity=data["entity"],
+        amount=data["amount"],
+        confidence=0.75, 
+        source="llm",
+        needs_confirmation=True
+    )
+
+def llm_fallback_parse(text: str) -> ParsedIntent:
+    index = get_few_shot_index(TRAINING_FILE)
+    fingerprint = prompt_fingerprint(index.version)
+    cache = get_llm_cache()
+
+    cached = cache.get(text, fingerprint)
+    if cached is not None:
+        return _to_intent(cached)
+
+    # Breaker open or turn out of time: fail fast, the rule parser's answer stands
+    budget = remaining_budget()
+    if not get_client().available() or (budget is not None and budget <= 0):
+        return ParsedIntent(intent="clarify", confidence=0.0)
+
+    try:
+        # Identical texts in flight share one call; distinct ones arriving
+        # together go out as one batched prompt
+        deadline = None if budget is None else time.monotonic() + budget
+        data = get_parse_batcher().parse(cache.key(text, fingerprint), text, timeout=budget, deadline=deadline)
     except Exception:
-        return ParsedIntent(intent="clarify", confidence=0.0)
\ No newline at end of file
+        return ParsedIntent(intent="clarify", confidence=0.0)
+
+    # Only successful parses are cached; timeouts should be retried next time
+    cache.put(text, fingerprint, data)
+    return _to_intent(data)
@@ -1,7 +1,10 @@
 # SmartBudgetAI/memory.py
 
 from SmartBudgetAI.db import (
+    LOAN_TYPE,
+    REPAYMENT_TYPE,
     add_memory_fact as db_add_memory_fact,
+    get_loan_balances,
     get_memory_facts
 )
 
@@ -27,16 +30,25 @@ def get_active_loans(user_id):
     # FIX: Filter out 'repayment' or other types
     return [f for f in facts if f['memory_type'] == 'loan']
 
-def get_active_loan_items(user_id):
-    """
-    Used by chat_engine to list options for 'close loan'.
-    """
-    facts = get_memory_facts(user_id)
-    
-    # FIX: Ensure we only return items that are 'loan' AND 'active'
-    return [
-        f for f in facts
-        if f.get("memory_type") == "loan"
-        and f.get("status") == "active" 
-        and f.get("remaining_amount", 0) > 0
-    ]
\ No newline at end of file
+def get_active_loan_items(user_id, columns=None, after=None, limit=None):
+    """
+    Used by chat_engine to list options for 'close loan', and paged
+    (newest first) by the REST API.
+    """
+    # Type, status and balance are filtered in SQL (indexed), not over the full history
+    return get_memory_facts(user_id, memory_type=LOAN_TYPE, active_only=True, outstanding_only=True,
+                            columns=columns, after=after, limit=limit)
+
+def get_loan_history(user_id, columns=None, after=None, limit=None):
+    """
+    Every loan, open or closed, and every repayment, newest first.
+    """
+    return get_memory_facts(user_id, memory_type=(LOAN_TYPE, REPAYMENT_TYPE),
+                            columns=columns, after=after, limit=limit)
+
+def get_debt_summary(user_id):
+    """
+    Used by executor for 'who owes me'.
+    One row per counterparty from the loan_balances table.
+    """
+    return get_loan_balances(user_id)
\ No newline at end of file
@@ -1,44 +1,47 @@
-import re
 from datetime import datetime
+from SmartBudgetAI import lexer
 from SmartBudgetAI.db import add_memory_fact
 
-MONTHS = {
-    "jan": 1, "feb": 2, "mar": 3, "apr": 4,
-    "may": 5, "jun": 6, "jul": 7, "aug": 8,
-    "sep": 9, "oct": 10, "nov": 11, "dec": 12
-}
+def _iso_date(token):
+    month, day = token.value
+    year = datetime.today().year
+    return f"{year:04d}-{month:02d}-{day:02d}"
 
 def parse_simple_date(text):
-    match = re.search(r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+(\d{1,2})", text)
-    if match:
-        month = MONTHS[match.group(1)]
-        day = int(match.group(2))
-        year = datetime.today().year
-        return f"{year:04d}-{month:02d}-{day:02d}"
-    return None
+    date = lexer.first(lexer.tokenize(text), lexer.DATE)
+    return _iso_date(date) if date else None
 
 def extract_and_store_memory(text, user_id=1):
-    text_lower = text.lower()
-
-    loan_match = re.search(r"lent (\w+) \$?(\d+)", text_lower)
-    if not loan_match:
+    tokens = lexer.tokenize(text)
+
+    # "lent John $50": the word after "lent", then an amount
+    for i, token in enumerate(tokens[:-2]):
+        if token.text.lower() == "lent" and tokens[i + 1].kind in (lexer.NAME, lexer.WORD) \
+                and tokens[i + 2].kind == lexer.AMOUNT:
+            break
+    else:
         return None
 
-    entity = loan_match.group(1).capitalize()
-    amount = float(loan_match.group(2))
+    entity = tokens[i + 1].value.capitalize()
+    amount = tokens[i + 2].value
+    currency = tokens[i + 2].currency or "USD"
 
-    event_date = parse_simple_date(text_lower)
+    dates = [t for t in tokens if t.kind == lexer.DATE]
+    event_date = _iso_date(dates[0]) if dates else None
     due_date = None
 
-    if "return by" in text_lower:
-        due_date = parse_simple_date(text_lower.split("return by")[-1])
+    # "... return by feb 10"
+    start = text.lower().rfind("return by")
+    if start != -1:
+        due = next((t for t in dates if t.start >= start), None)
+        due_date = _iso_date(due) if due else None
 
     add_memory_fact(
         user_id=user_id,
         memory_type="loan",
         entity=entity,
         amount=amount,
-        currency="USD",
+        currency=currency,
         event_date=event_date,
         due_date=due_date,
         description=f"Lent money to {entity}"
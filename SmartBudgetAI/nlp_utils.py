@@ -1,15 +1,12 @@
-import re
+from SmartBudgetAI import lexer
 
 def extract_amount(text):
-    match = re.search(r'(\$|usd|rs|₹|€)?\s?(\d+(?:\.\d+)?)', text.lower())
-    if match:
-        return float(match.group(2))
+    # "$50", "usd 50", "rs 50", "₹50", "€50", "fifty"
+    token = lexer.amount(lexer.tokenize(text))
+    if token:
+        return float(token.value)
     return None
 
 def extract_entity(text):
     # Simple heuristic: first capitalized word
-    words = text.split()
-    for w in words:
-        if w.istitle():
-            return w
-    return None
\ No newline at end of file
+    return lexer.entity(lexer.tokenize(text))
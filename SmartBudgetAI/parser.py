@@ -1,48 +1,39 @@
 # SmartBudgetAI/parser.py
-import re
+from SmartBudgetAI import lexer
 from SmartBudgetAI.intent_schema import ParsedIntent
 from SmartBudgetAI.intent_specs import INTENT_SPECS
 
-# Regex to catch "300", "300.50", "$300"
-AMOUNT_REGEX = r"\b\d+(\.\d{1,2})?\b"
-
-STOPWORDS = {
-    "i", "me", "my", "you", "we", "us", "the", "a", "an", 
-    "to", "from", "for", "with", "him", "her"
-}
+STOPWORDS = lexer.STOPWORDS
 
 def extract_amount(text: str):
-    m = re.search(AMOUNT_REGEX, text)
-    return float(m.group()) if m else None
+    # "300", "300.50", "$300", "rs 1,200", "fifty"
+    token = lexer.amount(lexer.tokenize(text))
+    return float(token.value) if token else None
 
 def extract_entity(text: str):
-    # Split text and check for Title Case words that aren't stopwords
+    # First Title Case word that isn't a stopword or a keyword
     # e.g. "John" -> Match. "him" -> Skip.
-    words = text.split()
-    for w in words:
-        clean_w = w.strip(".,?!")
-        if clean_w.istitle() and clean_w.lower() not in STOPWORDS:
-            return clean_w
-    return None
+    return lexer.entity(lexer.tokenize(text))
 
 def parse_message(text: str) -> ParsedIntent:
-    text_lower = text.lower()
-    amount = extract_amount(text)
-    entity = extract_entity(text)
-
-    # 1. Check Explicit Keywords
-    for intent, spec in INTENT_SPECS.items():
-        for kw in spec["keywords"]:
-            if kw in text_lower:
-                return ParsedIntent(
-                    intent=intent,
-                    entity=entity,
-                    amount=amount,
-                    confidence=1.0
-                )
+    tokens = lexer.tokenize(text)
+    amount = lexer.amount(tokens)
+    amount = float(amount.value) if amount else None
+
+    # 1. Check Explicit Keywords (first intent in INTENT_SPECS order wins)
+    found = {t.value for t in tokens if t.kind == lexer.KEYWORD}
+    intent = next((i for i in INTENT_SPECS if i in found), None)
+    if intent is not None:
+        return ParsedIntent(
+            intent=intent,
+            entity=lexer.entity(tokens),
+            amount=amount,
+            confidence=1.0
+        )
 
     # 2. Ambiguous Case (No keywords, but Entity + Amount found)
     # e.g. "John 300"
+    entity = lexer.entity(tokens) if amount else None
     if entity and amount:
         return ParsedIntent(
             intent="clarify",
@@ -53,4 +44,4 @@ def parse_message(text: str) -> ParsedIntent:
         )
 
     # 3. Fallback
-    return ParsedIntent(intent="clarify", confidence=0.0)
\ No newline at end of file
+    return ParsedIntent(intent="clarify", confidence=0.0)
@@ -1,17 +1,20 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
-import sqlite3
-from SmartBudgetAI.db import DB_PATH
+from itertools import groupby
+from SmartBudgetAI import db
+from SmartBudgetAI.db import get_connection
 
 
 # ==================================================
 # DUE REMINDERS
 # ==================================================
-def get_due_reminders(user_id=1, days_ahead=7):
-    today = date.today()
-    upcoming_limit = today + timedelta(days=days_ahead)
+def get_due_reminders(user_id=1, days_ahead=7, today=None):
+    today = today or date.today()
+    # Exclusive: a due_date with a time ("2026-03-17T10:00") sorts after
+    # the bare last day, so "<= last day" would drop it
+    due_before = today + timedelta(days=days_ahead + 1)
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     cur.execute("""
         SELECT id, entity, remaining_amount, currency, due_date, description
@@ -20,12 +23,11 @@ def get_due_reminders(user_id=1, days_ahead=7):
           AND status = 'active'
           AND remaining_amount > 0
           AND due_date IS NOT NULL
-          AND due_date <= ?
+          AND due_date < ?
         ORDER BY due_date ASC
-    """, (user_id, upcoming_limit.isoformat()))
+    """, (user_id, due_before.isoformat()))
 
     rows = cur.fetchall()
-    conn.close()
 
     reminders = []
     for r in rows:
@@ -41,9 +43,9 @@ def get_due_reminders(user_id=1, days_ahead=7):
     return reminders
 
 
-def format_reminder_message(reminder):
-    due = date.fromisoformat(reminder["due_date"])
-    today = date.today()
+def format_reminder_message(reminder, today=None):
+    due = date.fromisoformat(reminder["due_date"][:10])
+    today = today or date.today()
     days_left = (due - today).days
 
     if days_left < 0:
@@ -65,22 +67,18 @@ def format_reminder_message(reminder):
 # ACTIVE LOAN SUMMARY (AGGREGATED)
 # ==================================================
 def get_active_loans_summary(user_id=1):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
+    # Pre-aggregated per counterparty (db.loan_balances)
     cur.execute("""
-        SELECT entity, SUM(remaining_amount)
-        FROM memory_facts
+        SELECT entity, remaining_amount
+        FROM loan_balances
         WHERE user_id = ?
-          AND memory_type = 'loan'
-          AND status = 'active'
           AND remaining_amount > 0
-        GROUP BY entity
-        ORDER BY SUM(remaining_amount) DESC
+        ORDER BY remaining_amount DESC
     """, (user_id,))
 
     rows = cur.fetchall()
-    conn.close()
 
     summary = []
     total_amount = 0.0
@@ -99,8 +97,7 @@ def get_active_loans_summary(user_id=1):
 # INDIVIDUAL ACTIVE LOANS (FOR CLOSING)
 # ==================================================
 def get_active_loan_items(user_id=1):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     cur.execute("""
         SELECT id, entity, remaining_amount, currency, due_date, description
@@ -113,7 +110,6 @@ def get_active_loan_items(user_id=1):
     """, (user_id,))
 
     rows = cur.fetchall()
-    conn.close()
 
     loans = []
     for r in rows:
@@ -127,3 +123,135 @@ def get_active_loan_items(user_id=1):
         })
 
     return loans
+
+
+# ==================================================
+# CROSS-USER SWEEP (DAILY NOTIFICATION JOB)
+# ==================================================
+SWEEP_BATCH_USERS = 1000
+
+
+def sweep_due_loans(days_ahead=7, today=None, due_from=None, due_to=None,
+                    batch_users=SWEEP_BATCH_USERS):
+    """
+    Every user's due or overdue active loans in ONE range scan over
+    idx_memory_facts_due, instead of one query per user.
+
+    Yields batches (lists) of up to `batch_users` (user_id, [reminder, ...])
+    pairs, users ascending. Reminders have the same shape as
+    get_due_reminders(). `due_from` / `due_to` (inclusive ISO dates)
+    narrow the scan to one shard. The scan itself is half-open,
+    [due_from, day after due_to), so a due_date carrying a time still
+    falls in exactly one shard.
+    """
+    today = today or date.today()
+    last_day = today + timedelta(days=days_ahead)
+    if due_to is not None:
+        last_day = min(last_day, date.fromisoformat(due_to))
+    due_before = (last_day + timedelta(days=1)).isoformat()
+
+    query = """
+        SELECT user_id, id, entity, remaining_amount, currency, due_date, description
+        FROM memory_facts INDEXED BY idx_memory_facts_due
+        WHERE status = 'active'
+          AND due_date IS NOT NULL
+          AND due_date < ?
+          AND remaining_amount > 0
+    """
+    params = [due_before]
+    if due_from is not None:
+        query += " AND due_date >= ?"
+        params.append(due_from)
+    # Only the matching (due) rows get sorted, not the whole table
+    query += " ORDER BY user_id, due_date"
+
+    cur = get_connection().execute(query, params)
+
+    batch = []
+    for user_id, rows in groupby(cur, key=lambda r: r[0]):
+        batch.append((user_id, [
+            {
+                "id": r[1],
+                "entity": r[2],
+                "amount": r[3],
+                "currency": r[4],
+                "due_date": r[5],
+                "description": r[6]
+            }
+            for r in rows
+        ]))
+        if len(batch) >= batch_users:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def sweep_reminder_messages(batches, today=None):
+    """
+    Lazily formats a sweep: yields (user_id, messages) where `messages`
+    is a generator, so nothing is formatted until a sender consumes it.
+    """
+    for batch in batches:
+        for user_id, reminders in batch:
+            yield user_id, (format_reminder_message(r, today) for r in reminders)
+
+
+def date_shards(due_from, due_to, shards):
+    """
+    Splits the inclusive ISO date range [due_from, due_to] into `shards`
+    (from, to) day ranges, each inclusive of its last day (see
+    sweep_due_loans for how times within a day are handled).
+    """
+    start = date.fromisoformat(due_from)
+    end = date.fromisoformat(due_to)
+    span = (end - start).days + 1
+    step = max(1, -(-span // shards))  # ceil division
+
+    ranges = []
+    cursor = start
+    while cursor <= end:
+        last = min(cursor + timedelta(days=step - 1), end)
+        ranges.append((cursor.isoformat(), last.isoformat()))
+        cursor = last + timedelta(days=1)
+    return ranges
+
+
+def count_reminders(batch):
+    """Default sweep handler: (users, reminders) in a batch."""
+    return len(batch), sum(len(reminders) for _, reminders in batch)
+
+
+def _sweep_shard(db_path, due_from, due_to, days_ahead, today, batch_users, handler):
+    db.DB_PATH = db_path  # workers may be spawned without the parent's config
+    return [
+        handler(batch)
+        for batch in sweep_due_loans(days_ahead, today, due_from, due_to, batch_users)
+    ]
+
+
+def sweep_due_loans_parallel(days_ahead=7, today=None, shards=4, processes=None,
+                             batch_users=SWEEP_BATCH_USERS, handler=count_reminders):
+    """
+    Runs sweep_due_loans() over date-partitioned shards in a process pool.
+    `handler(batch)` runs inside the worker (it must be picklable, i.e. a
+    module-level function) and its results come back in shard order.
+    A user whose loans straddle two shards appears once per shard.
+    """
+    today = today or date.today()
+    upcoming_limit = (today + timedelta(days=days_ahead)).isoformat()
+
+    oldest = get_connection().execute("""
+        SELECT MIN(due_date) FROM memory_facts INDEXED BY idx_memory_facts_due
+        WHERE status = 'active' AND due_date IS NOT NULL
+    """).fetchone()[0]
+    if oldest is None or oldest > upcoming_limit:
+        return []
+
+    ranges = date_shards(oldest[:10], upcoming_limit, shards)
+    with ProcessPoolExecutor(max_workers=processes or len(ranges)) as pool:
+        futures = [
+            pool.submit(_sweep_shard, db.DB_PATH, lo, hi, days_ahead, today, batch_users, handler)
+            for lo, hi in ranges
+        ]
+        return [result for f in futures for result in f.result()]
@@ -0,0 +1,141 @@
+# SmartBudgetAI/reminder_scheduler.py
+import heapq
+import threading
+from datetime import datetime
+from SmartBudgetAI import db
+
+# Seconds between background ticks when started with start()
+TICK_INTERVAL = 1.0
+
+
+class ReminderScheduler:
+    """
+    Fires "remind me" reminders without polling SQLite on every chat message.
+
+    Upcoming reminders sit in an in-memory min-heap ordered by remind_at,
+    loaded once from the DB and updated by add_reminder(). tick() pops the
+    due ones, marks them sent in one batch and puts the formatted text into
+    a per-user outbox; the chat path only calls drain(user_id).
+
+    The heap and outbox are per process: with several workers each one
+    loads the pending reminders, and db.claim_reminders() makes sure only
+    one of them delivers a given reminder.
+    """
+
+    def __init__(self, clock=datetime.now):
+        self.clock = clock
+        self._heap = []      # (remind_at ISO str, id, user_id, message, created_at)
+        self._outbox = {}    # user_id -> [formatted messages]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------------
+    # Loading & scheduling
+    # -------------------------------
+    def load(self):
+        rows = db.get_pending_reminders()
+        heap = [(remind_at, rem_id, user_id, message, created_at)
+                for rem_id, user_id, message, remind_at, created_at in rows]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+        return self
+
+    def schedule(self, reminder_id, user_id, message, remind_at, created_at):
+        with self._lock:
+            heapq.heappush(self._heap, (remind_at, reminder_id, user_id, message, created_at))
+
+    def add_reminder(self, user_id, message, remind_at):
+        """
+        Stores the reminder in the DB and schedules it once that commits: a
+        caller's transaction rolling back leaves nothing in the heap.
+        """
+        created_at = self.clock().isoformat()
+        reminder_id = db.add_reminder(user_id, message, remind_at, created_at=created_at)
+        db.after_commit(lambda: self.schedule(reminder_id, user_id, message, remind_at, created_at))
+        return reminder_id
+
+    def next_due_at(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    # -------------------------------
+    # Firing & delivery
+    # -------------------------------
+    def tick(self):
+        """Moves every due reminder into its user's outbox. Returns how many fired."""
+        now = self.clock()
+        now_str = now.isoformat()
+
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now_str:
+                due.append(heapq.heappop(self._heap))
+        if not due:
+            return 0
+
+        claimed = db.claim_reminders([entry[1] for entry in due])
+
+        fired = 0
+        with self._lock:
+            for _, rem_id, user_id, message, created_at in due:
+                if rem_id not in claimed:
+                    continue
+                try:
+                    text = db.format_due_reminder(message, created_at, now)
+                except Exception as e:
+                    print(f"Error processing reminder {rem_id}: {e}")
+                    continue
+                self._outbox.setdefault(user_id, []).append(text)
+                fired += 1
+        return fired
+
+    def drain(self, user_id):
+        """Returns and clears the user's fired reminders (no SQL when the thread runs)."""
+        if self._thread is None:
+            # No background thread: fire inline. Still only a heap peek
+            # unless something is actually due.
+            self.tick()
+        with self._lock:
+            return self._outbox.pop(user_id, [])
+
+    # -------------------------------
+    # Background thread
+    # -------------------------------
+    def start(self, interval=TICK_INTERVAL):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="reminder-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Reminder scheduler error: {e}")
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler, loaded from the DB on first use."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = ReminderScheduler().load()
+    return _SCHEDULER
@@ -1,18 +1,15 @@
 # SmartBudgetAI/rule_parser.py
 
-import re
+from SmartBudgetAI import lexer
 from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.keyword_matcher import KeywordMatcher
 
-AMOUNT_REGEX = r"\b\d+(\.\d{1,2})?\b"
-
-STOPWORDS = {
-    "i", "me", "my", "you", "we", "us",
-    "the", "a", "an", "all", "was", "were",
-    "to", "from", "for", "with", "him", "her"
-}
+STOPWORDS = lexer.STOPWORDS
 
 LEND_WORDS = {"lend", "lent", "gave", "paid"}
 RECEIVE_WORDS = {"received", "got", "repaid", "returned"}
+# Lending words win over receiving ones
+_LOAN_WORDS = KeywordMatcher({"loan_given": LEND_WORDS, "loan_received": RECEIVE_WORDS})
 
 
 def normalize_text(text: str) -> str:
@@ -20,41 +17,28 @@ def normalize_text(text: str) -> str:
 
 
 def extract_amount(text: str):
-    match = re.search(AMOUNT_REGEX, text)
-    return float(match.group()) if match else None
+    token = lexer.amount(lexer.tokenize(text))
+    return float(token.value) if token else None
 
 
 def extract_entity(text: str):
-    for w in text.split():
-        if w.istitle() and w.lower() not in STOPWORDS:
-            return w
-    return None
+    return lexer.entity(lexer.tokenize(text))
 
 
 def rule_parse(text: str) -> ParsedIntent:
-    normalized = normalize_text(text)
-    text_lower = normalized.lower()
-
-    amount = extract_amount(normalized)
-    entity = extract_entity(normalized)
+    tokens = lexer.tokenize(text)
 
-    # -------------------------------
-    # Explicit loan given
-    # -------------------------------
-    if any(w in text_lower for w in LEND_WORDS):
-        return ParsedIntent(
-            intent="loan_given",
-            entity=entity,
-            amount=amount,
-            confidence=0.9
-        )
+    amount = lexer.amount(tokens)
+    amount = float(amount.value) if amount else None
+    entity = lexer.entity(tokens)
 
     # -------------------------------
-    # Explicit loan received
+    # Explicit loan given / received
     # -------------------------------
-    if any(w in text_lower for w in RECEIVE_WORDS):
+    intent = _LOAN_WORDS.first(lexer.words(tokens))
+    if intent is not None:
         return ParsedIntent(
-            intent="loan_received",
+            intent=intent,
             entity=entity,
             amount=amount,
             confidence=0.9
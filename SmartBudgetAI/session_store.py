@@ -0,0 +1,228 @@
+# SmartBudgetAI/session_store.py
+"""
+Where chat_engine keeps each user's conversation state between turns
+(what it is waiting for, the pending ParsedIntent, the loans on offer).
+
+A session is loaded at the start of a turn and saved at the end. Idle
+sessions with nothing pending are not stored at all, so only users in the
+middle of a confirmation take up space.
+
+    MemorySessionStore  one process: LRU-capped, idle sessions expire
+    SqliteSessionStore  sessions table in the main DB, shared by every
+                        uvicorn worker on the host
+
+SESSION_STORE=sqlite picks the shared one; the default is memory.
+"""
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from SmartBudgetAI import db
+from SmartBudgetAI.intent_schema import ParsedIntent
+
+STATE_IDLE = "IDLE"
+
+# Sessions kept in memory; the least recently used go first
+MAX_SESSIONS = int(os.getenv("SESSION_MAX", "100000"))
+# A session untouched this long is dropped (the user walked away mid-question)
+TTL_SECONDS = float(os.getenv("SESSION_TTL", "3600"))
+# Saves between sweeps of expired rows (SqliteSessionStore)
+EVICT_EVERY = 500
+
+_INTENT_FIELDS = ("intent", "entity", "amount", "confidence", "source", "needs_confirmation", "intent_candidates")
+_INTENT_DEFAULTS = tuple(getattr(ParsedIntent(intent=""), f) for f in _INTENT_FIELDS)
+
+
+def new_session():
+    return {"state": STATE_IDLE, "data": {}}
+
+
+def is_idle(ctx):
+    """Nothing pending: the session needn't be stored."""
+    return ctx["state"] == STATE_IDLE and not ctx["data"]
+
+
+# -------------------------------
+# Serialization
+# -------------------------------
+def _encode_value(value):
+    if isinstance(value, ParsedIntent):
+        fields = list(vars(value).values())
+        # Trailing defaults are left off: most intents are 3-5 fields long
+        end = len(fields)
+        while end > 1 and fields[end - 1] == _INTENT_DEFAULTS[end - 1]:
+            end -= 1
+        return {"~i": fields[:end]}
+    raise TypeError(f"can't store {type(value).__name__} in a session")
+
+
+def _decode_object(obj):
+    if "~i" in obj and len(obj) == 1:
+        return ParsedIntent(**dict(zip(_INTENT_FIELDS, obj["~i"])))
+    return obj
+
+
+# Built once: json.dumps() with options constructs a new encoder per call
+_ENCODER = json.JSONEncoder(default=_encode_value, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode(ctx):
+    """A session as compact UTF-8 JSON: [state, data], ParsedIntents as positional lists."""
+    return _ENCODER.encode([ctx["state"], ctx["data"]]).encode()
+
+
+def decode(payload):
+    state, data = json.loads(payload, object_hook=_decode_object)
+    return {"state": state, "data": data}
+
+
+# -------------------------------
+# Stores
+# -------------------------------
+class SessionStore(ABC):
+    """
+    load() returns a fresh copy the caller may mutate; nothing is kept
+    until save(). Saving an idle, empty session deletes it.
+    """
+
+    def load(self, user_id):
+        payload = self._get(user_id)
+        return decode(payload) if payload is not None else new_session()
+
+    def save(self, user_id, ctx):
+        if is_idle(ctx):
+            self.delete(user_id)
+        else:
+            self._put(user_id, encode(ctx))
+
+    @abstractmethod
+    def _get(self, user_id):
+        """The stored payload, or None."""
+
+    @abstractmethod
+    def _put(self, user_id, payload):
+        """Stores an encoded, non-idle session."""
+
+    @abstractmethod
+    def delete(self, user_id):
+        """Forgets the user's session; a no-op if there is none."""
+
+    @abstractmethod
+    def clear(self):
+        """Forgets every session."""
+
+    @abstractmethod
+    def __len__(self):
+        """Sessions currently stored."""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions, at most `max_sessions`, each dropped after `ttl` seconds idle."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=TTL_SECONDS, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = OrderedDict()  # user_id -> (last_used, payload), least recent first
+        self._lock = threading.Lock()
+
+    def _get(self, user_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                return None
+            if now - entry[0] >= self.ttl:
+                del self._sessions[user_id]
+                return None
+            self._sessions[user_id] = (now, entry[1])
+            self._sessions.move_to_end(user_id)
+            return entry[1]
+
+    def _put(self, user_id, payload):
+        now = self.clock()
+        with self._lock:
+            self._sessions[user_id] = (now, payload)
+            self._sessions.move_to_end(user_id)
+            # Least recent first, so the expired ones are all at the front
+            sessions = self._sessions
+            while sessions and (len(sessions) > self.max_sessions
+                                or now - next(iter(sessions.values()))[0] >= self.ttl):
+                sessions.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in the main DB's sessions table, so a "yes" landing on a
+    different worker than the question still finds the pending intent.
+    """
+
+    def __init__(self, ttl=TTL_SECONDS, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def _get(self, user_id):
+        row = db.get_connection().execute(
+            "SELECT payload FROM sessions WHERE user_id = ? AND expires_at > ?",
+            (user_id, self.clock())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, user_id, payload):
+        now = self.clock()
+        with self._lock:
+            self._puts += 1
+            evict = self._puts % EVICT_EVERY == 0
+        with db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, payload, expires_at) VALUES (?, ?, ?)",
+                (user_id, payload, now + self.ttl)
+            )
+            if evict:
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, user_id):
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def clear(self):
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM sessions")
+
+    def __len__(self):
+        return db.get_connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (self.clock(),)
+        ).fetchone()[0]
+
+
+STORES = {"memory": MemorySessionStore, "sqlite": SqliteSessionStore}
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_session_store():
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                kind = os.getenv("SESSION_STORE", "memory")
+                if kind not in STORES:
+                    raise ValueError(f"SESSION_STORE={kind!r}, expected one of {sorted(STORES)}")
+                _STORE = STORES[kind]()
+    return _STORE
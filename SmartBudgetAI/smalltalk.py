@@ -0,0 +1,92 @@
+# SmartBudgetAI/smalltalk.py
+import random
+import re
+
+# Longer messages are never small talk; don't even run the patterns
+MAX_SMALLTALK_CHARS = 48
+
+# Words that can trail any small-talk phrase: "thanks bro", "hi smartbudget"
+_FILLER = r"(?:bro|bruh|man|dude|fam|bestie|g|smartbudget|bot|lol|lmao|haha|rn|tho|fr|😂|💀|🙏|👍|🔥)"
+
+# class -> (phrase pattern, reply templates, emoji pool).
+# Checked in order; the first class whose phrases cover the whole message wins.
+SMALLTALK = {
+    "help": (
+        r"help|help me|what can (?:you|u) do|how does this work|commands|menu",
+        ["I track who owes who 💸 try: 'lent Alex 20', 'Sam paid me back 10', 'who owes me', "
+         "'close loan' or 'remind me in 3 days to ping Jo' {emoji}"],
+        ["🧾", "📒", "✨"],
+    ),
+    "greeting": (
+        r"h+i+|h+e+y+|yo+|hello+|hiya|sup|wass?up|what'?s (?:up|good)|wyd|gm|good (?:morning|afternoon|evening)",
+        ["yo what's good? {emoji}", "heyy {emoji} what we tracking today?", "sup {emoji}",
+         "yo {emoji} who owes you money today?"],
+        ["💸", "✌️", "😎", "👋"],
+    ),
+    "thanks": (
+        r"thanks?|thank (?:you|u)|thx|ty|tysm|ily|appreciate (?:it|you|u)|you'?re the best|goat",
+        ["anytime {emoji}", "gotchu {emoji}", "np {emoji}", "that's what I'm here for {emoji}"],
+        ["💸", "🫡", "🤝", "✨"],
+    ),
+    "laugh": (
+        r"(?:ha)+h?|(?:he)+h?|lo+l+|lmf?a+o+|rofl|xd|😂+|🤣+|💀+",
+        ["lmaooo {emoji}", "💀💀", "fr {emoji}", "I'm weak {emoji}"],
+        ["😭", "💀", "😂"],
+    ),
+    "ack": (
+        r"ok(?:ay)?|k+|kk|cool|ok cool|bet|nice|got it|sounds good|word|aight|alright|perfect|great|sure|yep|yeah|ya|fine|noted|true|facts",
+        ["bet {emoji}", "say less {emoji}", "👍", "cool cool {emoji}"],
+        ["🤝", "✅", "😎"],
+    ),
+    "how_are_you": (
+        r"how (?:are|r) (?:you|u)(?: doing)?|hru|how'?s it going|how you doing|you good",
+        ["chillin, watching your money {emoji}", "vibing {emoji} you?", "all good fr {emoji}"],
+        ["😌", "💸", "✨"],
+    ),
+    "bye": (
+        r"bye+|cya|see (?:ya|you)|later|laters|ttyl|gn|good ?night|peace(?: out)?|i'?m out",
+        ["later {emoji}", "peace {emoji}", "catch u later {emoji}"],
+        ["✌️", "👋", "🫡"],
+    ),
+}
+
+
+def _compile(phrases):
+    phrase = f"(?:{phrases})"
+    # One or more phrases of the class, optionally padded with filler words
+    return re.compile(rf"{phrase}(?: (?:{phrase}|{_FILLER}))*")
+
+
+_PATTERNS = [(name, _compile(phrases)) for name, (phrases, _, _) in SMALLTALK.items()]
+_PUNCT = re.compile(r"[!?.,~:;*]+")
+_rng = random.Random()
+
+
+def _normalize(text):
+    return " ".join(_PUNCT.sub(" ", text.lower()).split())
+
+
+def classify_smalltalk(text):
+    """The small-talk class covering the whole message, or None."""
+    if len(text) > MAX_SMALLTALK_CHARS:
+        return None
+    normalized = _normalize(text)
+    if not normalized:
+        return None
+    for name, pattern in _PATTERNS:
+        if pattern.fullmatch(normalized):
+            return name
+    return None
+
+
+def smalltalk_reply(text, rng=None):
+    """
+    A local persona reply for high-frequency chit-chat ("hi", "thanks",
+    "lol", "ok cool"), or None if the message needs the LLM.
+    """
+    name = classify_smalltalk(text)
+    if name is None:
+        return None
+    rng = rng or _rng
+    _, templates, emojis = SMALLTALK[name]
+    return rng.choice(templates).format(emoji=rng.choice(emojis))
@@ -0,0 +1,89 @@
+# SmartBudgetAI/speculation.py
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Speculative persona replies in flight at once; more wait for a worker
+SPECULATIVE_WORKERS = int(os.getenv("LLM_SPECULATIVE_WORKERS", "4"))
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class Speculation:
+    """
+    Runs a reply generator on a worker thread before we know it's needed.
+
+    Iterating yields its parts as they are produced (so a streamed reply
+    still streams); cancel() makes the worker stop and close the generator,
+    which for an LLM stream drops the HTTP response and frees the client's
+    slot. The worker checks between parts, so a stream is abandoned at its
+    next token. The caller's contextvars (the turn's LLM deadline) carry over.
+    """
+
+    def __init__(self, make_parts, *args, executor=None):
+        self._queue = queue.SimpleQueue()
+        self._cancelled = threading.Event()
+        context = contextvars.copy_context()
+        self._future = (executor or _executor()).submit(context.run, self._produce, make_parts, args)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _produce(self, make_parts, args):
+        if self.cancelled:
+            self._queue.put(_DONE)
+            return
+        parts = None
+        try:
+            parts = make_parts(*args)
+            for part in parts:
+                if self.cancelled:
+                    break
+                self._queue.put(part)
+        except BaseException as e:
+            self._queue.put(_Failed(e))
+        finally:
+            if hasattr(parts, "close"):
+                parts.close()
+            self._queue.put(_DONE)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def __iter__(self):
+        try:
+            while True:
+                part = self._queue.get()
+                if part is _DONE:
+                    return
+                if isinstance(part, _Failed):
+                    raise part.error
+                yield part
+        finally:
+            # Abandoned mid-reply (client went away): stop generating
+            self.cancel()
+
+    def wait(self, timeout=None):
+        """Blocks until the worker has finished or given up; for tests and benchmarks."""
+        self._future.result(timeout)
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+    return _EXECUTOR
@@ -1,26 +1,52 @@
 # SmartBudgetAI/conftest.py
 import pytest
-import sqlite3
-from SmartBudgetAI.db import DB_PATH, ensure_table
+from datetime import datetime, timedelta
+from SmartBudgetAI import (
+    db, entity_index, few_shot_index, intent_classifier, llm_cache, llm_client, llm_fallback,
+    reminder_scheduler, session_store,
+)
+from SmartBudgetAI.db import ensure_table
 
 @pytest.fixture(autouse=True)
-def reset_system():
-    # 1. Reset Session Context
-    from SmartBudgetAI.chat_engine import SESSION_CONTEXT
-    SESSION_CONTEXT.clear()
-    
-    # 2. Reset Database (Truncate tables)
-    ensure_table() # Ensure DB exists first
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM expenses")
-    cursor.execute("DELETE FROM memory_facts")
-    # Reset auto-increment counters so IDs start at 1
-    cursor.execute("DELETE FROM sqlite_sequence WHERE name='expenses'")
-    cursor.execute("DELETE FROM sqlite_sequence WHERE name='memory_facts'")
-    conn.commit()
-    conn.close()
-    
+def reset_system(tmp_path, monkeypatch):
+    # 1. Fresh in-memory session store per test
+    monkeypatch.setattr(session_store, "_STORE", session_store.MemorySessionStore())
+
+    # 2. Fresh Database per test (never touch the real smartbudget.db)
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "smartbudget.db"))
+    ensure_table()
+    monkeypatch.setattr(reminder_scheduler, "_SCHEDULER", None)
+    monkeypatch.setattr(llm_cache, "_CACHE", None)
+    monkeypatch.setattr(llm_client, "_CLIENT", None)
+    monkeypatch.setattr(few_shot_index, "_INDEXES", {})
+    monkeypatch.setattr(entity_index, "_INDEXES", entity_index.OrderedDict())
+    monkeypatch.setattr(llm_fallback, "_BATCHER", None)
+    monkeypatch.setattr(intent_classifier, "TRAINING_FILE", str(tmp_path / "training_data.jsonl"))
+    monkeypatch.setattr(intent_classifier, "MODEL_FILE", str(tmp_path / "intent_model.joblib"))
+    monkeypatch.setattr(intent_classifier, "_CLASSIFIERS", {})
+
     yield
-    
-    SESSION_CONTEXT.clear()
\ No newline at end of file
+
+    if llm_fallback._BATCHER is not None:
+        llm_fallback._BATCHER.close()
+    db.close_connections()
+
+
+class FakeClock:
+    """A clock tests move by hand: a datetime, or monotonic-style seconds."""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        step = timedelta(**kwargs)
+        self.now += step if isinstance(self.now, datetime) else step.total_seconds()
+
+
+@pytest.fixture
+def fake_clock():
+    """FakeClock itself: fake_clock(datetime(...)), or fake_clock() for seconds from 1000.0."""
+    return FakeClock
@@ -0,0 +1,169 @@
+# SmartBudgetAI/tests/fake_ollama.py
+"""
+A tiny stand-in for Ollama's /api/chat, for tests and benchmarks.
+
+    with FakeOllama(reply=lambda payload: "hi", latency=0.05) as server:
+        client = OllamaClient(url=server.url)
+
+It speaks HTTP/1.1 keep-alive, so connection reuse is observable via
+server.connections (one entry per TCP connection accepted).
+
+Generation is simulated as `latency` before the first word, then one word
+every `token_latency`. Requests with "stream": true get each word as an
+NDJSON chunk when it is "generated"; others get the whole reply at the end.
+`parallel` caps simultaneous generations like OLLAMA_NUM_PARALLEL; extra
+requests queue (a CPU-bound local model effectively runs with 1).
+"""
+import contextlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _echo(payload):
+    return payload["messages"][-1]["content"]
+
+
+def fake_parse(text):
+    """Crude stand-in for the parser model on '<verb> <Name> <amount>' texts."""
+    words = text.split()
+    entity = next((w for w in words[1:] if w[:1].isupper()), None)
+    amount = next((float(w) for w in words if w.replace(".", "", 1).isdigit()), None)
+    return {"intent": "loan_given", "entity": entity, "amount": amount}
+
+
+def parser_reply(payload):
+    """reply= for parser traffic: one JSON object, or an array for batch prompts."""
+    system, user = payload["messages"][0]["content"], payload["messages"][-1]["content"]
+    if "numbered line" in system:
+        return json.dumps([fake_parse(line.split(". ", 1)[1]) for line in user.splitlines()])
+    return json.dumps(fake_parse(user))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.fake.connection_opened(self.client_address)
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.loads(body)
+
+        with fake.slots:
+            self._generate(fake, payload)
+
+    def _generate(self, fake, payload):
+        fake.request_started(payload)
+        try:
+            if fake.latency:
+                time.sleep(fake.latency)
+            content = fake.reply(payload)
+            tokens = re.findall(r"\S+\s*", content) or [""]
+            if payload.get("stream"):
+                self._stream(payload, tokens, fake.token_latency)
+                return
+            if fake.token_latency:
+                time.sleep(fake.token_latency * (len(tokens) - 1))
+        finally:
+            fake.request_finished()
+
+        data = json.dumps({
+            "model": payload.get("model"),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, payload, tokens, token_latency):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i, token in enumerate(tokens):
+            if i and token_latency:
+                time.sleep(token_latency)
+            self._chunk({
+                "model": payload.get("model"),
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            })
+        self._chunk({"model": payload.get("model"), "message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, obj):
+        line = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is normal, not a failure
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOllama:
+    def __init__(self, reply=_echo, latency=0.0, token_latency=0.0, parallel=None):
+        self.reply = reply
+        self.latency = latency
+        self.token_latency = token_latency
+        self.slots = threading.Semaphore(parallel) if parallel else contextlib.nullcontext()
+        self.requests = []
+        self.connections = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/chat"
+
+    def connection_opened(self, address):
+        with self._lock:
+            self.connections.append(address)
+
+    def request_started(self, payload):
+        with self._lock:
+            self.requests.append(payload)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
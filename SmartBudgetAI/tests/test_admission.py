@@ -0,0 +1,229 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+from SmartBudgetAI import llm_client, llm_fallback
+from SmartBudgetAI.api import main
+from SmartBudgetAI.api.admission import AdmissionControl, Overloaded
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.db import get_memory_facts
+from SmartBudgetAI.llm_client import OllamaClient
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+PERSONA = "lol same 💀"
+# Open-ended, so every turn waits on the (slow) persona
+MESSAGE = "tell me a joke"
+
+
+def _reply(payload):
+    if "financial parser" in payload["messages"][0]["content"]:
+        return '{"intent": "clarify"}'
+    return PERSONA
+
+
+def test_rejects_with_503_once_the_queue_is_full():
+    async def run():
+        control = AdmissionControl(max_active=1, max_queued=1)
+        tickets = [control.reserve(1), control.reserve(2)]
+        with pytest.raises(Overloaded) as refused:
+            control.reserve(3)
+        for ticket in tickets:
+            ticket.release()
+        control.reserve(3).release()
+        control.close()
+        return refused.value
+
+    refused = asyncio.run(run())
+    assert refused.status == 503 and refused.retry_after >= 1
+
+
+def test_rejects_with_429_past_the_per_user_cap():
+    async def run():
+        control = AdmissionControl(max_active=4, max_queued=4, max_per_user=2)
+        control.reserve(1), control.reserve(1)
+        with pytest.raises(Overloaded) as refused:
+            control.reserve(1)
+        control.reserve(2)
+        control.close()
+        return refused.value, control.rejected
+
+    refused, rejected = asyncio.run(run())
+    assert refused.status == 429
+    assert rejected == {429: 1, 503: 0}
+
+
+def test_one_users_messages_run_one_at_a_time_in_order():
+    events = []
+
+    async def turn(control, user_id, n):
+        async with control.reserve(user_id):
+            events.append(("start", user_id, n))
+            await asyncio.sleep(0.01)
+            events.append(("end", user_id, n))
+
+    async def run():
+        control = AdmissionControl(max_active=4, max_queued=4)
+        await asyncio.gather(*(turn(control, 1, n) for n in range(3)), turn(control, 2, 0))
+        control.close()
+        return control.snapshot()
+
+    snapshot = asyncio.run(run())
+    mine = [e for e in events if e[1] == 1]
+    assert mine == [(kind, 1, n) for n in range(3) for kind in ("start", "end")]
+    # The other user didn't wait behind them
+    assert events.index(("start", 2, 0)) < events.index(("end", 1, 0))
+    assert snapshot["pending"] == snapshot["active"] == 0
+
+
+def test_cancelled_waiter_gives_its_place_back():
+    async def run():
+        control = AdmissionControl(max_active=1, max_queued=1)
+        async with control.reserve(1):
+            waiter = asyncio.ensure_future(control.reserve(2).__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        control.close()
+        return control
+
+    control = asyncio.run(run())
+    assert control.snapshot()["pending"] == 0
+    assert control._users == {}
+
+
+@pytest.fixture
+def slow_llm(monkeypatch, tmp_path):
+    with FakeOllama(reply=_reply, latency=0.3) as fake:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=fake.url, max_concurrency=4))
+        monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+        yield fake
+
+
+def _saturate(api, bodies):
+    with ThreadPoolExecutor(len(bodies)) as pool:
+        return list(pool.map(lambda body: api.post("/chat", json=body), bodies))
+
+
+def test_api_sheds_load_and_health_stays_responsive(slow_llm):
+    with TestClient(app) as api:
+        api.app.state.admission.close()
+        api.app.state.admission = AdmissionControl(max_active=1, max_queued=1)
+
+        with ThreadPoolExecutor(1) as background:
+            burst = background.submit(_saturate, api, [{"user_id": u, "message": MESSAGE} for u in range(4)])
+            time.sleep(0.1)
+            start = time.perf_counter()
+            health = api.get("/health")
+            health_seconds = time.perf_counter() - start
+            responses = burst.result()
+
+    assert health.status_code == 200 and health_seconds < 0.2
+    assert sorted(r.status_code for r in responses) == [200, 200, 503, 503]
+    refused = [r for r in responses if r.status_code == 503]
+    assert all(int(r.headers["Retry-After"]) >= 1 for r in refused)
+    assert all(r.json()["reply"] == PERSONA for r in responses if r.status_code == 200)
+
+
+def test_api_rate_limits_one_user(slow_llm):
+    with TestClient(app) as api:
+        api.app.state.admission.close()
+        api.app.state.admission = AdmissionControl(max_active=4, max_queued=4, max_per_user=1)
+        responses = _saturate(api, [{"user_id": 7, "message": MESSAGE}] * 2)
+
+    assert sorted(r.status_code for r in responses) == [200, 429]
+    assert "Retry-After" in next(r for r in responses if r.status_code == 429).headers
+
+
+def test_same_user_double_send_confirms_once(slow_llm):
+    with TestClient(app) as api:
+        assert "John" in api.post("/chat", json={"user_id": 9, "message": "I lent John 50 dollars"}).json()["reply"]
+        replies = [r.json()["reply"] for r in _saturate(api, [{"user_id": 9, "message": "yes"}] * 2)]
+
+    # The second "yes" sees the state the first one left behind, not a stale copy
+    assert sum(r.startswith("Recorded") for r in replies) == 1
+    assert len(get_memory_facts(9)) == 1
+
+
+def test_batch_counts_each_user_against_the_queue():
+    async def run():
+        control = AdmissionControl(max_active=1, max_queued=2)
+        held = control.reserve(9)
+        with pytest.raises(Overloaded) as refused:
+            control.reserve_batch([1, 2, 3])
+        tickets = control.reserve_batch([1, 2])
+        with pytest.raises(Overloaded):
+            control.reserve(4)
+        for ticket in [held, *tickets]:
+            ticket.release()
+        control.close()
+        return refused.value, control.snapshot()
+
+    refused, snapshot = asyncio.run(run())
+    assert refused.status == 503
+    assert snapshot["pending"] == 0 and snapshot["rejected"][503] == 2
+
+
+def _slow_stream(events):
+    def stream(text, user_id):
+        try:
+            events.append("next started")
+            time.sleep(0.2)
+            events.append("next finished")
+            yield "lol"
+        finally:
+            events.append("closed")
+    return stream
+
+
+def test_stream_cancelled_mid_turn_finishes_before_releasing(monkeypatch):
+    events = []
+    monkeypatch.setattr(main, "handle_user_message_stream", _slow_stream(events))
+
+    async def run():
+        control = AdmissionControl(max_active=1, max_queued=1)
+        ticket = control.reserve(1)
+
+        async def consume():
+            async for _ in main._sse_events(control, ticket, main.ChatRequest(user_id=1, message="hi")):
+                pass
+
+        async with anyio.create_task_group() as group:
+            group.start_soon(consume)
+            await anyio.sleep(0.05)
+            # The client disconnects while next() runs in its thread
+            group.cancel_scope.cancel()
+        control.close()
+        return control
+
+    control = asyncio.run(run())
+    # The turn ran to completion and was closed before the user's lock was let go
+    assert events == ["next started", "next finished", "closed"]
+    assert control.snapshot()["pending"] == 0 and control._users == {}
+
+
+def test_stream_never_sent_still_releases_its_ticket(monkeypatch):
+    events = []
+    monkeypatch.setattr(main, "handle_user_message_stream", _slow_stream(events))
+
+    async def gone(message):
+        raise OSError("client went away")
+
+    async def run():
+        control = AdmissionControl(max_active=1, max_queued=1)
+        ticket = control.reserve(1)
+        response = main._TicketedStream(
+            main._sse_events(control, ticket, main.ChatRequest(user_id=1, message="hi")), ticket
+        )
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(ClientDisconnect):
+            await response(scope, None, gone)
+        control.close()
+        return control
+
+    control = asyncio.run(run())
+    assert events == []
+    assert control.snapshot()["pending"] == 0 and control._users == {}
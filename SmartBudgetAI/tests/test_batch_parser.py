@@ -0,0 +1,64 @@
+import json
+import pytest
+from SmartBudgetAI import batch_parser
+from SmartBudgetAI.batch_parser import ParseStats, parse_many
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.parser import parse_message
+from SmartBudgetAI.rule_parser import rule_parse
+
+TEXTS = ["Lent John 50", "who owes me", "hi", "Sam repaid 20", "John 300", "Gave Mia 15"] * 7
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_keeps_order(workers):
+    assert list(parse_many(iter(TEXTS), workers=workers, chunk_size=4)) == [parse_message(t) for t in TEXTS]
+    assert list(parse_many(TEXTS, "rule_parse", workers=workers, chunk_size=5)) == [rule_parse(t) for t in TEXTS]
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        list(parse_many(TEXTS, "llm"))
+
+
+def test_stats():
+    stats = ParseStats()
+    for confidence, intent in [(0.0, "clarify"), (0.5, "clarify"), (0.95, "loan_given"), (1.0, "loan_given")]:
+        stats.add(ParsedIntent(intent=intent, confidence=confidence))
+    assert stats.count == 4
+    assert stats.intents == {"clarify": 2, "loan_given": 2}
+    assert stats.confidence == [1, 0, 0, 0, 0, 1, 0, 0, 0, 2]
+    assert "loan_given" in stats.report()
+
+
+def _write_corpus(path):
+    with open(path, "w") as f:
+        for i, text in enumerate(TEXTS):
+            f.write(json.dumps({"id": i, "message": text}) + "\n")
+        f.write("\n")
+        f.write(json.dumps({"id": "no text"}) + "\n")
+
+
+def test_cli_jsonl(tmp_path, capsys):
+    _write_corpus(tmp_path / "in.jsonl")
+    batch_parser.main([str(tmp_path / "in.jsonl"), "-o", str(tmp_path / "out.jsonl"),
+                       "--workers", "2", "--chunk-size", "10"])
+
+    with open(tmp_path / "out.jsonl") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["text"] for r in rows] == TEXTS
+    assert [r["line"] for r in rows] == list(range(1, len(TEXTS) + 1))
+    assert rows[0]["intent"] == "loan_given" and rows[0]["entity"] == "John"
+    assert f"{len(TEXTS)} messages" in capsys.readouterr().err
+
+
+def test_cli_parquet(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    _write_corpus(tmp_path / "in.jsonl")
+    stats = batch_parser.run(str(tmp_path / "in.jsonl"), str(tmp_path / "out.parquet"),
+                             parser="rule_parse", workers=1, chunk_size=8)
+
+    df = pd.read_parquet(tmp_path / "out.parquet")
+    assert len(df) == stats.count == len(TEXTS)
+    assert df["intent"].value_counts().to_dict() == dict(stats.intents)
+    assert list(df.loc[4, "intent_candidates"]) == ["loan_given", "loan_received"]
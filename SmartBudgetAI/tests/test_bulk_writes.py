@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from SmartBudgetAI import db
+
+
+def test_bulk_expenses_from_generator_in_chunks():
+    rows = ((f"2026-01-{d:02d}", "food", d, None) for d in range(1, 26))
+
+    ranges = db.add_expenses_bulk(1, rows, chunk_size=10)
+
+    assert ranges == [range(1, 26)]
+    df = db.get_expenses(1)
+    assert len(df) == 25
+    assert df["amount"].sum() == sum(range(1, 26))
+
+
+def test_bulk_expenses_from_dataframe():
+    db.add_expense(1, "2025-12-31", "rent", 900, "existing")
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(["2026-01-01", "2026-01-02"]),
+        "category": ["food", "travel"],
+        "amount": [10.5, 20],
+    })
+
+    ranges = db.add_expenses_bulk(1, frame)
+
+    assert ranges == [range(2, 4)]
+    df = db.get_expenses(1)
+    assert set(df["date"]) == {"2025-12-31", "2026-01-01", "2026-01-02"}
+    assert df["note"].isna().sum() == 2
+
+
+def test_bulk_memory_facts_dicts_and_defaults():
+    rows = [
+        {"memory_type": "loan", "entity": "John", "amount": 100},
+        ("loan", "Alex", 50, "EUR"),
+    ]
+
+    ranges = db.add_memory_facts_bulk(7, rows)
+
+    facts = {f["id"]: f for f in db.get_memory_facts(7)}
+    assert list(ranges[0]) == sorted(facts)
+    assert facts[ranges[0][0]]["currency"] == "USD"
+    assert facts[ranges[0][1]]["currency"] == "EUR"
+    assert all(f["remaining_amount"] == f["amount"] for f in facts.values())
+
+
+def test_bulk_insert_is_all_or_nothing():
+    rows = [("2026-01-01", "food", 5, None), ("2026-01-02", "food", "oops", None)]
+
+    with pytest.raises(ValueError):
+        db.add_expenses_bulk(1, rows, chunk_size=1)
+
+    assert db.get_expenses(1).empty
@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from SmartBudgetAI import chat_engine, db
+from SmartBudgetAI.api.admission import AdmissionControl
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.chat_engine import handle_user_message, handle_user_messages
+from SmartBudgetAI.db import get_memory_facts
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.reminder_scheduler import get_scheduler
+from SmartBudgetAI.session_store import get_session_store
+
+TURNS = ["I lent John 50 dollars", "yes", "Lent Sam 20", "nope", "Lent Priya 15", "yes"]
+
+
+def test_batch_replies_match_one_at_a_time():
+    one_by_one = [handle_user_message(text, user_id=1) for text in TURNS]
+    assert handle_user_messages(TURNS, user_id=2) == one_by_one
+    assert [f["entity"] for f in get_memory_facts(2)] == [f["entity"] for f in get_memory_facts(1)]
+
+
+def test_write_lock_is_not_held_across_llm_calls(monkeypatch):
+    # John's loan is written on turn 2; the joke on turn 3 waits on the
+    # persona, during which another connection must still be able to write
+    def persona_while_someone_writes(text):
+        with ThreadPoolExecutor(1) as other:
+            other.submit(db.add_expense, 9, "2025-01-01", "food", 5, None).result(timeout=1)
+        return "lol same 💀"
+
+    monkeypatch.setattr(chat_engine, "chat_with_persona", persona_while_someone_writes)
+    replies = handle_user_messages(["I lent John 50 dollars", "yes", "tell me a joke"], user_id=1)
+
+    assert replies[2] == "lol same 💀"
+    assert [f["entity"] for f in get_memory_facts(1)] == ["John"]
+    assert len(db.get_expenses(9)) == 1
+
+
+def test_repayment_survives_a_commit_between_the_turns_read_and_write(monkeypatch):
+    db.add_memory_fact(1, db.LOAN_TYPE, "John", 50)
+    get_session_store().save(1, {"state": chat_engine.STATE_CONFIRM_ACTION, "data": {
+        "pending_intent": ParsedIntent(intent="loan_received", entity="John", amount=20),
+    }})
+    execute = chat_engine.execute_intent
+
+    def read_then_someone_else_pays(user_id, parsed):
+        # The turn has read; meanwhile another worker records a repayment
+        db.get_connection().execute("SELECT COUNT(*) FROM memory_facts").fetchone()
+        with ThreadPoolExecutor(1) as other:
+            other.submit(db.apply_repayment, 1, "John", 5).result(timeout=1)
+        return execute(user_id, parsed)
+
+    monkeypatch.setattr(chat_engine, "execute_intent", read_then_someone_else_pays)
+    [reply] = handle_user_messages(["yes"], user_id=1)
+
+    assert "Remaining balance: **$25**" in reply
+    assert db.get_loan_balances(1)[0]["remaining_amount"] == 25
+
+
+def test_reminders_are_drained_once_ahead_of_the_first_reply():
+    db.add_reminder(1, "pay rent", "2026-01-01T08:00:00", created_at="2025-12-30T08:00:00")
+    replies = handle_user_messages(["I lent John 50 dollars", "yes"], user_id=1)
+    assert "pay rent" in replies[0] and replies[0].endswith("$50?")
+    assert "pay rent" not in replies[1]
+
+
+def test_failed_turn_rolls_back_only_itself(monkeypatch):
+    execute = chat_engine.execute_intent
+    calls = []
+
+    def fails_second_time(user_id, parsed):
+        calls.append(parsed.entity)
+        if len(calls) > 1:
+            raise RuntimeError("disk on fire")
+        return execute(user_id, parsed)
+
+    handle_user_messages(["I lent John 50 dollars"], user_id=1)
+    get_scheduler().add_reminder(1, "pay rent", "2026-01-01T08:00:00")
+    monkeypatch.setattr(chat_engine, "execute_intent", fails_second_time)
+    with pytest.raises(RuntimeError):
+        handle_user_messages(["yes", "Lent Sam 20", "yes"], user_id=1)
+
+    # John's turn committed; the failed "yes" left Sam's loan pending
+    assert calls == ["John", "Sam"]
+    assert [f["entity"] for f in get_memory_facts(1)] == ["John"]
+    assert get_session_store().load(1)["data"]["pending_intent"].entity == "Sam"
+    # The reminder wasn't swallowed with the failed batch's replies
+    assert "pay rent" in handle_user_message("hi", user_id=1)
+
+
+def test_batch_endpoint_keeps_item_order():
+    items = [
+        {"user_id": 1, "message": "I lent John 50 dollars"},
+        {"user_id": 2, "message": "Lent Sam 20"},
+        {"user_id": 1, "message": "yes"},
+        {"user_id": 2, "message": "nope"},
+    ]
+    with TestClient(app) as api:
+        response = api.post("/chat/batch", json={"items": items})
+
+    assert response.status_code == 200
+    assert response.json()["replies"] == [
+        "Do you want to record that you lend John $50?",
+        "Do you want to record that you lend Sam $20?",
+        "Recorded — you successfully **lent** John $50.",
+        "Cancelled. 👍",
+    ]
+
+
+def test_batch_endpoint_is_refused_when_full():
+    with TestClient(app) as api:
+        api.app.state.admission.close()
+        api.app.state.admission = gate = AdmissionControl(max_active=1, max_queued=0)
+        held = gate.reserve(5)
+        response = api.post("/chat/batch", json={"items": [{"user_id": 1, "message": "hi"}]})
+        held.release()
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_batch_spanning_more_users_than_capacity_is_too_large():
+    items = [{"user_id": u, "message": "hi"} for u in range(3)]
+    with TestClient(app) as api:
+        api.app.state.admission.close()
+        api.app.state.admission = AdmissionControl(max_active=1, max_queued=1)
+        response = api.post("/chat/batch", json={"items": items})
+
+    assert response.status_code == 413
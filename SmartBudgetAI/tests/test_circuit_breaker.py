@@ -0,0 +1,120 @@
+import socket
+import time
+import pytest
+from fastapi.testclient import TestClient
+from SmartBudgetAI import chat_engine, llm_client, llm_fallback
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from SmartBudgetAI.llm_client import LLMError, LLMUnavailable, OllamaClient, llm_deadline
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+MESSAGES = [{"role": "user", "content": "yo"}]
+
+
+def _dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/api/chat"
+
+
+def test_breaker_opens_and_probes_once():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_client_fails_fast_once_open():
+    client = OllamaClient(url=_dead_url())
+    for _ in range(llm_client.FAILURE_THRESHOLD):
+        with pytest.raises(LLMError):
+            client.chat("m", MESSAGES)
+    assert client.breaker.state == OPEN
+
+    with pytest.raises(LLMUnavailable):
+        client.chat("m", MESSAGES)
+    assert client.health()["breaker"]["rejected"] == 1
+
+
+def test_half_open_probe_recovers():
+    with FakeOllama() as server:
+        client = OllamaClient(url=_dead_url(), breaker=CircuitBreaker(1, reset_timeout=0.05))
+        with pytest.raises(LLMError):
+            client.chat("m", MESSAGES)
+
+        client.url = server.url  # Ollama comes back
+        with pytest.raises(LLMUnavailable):
+            client.chat("m", MESSAGES)
+        time.sleep(0.06)
+        assert client.chat("m", MESSAGES) == "yo"
+        assert client.breaker.state == CLOSED
+
+
+def test_adaptive_timeout_follows_p95():
+    client = OllamaClient()
+    assert client.adaptive_timeout() == llm_client.READ_TIMEOUT
+    for _ in range(llm_client.MIN_SAMPLES):
+        client.latency.observe(1.0)
+    assert client.adaptive_timeout() == llm_client.MIN_READ_TIMEOUT
+    for _ in range(llm_client.LATENCY_WINDOW):
+        client.latency.observe(10.0)
+    assert client.adaptive_timeout() == 20.0
+
+
+def test_budget_caps_the_read_timeout_without_tripping():
+    with FakeOllama(latency=0.5) as server:
+        client = OllamaClient(url=server.url, breaker=CircuitBreaker(1))
+        start = time.perf_counter()
+        with llm_deadline(time.monotonic() + 0.15), pytest.raises(LLMError):
+            client.chat("m", MESSAGES)
+        assert time.perf_counter() - start < 0.4
+        assert client.breaker.state == CLOSED
+
+        with llm_deadline(time.monotonic() - 1), pytest.raises(LLMUnavailable):
+            client.chat("m", MESSAGES)
+
+
+def test_slow_llm_turn_stays_within_budget(monkeypatch, tmp_path):
+    monkeypatch.setattr(chat_engine, "TURN_BUDGET", 0.3)
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+    with FakeOllama(latency=2.0) as server:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=server.url))
+        start = time.perf_counter()
+        reply = handle_user_message("tell me something fun", user_id=1)
+        assert time.perf_counter() - start < 0.8
+
+    assert reply == llm_fallback.CANNED_DEFAULT
+
+
+def test_open_breaker_serves_rules_and_canned_replies(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+    with FakeOllama() as server:
+        client = OllamaClient(url=server.url)
+        for _ in range(llm_client.FAILURE_THRESHOLD):
+            client.breaker.record_failure()
+        monkeypatch.setattr(llm_client, "_CLIENT", client)
+
+        assert handle_user_message("Lent John 50", user_id=1).startswith("Do you want to record")
+        assert handle_user_message("tell me something fun", user_id=2) == llm_fallback.CANNED_DEFAULT
+        assert server.requests == []
+
+        with TestClient(app) as api:
+            health = api.get("/health").json()
+    assert health["status"] == "degraded"
+    assert health["llm"]["breaker"]["state"] == OPEN
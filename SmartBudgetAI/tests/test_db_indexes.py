@@ -0,0 +1,148 @@
+import sqlite3
+import pytest
+from SmartBudgetAI import db, memory, reminder_engine
+
+
+def _plans_for(fn, *args):
+    # Capture the SELECTs a db function really issues, then EXPLAIN each one.
+    conn = db.get_connection()
+    seen = []
+    conn.set_trace_callback(seen.append)
+    try:
+        fn(*args)
+    finally:
+        conn.set_trace_callback(None)
+
+    selects = [sql for sql in seen if sql.lstrip().upper().startswith("SELECT")]
+    assert selects, f"{fn.__name__} issued no SELECT"
+    return [
+        [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        for sql in selects
+    ]
+
+
+def test_migrations_set_user_version():
+    conn = db.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+    # Running again is a no-op
+    db.ensure_table()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+
+def test_hot_queries_use_indexes():
+    db.add_memory_fact(1, "loan", "Mike", 100)
+    db.add_expense(1, "2026-01-01", "food", 12.5, "lunch")
+    db.add_reminder(1, "pay rent", "2026-01-01T00:00:00")
+
+    hot_queries = [
+        (db.get_memory_facts, 1, "loan", True),
+        (db.get_loan_by_entity, 1, "Mike"),
+        (db.get_due_reminders, 1),
+        (db.get_expenses, 1),
+        (reminder_engine.get_due_reminders, 1),
+        (reminder_engine.get_active_loans_summary, 1),
+        (reminder_engine.get_active_loan_items, 1),
+    ]
+
+    for fn, *args in hot_queries:
+        for plan in _plans_for(fn, *args):
+            # Every table access must be an index SEARCH, never a full SCAN
+            table_steps = [step for step in plan if "TEMP B-TREE" not in step]
+            assert table_steps, plan
+            for step in table_steps:
+                assert step.startswith("SEARCH"), (fn.__name__, plan)
+                assert "INDEX idx_" in step or "PRIMARY KEY" in step, (fn.__name__, plan)
+
+
+def test_rest_pages_are_index_range_scans():
+    db.add_memory_fact(1, "loan", "Mike", 100)
+    db.add_memory_fact(1, "repayment", "Mike", 20)
+    db.add_expense(1, "2026-01-01", "food", 12.5, "lunch")
+    db.add_reminder(1, "pay rent", "2026-01-01T00:00:00")
+    after = ("2026-01-01", 10)
+
+    pages = [
+        (memory.get_active_loan_items, "idx_memory_facts_user_type_created"),
+        (memory.get_loan_history, "idx_memory_facts_user_created"),
+        (db.get_expenses_page, "idx_expenses_user_date"),
+    ]
+    for fn, index in pages:
+        for cursor in (None, after):
+            for plan in _plans_for(fn, 1, ["id"], cursor, 51):
+                # Rows come off the index in page order: no sort of the whole history
+                assert plan == [plan[0]] and plan[0].startswith("SEARCH"), (fn.__name__, plan)
+                assert f"INDEX {index}" in plan[0], (fn.__name__, plan)
+
+    # Only the asked-for columns (plus the cursor's) are read
+    seen = []
+    db.get_connection().set_trace_callback(seen.append)
+    rows = db.get_pending_reminders(1, after=None, limit=51, columns=["message"])
+    db.get_connection().set_trace_callback(None)
+    assert rows == [{"message": "pay rent", "id": 1, "remind_at": "2026-01-01T00:00:00"}]
+    assert seen[0].startswith("SELECT message, id, remind_at FROM reminders")
+    [plan] = _plans_for(db.get_pending_reminders, 1, after, 51, ["message"])
+    assert plan == [plan[0]] and "INDEX idx_reminders_user_status_time" in plan[0], plan
+
+
+def test_lazy_transaction_begins_at_the_first_write():
+    conn = db.get_connection()
+    seen = []
+    conn.set_trace_callback(seen.append)
+    with db.lazy_transaction():
+        db.get_memory_facts(1)
+    assert "BEGIN" not in " ".join(seen)
+
+    try:
+        with db.lazy_transaction():
+            db.get_memory_facts(1)
+            db.apply_repayment(1, "Nobody", 5)
+            db.add_expense(1, "2026-01-01", "food", 5, None)
+            raise RuntimeError("turn failed")
+    except RuntimeError:
+        pass
+    conn.set_trace_callback(None)
+
+    # The read ran on autocommit; the helper's BEGIN IMMEDIATE opened the
+    # transaction, and the later write rolled back with it
+    statements = [sql.split()[0] for sql in seen]
+    assert statements.index("BEGIN") > statements.index("SELECT")
+    assert "BEGIN IMMEDIATE" in seen and "ROLLBACK" in seen
+    assert db.get_expenses(1).empty
+
+
+def test_nested_immediate_needs_the_write_lock_already():
+    db.add_memory_fact(1, "loan", "Mike", 100)
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        with db.transaction():
+            db.get_memory_facts(1)
+            db.apply_repayment(1, "Mike", 10)
+    # Fine once the outer transaction holds the lock, either way
+    with db.transaction(immediate=True):
+        db.apply_repayment(1, "Mike", 10)
+    with db.transaction():
+        db.add_expense(1, "2026-01-01", "food", 5, None)
+        db.apply_repayment(1, "Mike", 10)
+    assert db.get_loan_balances(1)[0]["remaining_amount"] == 80
+
+
+def test_failed_commit_rolls_back_and_forgets_the_transaction():
+    conn = db.get_connection()
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TABLE child (parent_id REFERENCES parent (id) DEFERRABLE INITIALLY DEFERRED)")
+    fired = []
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction():
+            # Only checked at COMMIT
+            conn.execute("INSERT INTO child VALUES (99)")
+            db._touch(1)
+            db.after_commit(lambda: fired.append("orphan"))
+
+    assert not conn.in_transaction
+    version = db.data_version(1)
+    db.add_expense(2, "2026-01-01", "food", 5, None)
+    assert fired == [] and db.data_version(1) == version
+    assert conn.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 0
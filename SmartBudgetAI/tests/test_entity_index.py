@@ -0,0 +1,97 @@
+import pytest
+from SmartBudgetAI import db
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.entity_index import EntityIndex, get_entity_index, search_entities, unambiguous
+from SmartBudgetAI.executor import execute_intent
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.memory import add_memory_fact, get_active_loans
+
+NAMES = ["John", "Jonas", "Joan", "Alex", "Sam", "Sam Lee", "Mika", "José", "Priya Sharma", "Priya Patel"]
+
+
+@pytest.mark.parametrize("query, best, clear", [
+    ("alex", "Alex", True),        # lowercase
+    ("Alx", "Alex", True),         # typo
+    ("jose", "José", True),        # accent
+    ("Sam", "Sam", True),          # full name beats "Sam Lee"'s first word
+    ("lee", "Sam Lee", True),
+    ("sharma", "Priya Sharma", True),
+    ("Jon", "Jonas", False),       # John, Joan and Jonas all as close
+    ("priya", "Priya Patel", False),
+])
+def test_search_ranks_and_flags_ambiguity(query, best, clear):
+    found = EntityIndex(NAMES).search(query)
+    assert found[0][0] == best
+    assert [s for _, s in found] == sorted((s for _, s in found), reverse=True)
+    assert (unambiguous(found) == best) is clear
+
+
+@pytest.mark.parametrize("query", ["Pam", "Ken", "Bob", "paid", ""])
+def test_search_rejects_strangers(query):
+    assert EntityIndex(NAMES).search(query) == []
+
+
+def test_search_text():
+    index = EntityIndex(NAMES)
+    assert index.search_text("alex paid me back 20") == [("Alex", 1.0)]
+    assert index.search_text("I paid 20") == []
+
+
+def test_data_version_bumps_after_commit_only():
+    before = db.data_version(1)
+    db.add_memory_fact(1, "loan", "John", 100)
+    assert db.data_version(1) == before + 1
+    assert db.data_version(2) == 0
+
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            db.add_memory_fact(1, "loan", "Alex", 100)   # savepoint inside
+            assert db.data_version(1) == before + 1      # not yet committed
+            raise RuntimeError
+    assert db.data_version(1) == before + 1
+
+    db.add_expense(1, "2026-01-01", "food", 5, "")
+    db.rebuild_loan_balances()                           # every user
+    assert db.data_version(1) == before + 3
+    assert db.data_version(2) == 1
+
+
+def test_index_is_cached_until_a_write():
+    add_memory_fact(1, "loan", "John", 100)
+    index = get_entity_index(1)
+    assert get_entity_index(1) is index
+
+    add_memory_fact(1, "loan", "Alex", 50)
+    assert get_entity_index(1) is not index
+    assert search_entities(1, "alx") == [("Alex", 0.597)]
+
+    db.close_memory_fact(get_active_loans(1)[1]["id"])
+    assert search_entities(1, "alx") == []
+
+
+def test_executor_suggests_but_never_guesses():
+    add_memory_fact(1, "loan", "John", 100)
+    reply = execute_intent(1, ParsedIntent(intent="loan_received", entity="Jon", amount=20))
+    assert "Did you mean **John**?" in reply
+    assert get_active_loans(1)[0]["remaining_amount"] == 100
+
+
+def test_chat_repayment_resolves_the_counterparty():
+    add_memory_fact(1, "loan", "John", 100)
+    add_memory_fact(1, "loan", "Alex", 50)
+
+    assert "receive repayment from John $20" in handle_user_message("Jon paid back 20", 1)
+    assert "Remaining balance: **$80**" in handle_user_message("yes", 1)
+
+    # Lowercase: the parser finds no name, the index finds it in the text
+    assert "receive repayment from Alex $50" in handle_user_message("alex returned 50", 1)
+    assert "settled" in handle_user_message("yes", 1)
+
+
+def test_select_loan_by_misspelt_name():
+    add_memory_fact(3, "loan", "John", 100)
+    add_memory_fact(3, "loan", "Alex", 200)
+
+    assert "multiple" in handle_user_message("close loan", 3).lower()
+    assert handle_user_message("the one with alx", 3) == "Closed the loan with Alex."
+    assert [l["entity"] for l in get_active_loans(3)] == ["John"]
@@ -0,0 +1,85 @@
+import json
+import os
+import pytest
+from SmartBudgetAI import llm_fallback
+from SmartBudgetAI.few_shot_index import FewShotIndex, VECTORIZER, query_vector
+
+
+def _append(path, *records, raw=""):
+    with open(path, "a") as f:
+        for text, intent in records:
+            f.write(json.dumps({"text": text, "confirmed_intent": intent}) + "\n")
+        f.write(raw)
+
+
+def test_refresh_reads_only_appended_lines(tmp_path):
+    path = tmp_path / "training_data.jsonl"
+    _append(path, ("Spot Alex 20", "loan_given"), ("hmm", "rejected"))
+    index = FewShotIndex(str(path)).refresh()
+    assert len(index) == 1
+    version = index.version
+
+    # Half-written line: indexed once the writer finishes it
+    _append(path, ("Sam paid me back 15", "loan_received"), raw='{"text": "Front Jo 5", "confirm')
+    index.refresh()
+    assert len(index) == 2
+    assert index.version != version
+
+    with open(path, "a") as f:
+        f.write('ed_intent": "loan_given"}\n')
+    index.refresh()
+    assert len(index) == 3
+    assert index._offset == os.path.getsize(path)
+
+    # Rewritten file: rebuilt from scratch
+    path.write_text(json.dumps({"text": "Covered Lee 9", "confirmed_intent": "loan_given"}) + "\n")
+    index.refresh()
+    assert [t for t, _ in index.search("Lee", k=5)] == ["Covered Lee 9"]
+
+
+def test_search_ranks_by_similarity(tmp_path):
+    path = tmp_path / "training_data.jsonl"
+    _append(path,
+            ("Spot Alex 20", "loan_given"),
+            ("Sam paid me back 15", "loan_received"),
+            ("spot alex 20", "loan_given"),
+            ("Got my money back from Chris", "loan_received"),
+            ("Fronted Jo 40 for tickets", "loan_given"))
+    index = FewShotIndex(str(path), k=2).refresh()
+
+    assert index.search("Chris paid me back") == [
+        ("Sam paid me back 15", "loan_received"),
+        ("Got my money back from Chris", "loan_received"),
+    ]
+    # Duplicates collapse to the newest copy
+    assert index.search("spotted Alex twenty")[0] == ("spot alex 20", "loan_given")
+
+
+def test_query_vector_matches_sklearn():
+    columns, weights = query_vector("Spotted ALEX 20 bucks")
+    expected = VECTORIZER.transform(["Spotted ALEX 20 bucks"])
+    assert sorted(columns) == sorted(expected.indices)
+    assert dict(zip(columns, weights)) == pytest.approx(dict(zip(expected.indices, expected.data)))
+
+
+def test_prompt_uses_the_nearest_examples(tmp_path, monkeypatch):
+    path = tmp_path / "training_data.jsonl"
+    _append(path,
+            ("Got my money back from Chris", "loan_received"),
+            ("Fronted Jo 40 for tickets", "loan_given"),
+            ("Covered Kim's lunch 12", "loan_given"),
+            ("Lee bought dinner, I owe him", "loan_received"),
+            ("Sam paid me back 15", "loan_received"))
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(path))
+    prompts = []
+
+    def fake_request(system_prompt, text):
+        prompts.append(system_prompt)
+        return '{"intent": "loan_given", "entity": "Jo", "amount": 30}'
+
+    monkeypatch.setattr(llm_fallback, "_request_parse", fake_request)
+    llm_fallback.llm_fallback_parse("fronted Jo 30")
+
+    examples = prompts[0].split("Examples:\n")[1].splitlines()
+    assert len(examples) == 3
+    assert examples[0] == 'User: "Fronted Jo 40 for tickets" -> {"intent": "loan_given"}'
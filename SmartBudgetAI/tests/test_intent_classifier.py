@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+import pytest
+from SmartBudgetAI import intent_classifier, llm_client
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.few_shot_index import VECTORIZER
+from SmartBudgetAI.intent_classifier import IntentClassifier, classify_intent, get_intent_classifier, train
+from SmartBudgetAI.llm_client import OllamaClient
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+NAMES = ["Alex", "Sam", "Jo", "Chris", "Pat", "Lee", "Kim", "Dana"]
+PHRASINGS = {
+    "loan_given": ["spot {name} {amount}", "fronted {name} {amount}", "{name} borrowed {amount}"],
+    "loan_received": ["{name} sent me {amount} back", "got {amount} back from {name}", "{name} settled up {amount}"],
+    "query_debts": ["who still hasn't paid me", "what am I owed", "who do I need to chase"],
+}
+
+
+def _append(path, n, start=0):
+    with open(path, "a") as f:
+        for i in range(start, start + n):
+            intent = list(PHRASINGS)[i % 3]
+            template = PHRASINGS[intent][(i // 3) % 3]
+            text = template.format(name=NAMES[i % len(NAMES)], amount=10 + i)
+            f.write(json.dumps({"text": text, "confirmed_intent": intent}) + "\n")
+
+
+@pytest.fixture
+def training_file():
+    return intent_classifier.TRAINING_FILE
+
+
+def test_probabilities_match_sklearn(training_file):
+    _append(training_file, 10)
+    classifier = get_intent_classifier()
+    assert not classifier.ready  # below MIN_EXAMPLES: the LLM keeps deciding
+    assert classifier.predict("spot Alex 20") is None
+
+    _append(training_file, 50, start=10)
+    classifier.refresh()
+    assert classifier.ready
+
+    text = "Kim borrowed 40"
+    fast = classifier.probabilities(text)
+    expected = classifier.model.predict_proba(VECTORIZER.transform([text]))[0]
+    assert np.allclose([fast[c] for c in classifier.model.classes_], expected)
+    assert classifier.predict(text)[0] == "loan_given"
+
+
+def test_learns_appended_feedback_and_resumes_from_artifact(training_file):
+    _append(training_file, 30)
+    classifier = get_intent_classifier()
+    assert classifier.examples == 30
+    assert os.path.exists(intent_classifier.MODEL_FILE)
+
+    # Rejections and unknown intents are not training data
+    with open(training_file, "a") as f:
+        f.write(json.dumps({"text": "spot Jo 5", "confirmed_intent": "rejected"}) + "\n")
+    _append(training_file, 6, start=30)
+    classifier.refresh()
+    assert classifier.examples == 36
+
+    # A restart loads the artifact and reads nothing it has already learned
+    restarted = IntentClassifier(training_file, intent_classifier.MODEL_FILE)
+    restarted._learn = lambda epochs: pytest.fail("relearned known examples")
+    restarted.refresh()
+    assert restarted.examples == 36
+
+
+def test_hot_reloads_an_offline_retrain(training_file):
+    _append(training_file, 30)
+    classifier = get_intent_classifier()
+
+    # Feedback lands and a separate job retrains before this process looks
+    _append(training_file, 60, start=30)
+    train()
+    classifier._learn = lambda epochs: pytest.fail("artifact already covers the new lines")
+
+    assert get_intent_classifier() is classifier
+    assert classifier.examples == 90
+    assert classifier._model_mtime == os.stat(intent_classifier.MODEL_FILE).st_mtime_ns
+
+
+def test_only_confident_complete_parses_are_taken(training_file):
+    _append(training_file, 90)
+
+    parsed = classify_intent("Theo borrowed 35")
+    assert (parsed.intent, parsed.entity, parsed.amount, parsed.source) == ("loan_given", "Theo", 35.0, "classifier")
+    assert parsed.needs_confirmation and parsed.confidence >= intent_classifier.THRESHOLD
+
+    assert classify_intent("theo borrowed some") is None  # no entity or amount to confirm
+    assert classify_intent("what should I do with my bonus") is None  # unlike any confirmed query
+    assert classify_intent("who do I need to chase now").intent == "query_debts"
+
+
+def test_chat_skips_the_llm_when_the_classifier_is_sure(training_file, monkeypatch):
+    _append(training_file, 90)
+    with FakeOllama(reply=lambda payload: '{"intent": "clarify"}') as server:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=server.url))
+
+        reply = handle_user_message("Theo borrowed 35", user_id=1)
+        assert reply == "Do you want to record that you lend Theo $35?"
+        assert server.requests == []
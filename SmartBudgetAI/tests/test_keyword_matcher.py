@@ -0,0 +1,48 @@
+import pytest
+from SmartBudgetAI.intent_router import detect_intent
+from SmartBudgetAI.intent_specs import INTENT_SPECS
+from SmartBudgetAI.keyword_matcher import KeywordMatcher
+from SmartBudgetAI.parser import parse_message
+from SmartBudgetAI.rule_parser import rule_parse
+
+
+def test_priority_and_counts():
+    matcher = KeywordMatcher({"a": ["paid back"], "b": ["paid", "back"], "c": []})
+    assert matcher.first("she paid me back".split()) == "b"
+    assert matcher.first("paid back in full".split()) == "a"
+    assert matcher.first("she repaid me".split()) is None
+    assert matcher.counts("paid back".split()) == {"a": 1, "b": 2, "c": 0}
+    assert matcher.counts("paid paid".split()) == {"a": 0, "b": 1, "c": 0}
+    assert matcher.find("he paid back and paid".split()) == [(1, 2, "a"), (4, 1, "b")]
+
+
+def test_rebuilds_when_specs_change(monkeypatch):
+    assert parse_message("Spot Alex 20").intent == "clarify"
+
+    # In-place edit of a keyword list
+    INTENT_SPECS["loan_given"]["keywords"].append("spot")
+    try:
+        assert parse_message("Spot Alex 20").intent == "loan_given"
+    finally:
+        INTENT_SPECS["loan_given"]["keywords"].remove("spot")
+    assert parse_message("Spot Alex 20").intent == "clarify"
+
+    # A new intent ahead of the others
+    specs = {"split_bill": {"required": [], "keywords": ["split"]}, **INTENT_SPECS}
+    monkeypatch.setattr("SmartBudgetAI.lexer.INTENT_SPECS", specs)
+    monkeypatch.setattr("SmartBudgetAI.parser.INTENT_SPECS", specs)
+    assert parse_message("split dinner, Lee lent me 40").intent == "split_bill"
+
+
+@pytest.mark.parametrize("text, rule_intent, routed", [
+    ("I paid Sam 20", "loan_given", "close_loan"),
+    ("Sam returned 20", "loan_received", "close_loan"),
+    ("Sam repaid 20", "loan_received", "unknown"),
+    ("sent Kim 20", "clarify", "create_loan"),
+    ("got 20 back, paid off", "loan_given", "close_loan"),
+    ("remind me when it's due", "clarify", "reminder"),
+    ("who owes me and how much in total", "clarify", "summary"),
+])
+def test_other_keyword_scanners(text, rule_intent, routed):
+    assert rule_parse(text).intent == rule_intent
+    assert detect_intent(text) == routed
@@ -0,0 +1,119 @@
+"""
+Golden outputs of the lexer and every parser that consumes it, over the
+benchmark messages plus EDGE_CASES. After an intended change, regenerate
+with `python -m SmartBudgetAI.tests.test_lexer` and review the diff.
+"""
+import json
+from dataclasses import asdict
+from pathlib import Path
+import pytest
+from SmartBudgetAI import lexer, memory_extractor, nlp_utils
+from SmartBudgetAI.intent_router import detect_intent
+from SmartBudgetAI.lexer import AMOUNT, DATE, KEYWORD, NAME, NUMBER_WORD, WORD, Token, tokenize
+from SmartBudgetAI.parser import parse_message
+from SmartBudgetAI.rule_parser import rule_parse
+
+SAMPLE = Path(__file__).parents[1] / "benchmarks" / "sample_requests.jsonl"
+GOLDEN = Path(__file__).with_name("lexer_golden.jsonl")
+EDGE_CASES = [
+    "Lent John 50", "Outstanding loans?", "spending 40 with Sam", "John paid back 20.555",
+    "I lent John $$50.5", "John returned the 20 I lent him", "who owes me money", "Gave 30 to Mia",
+    "rs50 Bob", "Kim 0", "", "   ", "MY DEBTS", "pending: Lee 12.5!", "Sam repaid 20",
+    "I lent Priya ₹1,200 on jan 5, return by 10th of Feb", "gave Mia two hundred fifty",
+    "John's tab: €40", "paid 15 usd to Omar", "Rs. 500 to Ana", "lent Sam 20 on Mar. 3rd",
+    "owes me money? who owes", "item2 costs 3", "version 1.2.3",
+]
+
+
+def corpus():
+    with open(SAMPLE) as f:
+        return [json.loads(line)["message"] for line in f] + EDGE_CASES
+
+
+def outputs(text):
+    return {
+        "message": text,
+        "tokens": [[t.kind, t.text, t.value, t.currency] for t in tokenize(text)],
+        "parse_message": asdict(parse_message(text)),
+        "rule_parse": asdict(rule_parse(text)),
+        "detect_intent": detect_intent(text),
+        "parse_simple_date": memory_extractor.parse_simple_date(text),
+    }
+
+
+def test_golden_corpus():
+    with open(GOLDEN) as f:
+        golden = [json.loads(line) for line in f]
+    assert [g["message"] for g in golden] == corpus()
+    for expected in golden:
+        # Round-trip through JSON so tuples compare as lists
+        assert json.loads(json.dumps(outputs(expected["message"]))) == expected, expected["message"]
+
+
+@pytest.mark.parametrize("text, kind, value, currency", [
+    ("$50", AMOUNT, 50.0, "USD"),
+    ("$ 50", AMOUNT, 50.0, "USD"),
+    ("usd 50", AMOUNT, 50.0, "USD"),
+    ("50 USD", AMOUNT, 50.0, "USD"),
+    ("₹1,200.50", AMOUNT, 1200.5, "INR"),
+    ("Rs. 300", AMOUNT, 300.0, "INR"),
+    ("rs50", AMOUNT, 50.0, "INR"),
+    ("€7", AMOUNT, 7.0, "EUR"),
+    ("20.555", AMOUNT, 20.555, None),
+    ("jan 5", DATE, (1, 5), None),
+    ("Feb. 10th", DATE, (2, 10), None),
+    ("3rd of March", DATE, (3, 3), None),
+    ("twenty five", NUMBER_WORD, 25, None),
+    ("two thousand five hundred", NUMBER_WORD, 2500, None),
+    ("John's", NAME, "John", None),
+    ("Outstanding", KEYWORD, "query_debts", None),
+    ("owes me money", KEYWORD, "query_debts", None),
+    ("Him", WORD, "him", None),
+])
+def test_single_tokens(text, kind, value, currency):
+    (token,) = tokenize(text)
+    assert (token.kind, token.text, token.value, token.currency) == (kind, text, value, currency)
+
+
+def test_words_and_offsets():
+    text = "Sam paid back $20, who owes me?"
+    tokens = tokenize(text)
+    assert [text[t.start:t.end] for t in tokens] == [t.text for t in tokens]
+    assert lexer.words(tokens) == ["sam", "paid", "back", "who", "owes", "me"]
+    assert [t.kind for t in tokens] == [NAME, KEYWORD, AMOUNT, KEYWORD, WORD]
+
+
+def test_tokens_are_slotted_and_shared():
+    token = tokenize("lent Sam 20")[0]
+    assert not hasattr(token, "__dict__")
+    assert tokenize("lent Sam 20") is tokenize("lent Sam 20")
+    assert token == Token(KEYWORD, "lent", "loan_given", 0, 4)
+
+
+def test_extractors_agree():
+    for text in corpus():
+        amount = lexer.amount(tokenize(text))
+        assert nlp_utils.extract_amount(text) == (float(amount.value) if amount else None), text
+        assert nlp_utils.extract_entity(text) == lexer.entity(tokenize(text)), text
+
+
+def test_memory_extractor_uses_tokens(monkeypatch):
+    stored = []
+    monkeypatch.setattr(memory_extractor, "add_memory_fact", lambda **fact: stored.append(fact))
+    year = memory_extractor.datetime.today().year
+
+    fact = memory_extractor.extract_and_store_memory("Lent Priya ₹1,200 on jan 5, return by 10th of Feb")
+    assert fact == {"type": "loan", "entity": "Priya", "amount": 1200.0,
+                    "event_date": f"{year}-01-05", "due_date": f"{year}-02-10"}
+    assert stored[0]["currency"] == "INR"
+    assert memory_extractor.extract_and_store_memory("lent Sam some cash") is None
+
+
+def write_golden():
+    with open(GOLDEN, "w") as f:
+        for text in corpus():
+            f.write(json.dumps(outputs(text), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    write_golden()
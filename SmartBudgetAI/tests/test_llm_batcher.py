@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from SmartBudgetAI import llm_client, llm_fallback
+from SmartBudgetAI.llm_batcher import ParseBatcher
+from SmartBudgetAI.llm_client import OllamaClient
+from SmartBudgetAI.tests.fake_ollama import FakeOllama, parser_reply
+
+
+class GatedBatch:
+    """run_batch that blocks until released, recording each batch."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.release.wait(5)
+        return [{"text": t} for t in texts]
+
+
+def test_identical_in_flight_texts_share_one_future():
+    run = GatedBatch()
+    batcher = ParseBatcher(run, window=0.01)
+
+    futures = [batcher.submit("k", "Spot Alex 20") for _ in range(5)]
+    run.release.set()
+
+    assert len({id(f) for f in futures}) == 1
+    assert futures[0].result(5) == {"text": "Spot Alex 20"}
+    assert run.batches == [["Spot Alex 20"]]
+    assert batcher.stats()["coalesced"] == 4
+    batcher.close()
+
+
+def test_distinct_texts_within_the_window_are_batched():
+    run = GatedBatch()
+    run.release.set()
+    batcher = ParseBatcher(run, window=0.2, max_batch=2, workers=1)
+
+    futures = [batcher.submit(str(i), f"text {i}") for i in range(5)]
+    assert [f.result(5) for f in futures] == [{"text": f"text {i}"} for i in range(5)]
+    assert run.batches == [["text 0", "text 1"], ["text 2", "text 3"], ["text 4"]]
+    batcher.close()
+
+
+def test_batch_failures_reach_every_caller():
+    def broken(texts):
+        return [{}]  # wrong length
+
+    batcher = ParseBatcher(broken, window=0.05)
+    futures = [batcher.submit(str(i), f"text {i}") for i in range(3)]
+    for f in futures:
+        with pytest.raises(ValueError):
+            f.result(5)
+
+    # Nothing stays in flight: the next call is a fresh attempt
+    assert batcher.submit("0", "text 0") is not futures[0]
+    batcher.close()
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    with FakeOllama(reply=parser_reply, latency=0.05, parallel=1) as fake:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=fake.url))
+        monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+        yield fake
+
+
+def test_parse_batch_fans_out_an_array(server):
+    results = llm_fallback.parse_batch(["Spot Alex 20", "Lent Sam 5", "Front Jo 7.5"])
+
+    assert [(r["entity"], r["amount"]) for r in results] == [("Alex", 20), ("Sam", 5), ("Jo", 7.5)]
+    assert len(server.requests) == 1
+    assert server.requests[0]["messages"][1]["content"] == "1. Spot Alex 20\n2. Lent Sam 5\n3. Front Jo 7.5"
+
+
+def test_malformed_array_falls_back_to_single_calls(server):
+    server.reply = lambda p: "sorry" if "numbered line" in p["messages"][0]["content"] else parser_reply(p)
+
+    results = llm_fallback.parse_batch(["Spot Alex 20", "Lent Sam 5"])
+    assert [r["entity"] for r in results] == ["Alex", "Sam"]
+    assert len(server.requests) == 3
+
+
+def test_concurrent_fallback_parses_share_calls(server):
+    texts = ["Spot Alex 20", "  Spot  Alex 20 ", "Lent Sam 5", "Front Jo 8"] * 3
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        parsed = list(pool.map(llm_fallback.llm_fallback_parse, texts))
+
+    assert [p.entity for p in parsed[:4]] == ["Alex", "Alex", "Sam", "Jo"]
+    assert all(p.source == "llm" for p in parsed)
+    # 12 callers, 3 distinct texts: at most one call each, usually a single batch
+    assert len(server.requests) <= 3
+
+
+def test_batch_runs_under_its_earliest_callers_deadline():
+    budgets = []
+
+    def run(texts):
+        budgets.append(llm_client.remaining_budget())
+        return [{"text": t} for t in texts]
+
+    batcher = ParseBatcher(run, window=0.05)
+    now = time.monotonic()
+    futures = [batcher.submit("a", "text a", deadline=now + 5), batcher.submit("b", "text b", deadline=now + 1)]
+    [f.result(5) for f in futures]
+    batcher.submit("c", "text c").result(5)
+    batcher.close()
+
+    assert 0 < budgets[0] <= 1
+    assert budgets[1] is None
+
+
+def test_no_single_retries_once_the_turn_is_out_of_time(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+    calls = []
+
+    def slow_and_mangled(system_prompt, text):
+        calls.append(text)
+        time.sleep(0.1)
+        return "sorry"
+
+    monkeypatch.setattr(llm_fallback, "_request_parse", slow_and_mangled)
+    with llm_client.llm_deadline(time.monotonic() + 0.05):
+        results = llm_fallback.parse_batch(["Spot Alex 20", "Lent Sam 5"])
+
+    assert len(calls) == 1
+    assert all(isinstance(r, llm_client.LLMUnavailable) for r in results)
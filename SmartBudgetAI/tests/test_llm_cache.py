@@ -0,0 +1,87 @@
+import json
+import pytest
+from SmartBudgetAI import llm_cache, llm_fallback
+from SmartBudgetAI.llm_cache import LLMCache
+
+
+@pytest.fixture
+def fake_llm(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_request(system_prompt, text):
+        calls.append(text)
+        return '{"intent": "loan_given", "entity": "Alex", "amount": 20}'
+
+    monkeypatch.setattr(llm_fallback, "_request_parse", fake_request)
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "training_data.jsonl"))
+    return calls
+
+
+def test_repeated_phrasings_hit_the_cache(fake_llm):
+    first = llm_fallback.llm_fallback_parse("Spot Alex 20")
+    again = llm_fallback.llm_fallback_parse("  spot   ALEX 20 ")
+
+    assert fake_llm == ["Spot Alex 20"]
+    assert again == first
+    assert again.intent == "loan_given" and again.source == "llm"
+    assert llm_cache.get_llm_cache().stats()["hits_l1"] == 1
+
+
+def test_disk_level_survives_a_new_process(fake_llm, monkeypatch):
+    llm_fallback.llm_fallback_parse("Spot Alex 20")
+
+    # A fresh LLMCache has an empty L1, like a restarted worker
+    monkeypatch.setattr(llm_cache, "_CACHE", None)
+    llm_fallback.llm_fallback_parse("Spot Alex 20")
+
+    assert len(fake_llm) == 1
+    assert llm_cache.get_llm_cache().stats()["hits_l2"] == 1
+
+
+def test_new_confirmed_examples_invalidate(fake_llm):
+    llm_fallback.llm_fallback_parse("Spot Alex 20")
+
+    with open(llm_fallback.TRAINING_FILE, "a") as f:
+        f.write(json.dumps({"text": "hmm Sam 5", "confirmed_intent": "rejected"}) + "\n")
+    llm_fallback.llm_fallback_parse("Spot Alex 20")
+    assert len(fake_llm) == 1  # rejected examples don't change the prompt
+
+    with open(llm_fallback.TRAINING_FILE, "a") as f:
+        f.write(json.dumps({"text": "Front Sam 5", "confirmed_intent": "loan_given"}) + "\n")
+    llm_fallback.llm_fallback_parse("Spot Alex 20")
+    assert len(fake_llm) == 2
+
+
+def test_failures_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+
+    def down(system_prompt, text):
+        raise ConnectionError("ollama down")
+
+    monkeypatch.setattr(llm_fallback, "_request_parse", down)
+    assert llm_fallback.llm_fallback_parse("Spot Alex 20").confidence == 0.0
+    assert llm_cache.get_llm_cache().stats()["misses"] == 1
+    assert llm_cache.get_llm_cache().get("Spot Alex 20", "x") is None
+
+
+def test_ttl_and_lru_cap():
+    now = [1000.0]
+    cache = LLMCache(max_entries=2, ttl=60, clock=lambda: now[0])
+
+    for text in ("a", "b", "c"):
+        cache.put(text, "fp", {"intent": text})
+    assert cache.stats()["l1_entries"] == 2
+    assert cache.get("a", "fp") == {"intent": "a"}  # evicted from L1, still on disk
+
+    now[0] += 61
+    assert cache.get("b", "fp") is None
+
+
+def test_workers_on_different_prompts_keep_each_others_entries():
+    # A rolling deploy: old and new workers alternate on the same DB
+    old, new = LLMCache(), LLMCache()
+    old.put("Spot Alex 20", "fp-old", {"intent": "loan_given"})
+    new.put("Spot Alex 20", "fp-new", {"intent": "loan_received"})
+
+    assert LLMCache().get("Spot Alex 20", "fp-old") == {"intent": "loan_given"}
+    assert LLMCache().get("Spot Alex 20", "fp-new") == {"intent": "loan_received"}
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from SmartBudgetAI import llm_client, llm_fallback
+from SmartBudgetAI.llm_client import AsyncOllamaClient, LLMError, OllamaClient
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+MESSAGES = [{"role": "user", "content": "yo"}]
+
+
+@pytest.fixture
+def server():
+    with FakeOllama() as fake:
+        yield fake
+
+
+def test_calls_reuse_one_connection(server):
+    client = OllamaClient(url=server.url)
+    replies = [client.chat("m", MESSAGES) for _ in range(5)]
+    client.close()
+
+    assert replies == ["yo"] * 5
+    assert len(server.connections) == 1
+    assert server.requests[0]["keep_alive"] == llm_client.KEEP_ALIVE
+    assert server.requests[0]["stream"] is False
+
+
+def test_concurrency_is_bounded():
+    with FakeOllama(latency=0.1) as server:
+        client = OllamaClient(url=server.url, max_concurrency=2)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda _: client.chat("m", MESSAGES), range(6)))
+        client.close()
+
+    assert len(server.requests) == 6
+    assert server.max_in_flight == 2
+
+
+def test_read_timeout_raises_llm_error():
+    with FakeOllama(latency=0.5) as server:
+        client = OllamaClient(url=server.url, read_timeout=0.1)
+        start = time.perf_counter()
+        with pytest.raises(LLMError):
+            client.chat("m", MESSAGES)
+        assert time.perf_counter() - start < 0.4
+        client.close()
+
+
+def test_async_variant_shares_the_pool(server):
+    client = OllamaClient(url=server.url, max_concurrency=2)
+
+    async def run():
+        aclient = AsyncOllamaClient(client)
+        return await asyncio.gather(*(aclient.chat("m", MESSAGES) for _ in range(4)))
+
+    assert asyncio.run(run()) == ["yo"] * 4
+    assert len(server.connections) <= 2
+    client.close()
+
+
+def test_fallback_parse_goes_through_the_shared_client(server, monkeypatch, tmp_path):
+    server.reply = lambda payload: '{"intent": "loan_given", "entity": "Alex", "amount": 20}'
+    monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=server.url))
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+
+    parsed = llm_fallback.llm_fallback_parse("Spot Alex 20")
+    assert (parsed.intent, parsed.entity, parsed.amount) == ("loan_given", "Alex", 20)
+
+    server.reply = lambda payload: "hey 💸"
+    assert llm_fallback.chat_with_persona("hi") == "hey 💸"
+    assert server.requests[-1]["options"] == {"temperature": 0.8}
+    assert len(server.connections) == 1
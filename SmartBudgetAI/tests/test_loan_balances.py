@@ -0,0 +1,56 @@
+from SmartBudgetAI import db
+from SmartBudgetAI.executor import execute_intent
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.reminder_engine import get_active_loans_summary
+
+
+def _loan_ids(user_id):
+    return [f["id"] for f in db.get_memory_facts(user_id, memory_type="loan", active_only=True)]
+
+
+def test_balances_follow_every_write():
+    db.add_memory_fact(1, "loan", "John", 100)
+    db.add_memory_fact(1, "loan", "John", 50)
+    db.add_memory_fact(1, "loan", "Alex", 30)
+    db.add_memory_fact(1, "repayment", "John", 10)  # not a loan, ignored
+    john_first, john_second, alex = _loan_ids(1)
+
+    db.update_remaining(john_first, 60)
+    db.close_memory_fact(alex)
+
+    assert db.get_loan_balances(1) == [
+        {"entity": "John", "remaining_amount": 110.0, "loan_count": 2}
+    ]
+
+    db.close_memory_fact(john_first)
+    db.close_memory_fact(john_first)  # closing twice must not double count
+    db.close_memory_fact(john_second)
+
+    assert db.get_loan_balances(1) == []
+    assert db.check_loan_balances() == []
+
+
+def test_bulk_loans_and_summary_consumers():
+    db.add_memory_facts_bulk(2, [("loan", "Sam", 20), ("loan", "Sam", 5), ("loan", "Kim", 40)])
+
+    summary, total = get_active_loans_summary(2)
+    assert summary == [{"entity": "Kim", "amount": 40.0}, {"entity": "Sam", "amount": 25.0}]
+    assert total == 65.0
+
+    reply = execute_intent(2, ParsedIntent(intent="query_debts"))
+    assert "Kim owes you $40" in reply
+    assert "Sam owes you $25" in reply
+
+
+def test_consistency_checker_detects_and_repairs_drift():
+    db.add_memory_fact(3, "loan", "Mike", 100)
+    with db.transaction() as conn:
+        conn.execute("UPDATE loan_balances SET remaining_amount = 1 WHERE user_id = 3")
+
+    mismatches = db.check_loan_balances()
+    assert mismatches == [
+        {"user_id": 3, "entity": "Mike", "expected": (100.0, 1), "actual": (1.0, 1)}
+    ]
+
+    db.rebuild_loan_balances()
+    assert db.check_loan_balances() == []
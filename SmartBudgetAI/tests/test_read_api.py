@@ -0,0 +1,125 @@
+import pytest
+from fastapi.testclient import TestClient
+from SmartBudgetAI import db
+from SmartBudgetAI.api.main import app
+
+
+@pytest.fixture
+def api():
+    with TestClient(app) as client:
+        yield client
+
+
+def _walk(api, url, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = api.get(url, params=params).json()
+        assert len(page["items"]) <= limit
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_expenses_keyset_pages_newest_first(api):
+    dates = ["2025-01-05", "2025-03-01", "2025-03-01", "2025-02-10", "2025-03-01", "2025-01-20", "2025-02-10"]
+    for i, day in enumerate(dates):
+        db.add_expense(1, day, "food", i + 1, None)
+    db.add_expense(2, "2025-03-02", "food", 99, "other user")
+
+    items = _walk(api, "/users/1/expenses", limit=3)
+    expected = sorted(db.get_expenses_page(1, limit=100), key=lambda r: (r["date"], r["id"]), reverse=True)
+    assert items == expected
+    assert len(items) == len(dates)
+
+
+def test_pages_stay_stable_while_rows_are_added(api):
+    for day in range(1, 7):
+        db.add_expense(1, f"2025-01-0{day}", "food", day, None)
+
+    first = api.get("/users/1/expenses", params={"limit": 2}).json()
+    db.add_expense(1, "2025-02-01", "food", 50, "newer than the page")
+    second = api.get("/users/1/expenses", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+
+    assert [e["date"] for e in first["items"] + second["items"]] == [
+        "2025-01-06", "2025-01-05", "2025-01-04", "2025-01-03"
+    ]
+
+
+def test_field_projection(api):
+    db.add_memory_fact(1, db.LOAN_TYPE, "John", 50)
+    response = api.get("/users/1/loans", params={"fields": "entity,remaining_amount"})
+    assert response.json()["items"] == [{"entity": "John", "remaining_amount": 50.0}]
+
+    assert api.get("/users/1/loans", params={"fields": "entity,user_id"}).status_code == 400
+    assert api.get("/users/1/loans", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert api.get("/users/1/loans", params={"limit": 0}).status_code == 422
+
+
+def test_active_loans_and_history(api):
+    db.add_memory_fact(1, db.LOAN_TYPE, "John", 50)
+    db.add_memory_fact(1, db.LOAN_TYPE, "Sam", 20)
+    db.add_memory_fact(1, "note", "Sam", None, description="likes pizza")
+    db.apply_repayment(1, "Sam", 20)
+
+    active = api.get("/users/1/loans", params={"fields": "entity"}).json()["items"]
+    history = api.get("/users/1/loans/history", params={"fields": "memory_type,entity,status"}).json()["items"]
+
+    assert active == [{"entity": "John"}]
+    assert history == [
+        {"memory_type": "repayment", "entity": "Sam", "status": "active"},
+        {"memory_type": "loan", "entity": "Sam", "status": "closed"},
+        {"memory_type": "loan", "entity": "John", "status": "active"},
+    ]
+
+
+def test_pending_reminders_soonest_first(api):
+    db.add_reminder(1, "later", "2026-03-01T09:00:00")
+    db.add_reminder(1, "sooner", "2026-02-01T09:00:00")
+    db.add_reminder(2, "someone else's", "2026-01-01T09:00:00")
+    sent = db.add_reminder(1, "already sent", "2026-01-15T09:00:00")
+    db.claim_reminders([sent])
+
+    items = _walk(api, "/users/1/reminders", limit=1)
+    assert [r["message"] for r in items] == ["sooner", "later"]
+    assert set(items[0]) == {"id", "message", "remind_at", "created_at"}
+
+
+def test_unchanged_poll_is_304_without_sql(api, monkeypatch):
+    db.add_expense(1, "2025-01-01", "food", 5, None)
+    first = api.get("/users/1/expenses")
+    tag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    def no_sql():
+        raise AssertionError("304 must not touch SQLite")
+
+    with monkeypatch.context() as m:
+        m.setattr(db, "get_connection", no_sql)
+        again = api.get("/users/1/expenses", headers={"If-None-Match": tag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == tag
+
+    # Another user's write leaves this user's ETag alone; their own changes it
+    db.add_expense(2, "2025-01-02", "food", 7, None)
+    assert api.get("/users/1/expenses", headers={"If-None-Match": tag}).status_code == 304
+    db.add_expense(1, "2025-01-02", "food", 7, None)
+    changed = api.get("/users/1/expenses", headers={"If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+    assert len(changed.json()["items"]) == 2
+
+
+def test_etag_names_the_view(api):
+    db.add_memory_fact(1, db.LOAN_TYPE, "John", 50)
+    expenses_tag = api.get("/users/1/expenses").headers["ETag"]
+    loans = api.get("/users/1/loans", params={"fields": "entity"}, headers={"If-None-Match": expenses_tag})
+    assert loans.status_code == 200
+
+    tag = loans.headers["ETag"]
+    assert api.get("/users/1/loans", params={"fields": "entity,amount"}, headers={"If-None-Match": tag}).status_code == 200
+    assert api.get("/users/1/loans", params={"fields": "entity", "limit": 1}, headers={"If-None-Match": tag}).status_code == 200
+    # Same view, parameters in another order
+    tag = api.get("/users/1/loans?fields=entity&limit=50").headers["ETag"]
+    assert api.get("/users/1/loans?limit=50&fields=entity", headers={"If-None-Match": tag}).status_code == 304
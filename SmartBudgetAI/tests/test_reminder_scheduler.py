@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import datetime, timedelta
+from SmartBudgetAI import db, reminder_scheduler
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.reminder_scheduler import ReminderScheduler
+
+
+def test_reminders_fire_in_order_with_simulated_clock(fake_clock):
+    clock = fake_clock(datetime(2026, 3, 1, 9, 0))
+    scheduler = ReminderScheduler(clock=clock).load()
+
+    scheduler.add_reminder(1, "pay rent", (clock.now + timedelta(days=2)).isoformat())
+    scheduler.add_reminder(1, "call mom", (clock.now + timedelta(hours=1)).isoformat())
+    scheduler.add_reminder(2, "gym", (clock.now + timedelta(days=1)).isoformat())
+
+    assert scheduler.tick() == 0
+    assert scheduler.drain(1) == []
+
+    clock.advance(days=1)
+    assert scheduler.tick() == 2
+    assert scheduler.drain(2) == ["🔔 **Reminder:** yesterday you asked me to remind you: _gym_"]
+    assert scheduler.drain(1) == ["🔔 **Reminder:** yesterday you asked me to remind you: _call mom_"]
+    assert scheduler.drain(1) == []
+
+    clock.advance(days=1)
+    assert scheduler.drain(1) == ["🔔 **Reminder:** 2 days ago you asked me to remind you: _pay rent_"]
+
+    # Everything was marked sent in the DB
+    assert db.get_pending_reminders() == []
+
+
+def test_load_picks_up_pending_and_never_double_delivers(fake_clock):
+    clock = fake_clock(datetime(2026, 3, 1, 9, 0))
+    db.add_reminder(5, "water plants", "2026-03-01T08:00:00", created_at="2026-02-27T08:00:00")
+
+    first = ReminderScheduler(clock=clock).load()
+    second = ReminderScheduler(clock=clock).load()  # e.g. another worker
+
+    assert first.tick() + second.tick() == 1
+    assert len(first.drain(5) + second.drain(5)) == 1
+
+
+def test_chat_drains_outbox(monkeypatch, fake_clock):
+    clock = fake_clock(datetime(2026, 3, 1, 9, 0))
+    monkeypatch.setattr(reminder_scheduler, "_SCHEDULER", ReminderScheduler(clock=clock).load())
+
+    reply = handle_user_message("remind me in 3 days to pay Sam", user_id=4)
+    assert "in 3 days" in reply
+
+    clock.advance(days=3)
+    reply = handle_user_message("close loan", user_id=4)
+    assert reply.startswith("🔔 **Reminder:** 3 days ago you asked me to remind you: _pay Sam_")
+
+
+def test_rolled_back_reminder_is_never_scheduled(fake_clock):
+    clock = fake_clock(datetime(2026, 3, 1, 9, 0))
+    scheduler = ReminderScheduler(clock=clock).load()
+
+    try:
+        with db.transaction():
+            scheduler.add_reminder(1, "pay rent", (clock.now + timedelta(hours=1)).isoformat())
+            assert scheduler.next_due_at() is None
+            raise RuntimeError("turn failed")
+    except RuntimeError:
+        pass
+
+    assert scheduler.next_due_at() is None
+    assert db.get_pending_reminders() == []
+    with db.transaction():
+        scheduler.add_reminder(1, "call mom", (clock.now + timedelta(hours=1)).isoformat())
+    assert scheduler.next_due_at() == "2026-03-01T10:00:00"
+
+
+def test_claims_a_backlog_bigger_than_sqlites_variable_limit():
+    ids = [db.add_reminder(1, f"r{i}", "2026-01-01T08:00:00") for i in range(5)]
+    limit = db.get_connection().getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    # Ids that don't exist only pad the list past the limit
+    backlog = ids + list(range(10 ** 6, 10 ** 6 + limit))
+
+    assert db.claim_reminders(backlog) == set(ids)
+    assert db.claim_reminders(ids, chunk_size=2) == set()
+    assert db.get_pending_reminders() == []
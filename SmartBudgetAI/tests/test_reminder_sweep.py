@@ -0,0 +1,82 @@
+from datetime import date
+from SmartBudgetAI import db, reminder_engine
+
+TODAY = date(2026, 3, 10)
+
+
+def _seed():
+    for user_id in range(1, 6):
+        db.add_memory_facts_bulk(user_id, [
+            # memory_type, entity, amount, currency, event_date, due_date
+            ("loan", f"Friend{user_id}", 10 * user_id, "USD", None, "2026-03-01"),  # overdue
+            ("loan", "Later", 5, "USD", None, "2026-04-30"),                        # not due yet
+            ("loan", "Soon", 7, "USD", None, "2026-03-12"),
+        ])
+    ids = [f["id"] for f in db.get_memory_facts(5, memory_type="loan")]
+    db.close_memory_fact(ids[0])  # closed loans are never swept
+
+
+def test_sweep_matches_per_user_queries():
+    _seed()
+
+    batches = list(reminder_engine.sweep_due_loans(days_ahead=7, today=TODAY, batch_users=2))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    swept = dict(pair for batch in batches for pair in batch)
+    assert list(swept) == [1, 2, 3, 4, 5]
+    for user_id, reminders in swept.items():
+        assert reminders == reminder_engine.get_due_reminders(user_id, days_ahead=7, today=TODAY)
+    assert [r["entity"] for r in swept[5]] == ["Soon"]
+
+
+def test_sweep_is_one_indexed_range_scan():
+    conn = db.get_connection()
+    seen = []
+    conn.set_trace_callback(seen.append)
+    list(reminder_engine.sweep_due_loans(today=TODAY))
+    conn.set_trace_callback(None)
+
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + seen[-1])]
+    assert any(step.startswith("SEARCH memory_facts USING INDEX idx_memory_facts_due") for step in plan)
+
+
+def test_messages_are_formatted_lazily():
+    _seed()
+    messages = dict(reminder_engine.sweep_reminder_messages(
+        reminder_engine.sweep_due_loans(today=TODAY), today=TODAY
+    ))
+    assert not isinstance(messages[1], list)
+    assert list(messages[1]) == [
+        "🔔 Reminder: Friend1 still owes you $10. It was due earlier.",
+        "🔔 Reminder: Soon still owes you $7. It is due in 2 days.",
+    ]
+
+
+def test_parallel_shards_cover_the_same_reminders():
+    _seed()
+
+    assert reminder_engine.date_shards("2026-03-01", "2026-03-17", 3) == [
+        ("2026-03-01", "2026-03-06"), ("2026-03-07", "2026-03-12"), ("2026-03-13", "2026-03-17"),
+    ]
+
+    results = reminder_engine.sweep_due_loans_parallel(today=TODAY, shards=3, processes=2)
+    serial = [reminder_engine.count_reminders(b) for b in reminder_engine.sweep_due_loans(today=TODAY)]
+
+    assert sum(r[1] for r in results) == sum(r[1] for r in serial) == 9
+
+
+def test_due_dates_with_a_time_land_in_exactly_one_shard():
+    db.add_memory_facts_bulk(1, [
+        # Shards: 03-06..03-09, 03-10..03-13, 03-14..03-17
+        ("loan", "Oldest", 4, "USD", None, "2026-03-06"),
+        ("loan", "Morning", 5, "USD", None, "2026-03-09T10:00"),   # last day of shard 1
+        ("loan", "Evening", 6, "USD", None, "2026-03-17T21:30"),   # last day swept
+        ("loan", "Next", 7, "USD", None, "2026-03-18T00:00"),      # one day too late
+    ])
+
+    results = reminder_engine.sweep_due_loans_parallel(today=TODAY, shards=3, processes=2)
+    serial = [pair for batch in reminder_engine.sweep_due_loans(today=TODAY) for pair in batch]
+
+    assert sum(r[1] for r in results) == 3
+    assert [r["entity"] for r in serial[0][1]] == ["Oldest", "Morning", "Evening"]
+    assert serial[0][1] == reminder_engine.get_due_reminders(1, today=TODAY)
@@ -0,0 +1,75 @@
+import threading
+from SmartBudgetAI import db
+from SmartBudgetAI.executor import execute_intent
+from SmartBudgetAI.intent_schema import ParsedIntent
+
+
+def test_repayment_spills_over_oldest_first():
+    db.add_memory_fact(1, "loan", "Mike", 30)
+    db.add_memory_fact(1, "loan", "mike", 50)
+    first, second = [f["id"] for f in db.get_memory_facts(1, memory_type="loan")]
+
+    result = db.apply_repayment(1, "MIKE", 45)
+
+    assert result["closed_ids"] == [first]
+    assert result["loans"] == [{"id": second, "remaining_amount": 35.0}]
+    assert (result["applied"], result["overpaid"], result["remaining"]) == (45.0, 0.0, 35.0)
+
+    result = db.apply_repayment(1, "Mike", 50)
+    assert result["closed_ids"] == [second]
+    assert (result["overpaid"], result["remaining"]) == (15.0, 0.0)
+
+    repayments = db.get_memory_facts(1, memory_type="repayment")
+    assert [r["amount"] for r in repayments] == [45, 50]
+    assert db.get_loan_balances(1) == []
+    assert db.check_loan_balances() == []
+
+
+def test_unknown_entity_returns_none():
+    db.add_memory_fact(1, "loan", "Mike", 30)
+    assert db.apply_repayment(1, "Nobody", 10) is None
+    assert db.get_memory_facts(1, memory_type="repayment") == []
+
+
+def test_concurrent_repayments_lose_no_money():
+    owed = [100, 50, 50]
+    for amount in owed:
+        db.add_memory_fact(1, "loan", "Mike", amount)
+
+    threads, payments_per_thread = 8, 30   # 240 paid against 200 owed
+    results = []
+    lock = threading.Lock()
+
+    def pay():
+        for _ in range(payments_per_thread):
+            result = db.apply_repayment(1, "Mike", 1)
+            with lock:
+                results.append(result)
+
+    workers = [threading.Thread(target=pay) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    paid_in = [r for r in results if r is not None]
+    applied = sum(r["applied"] for r in paid_in)
+    overpaid = sum(r["overpaid"] for r in paid_in)
+    remaining = sum(f["remaining_amount"] for f in db.get_memory_facts(1, memory_type="loan", active_only=True))
+
+    # Every dollar is either still owed, applied to a loan, or reported as overpaid
+    assert applied + remaining == sum(owed)
+    assert applied + overpaid == len(paid_in)
+    assert remaining == 0
+    assert len(db.get_memory_facts(1, memory_type="repayment")) == len(paid_in)
+    assert db.check_loan_balances() == []
+
+
+def test_reply_names_the_loan_as_stored():
+    db.add_memory_fact(1, "loan", "John", 50)
+
+    partial = execute_intent(1, ParsedIntent(intent="loan_received", entity="john", amount=20))
+    settled = execute_intent(1, ParsedIntent(intent="loan_received", entity="JOHN", amount=30))
+
+    assert partial.startswith("Recorded. John paid")
+    assert settled.startswith("Loan settled! John paid")
@@ -0,0 +1,157 @@
+import gc
+import multiprocessing
+import sys
+import pytest
+from SmartBudgetAI import session_store
+from SmartBudgetAI.chat_engine import STATE_CONFIRM_ACTION, STATE_SELECT_LOAN, handle_user_message
+from SmartBudgetAI.db import get_memory_facts
+from SmartBudgetAI.intent_schema import ParsedIntent
+from SmartBudgetAI.session_store import (
+    MemorySessionStore, SessionStore, SqliteSessionStore, decode, encode, new_session,
+)
+
+
+def pending(entity="John", amount=50.0):
+    return {"state": STATE_CONFIRM_ACTION,
+            "data": {"pending_intent": ParsedIntent("loan_given", entity, amount, 0.9)}}
+
+
+def test_round_trip_is_compact():
+    ctx = {"state": STATE_SELECT_LOAN, "data": {
+        "pending_intent": ParsedIntent("loan_received", "José", 12.5, 0.7, "llm", True, ["loan_given", "loan_received"]),
+        "loan_options": [{"id": 1, "entity": "Sam", "remaining_amount": 20.0, "memory_type": "loan_given"}],
+    }}
+    assert decode(encode(ctx)) == ctx
+
+    # Trailing default fields are not written
+    assert encode(pending()) == b'["CONFIRM_ACTION",{"pending_intent":{"~i":["loan_given","John",50.0,0.9]}}]'
+
+
+def test_load_returns_a_copy():
+    store = MemorySessionStore()
+    store.save(1, pending())
+    ctx = store.load(1)
+    ctx["data"]["pending_intent"].entity = "Sam"
+    assert store.load(1)["data"]["pending_intent"].entity == "John"
+
+
+def test_idle_sessions_are_not_stored():
+    store = MemorySessionStore()
+    store.save(1, pending())
+    store.save(1, new_session())
+    assert len(store) == 0
+    assert store.load(1) == new_session()
+
+
+def test_lru_cap_drops_least_recently_used():
+    store = MemorySessionStore(max_sessions=2)
+    store.save(1, pending("A"))
+    store.save(2, pending("B"))
+    store.load(1)
+    store.save(3, pending("C"))
+    assert len(store) == 2
+    assert store.load(2) == new_session()
+    assert store.load(1)["data"]["pending_intent"].entity == "A"
+
+
+def test_idle_ttl_expires_sessions(fake_clock):
+    clock = fake_clock()
+    store = MemorySessionStore(ttl=60, clock=clock)
+    store.save(1, pending("A"))
+    store.save(2, pending("B"))
+    clock.advance(seconds=40)
+    store.load(2)  # still in use
+    clock.advance(seconds=30)
+    assert store.load(1) == new_session()
+    assert store.load(2)["data"]["pending_intent"].entity == "B"
+
+    # Expired sessions are swept by later saves, not just skipped on load
+    clock.advance(seconds=61)
+    store.save(3, pending("C"))
+    assert len(store) == 1
+
+
+def test_sqlite_store_expires_sessions(fake_clock):
+    clock = fake_clock()
+    store = SqliteSessionStore(ttl=60, clock=clock)
+    store.save(1, pending())
+    assert len(store) == 1
+    clock.advance(seconds=61)
+    assert store.load(1) == new_session()
+    assert len(store) == 0
+
+
+def _load_in_child(user_id, queue):
+    queue.put(encode(SqliteSessionStore().load(user_id)))
+
+
+def test_sqlite_store_is_shared_across_processes():
+    SqliteSessionStore().save(7, pending("Priya", 30.0))
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    child = ctx.Process(target=_load_in_child, args=(7, queue))
+    child.start()
+    child.join(timeout=30)
+    assert decode(queue.get(timeout=5)) == pending("Priya", 30.0)
+
+
+def test_confirmation_survives_switching_workers(monkeypatch):
+    # The question is asked by one worker...
+    monkeypatch.setattr(session_store, "_STORE", SqliteSessionStore())
+    assert "John" in handle_user_message("I lent John 50 dollars", user_id=5)
+
+    # ...and the "yes" lands on another one with its own store object
+    monkeypatch.setattr(session_store, "_STORE", SqliteSessionStore())
+    handle_user_message("yes", user_id=5)
+    assert [f["entity"] for f in get_memory_facts(5)] == ["John"]
+    assert len(session_store._STORE) == 0
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(session_store, "_STORE", None)
+    monkeypatch.setenv("SESSION_STORE", "redis")
+    with pytest.raises(ValueError):
+        session_store.get_session_store()
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoClear(SessionStore):
+        def _get(self, user_id): ...
+        def _put(self, user_id, payload): ...
+        def delete(self, user_id): ...
+        def __len__(self): ...
+
+    with pytest.raises(TypeError, match="clear"):
+        NoClear()
+
+
+USERS = 1_000_000
+CAP = 10_000
+
+
+def test_memory_is_bounded_over_a_million_users():
+    store = MemorySessionStore(max_sessions=CAP)
+    ctx = pending()
+
+    def turn(user_id):
+        # One in ten users is mid-confirmation; the rest just chat
+        store.load(user_id)
+        if user_id % 10 == 0:
+            store.save(user_id, ctx)
+
+    for user_id in range(CAP * 10):
+        turn(user_id)
+    assert len(store) == CAP
+
+    # Live allocations rather than tracemalloc, which would slow the loop ~5x
+    gc.collect()
+    before = sys.getallocatedblocks()
+    for user_id in range(CAP * 10, USERS):
+        turn(user_id)
+    gc.collect()
+    grown = sys.getallocatedblocks() - before
+
+    assert len(store) == CAP
+    # Evicted sessions are freed as new ones arrive: no per-user residue
+    assert grown < 1000
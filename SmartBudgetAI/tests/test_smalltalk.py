@@ -0,0 +1,56 @@
+import random
+import pytest
+from SmartBudgetAI import llm_client, llm_fallback
+from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.llm_client import OllamaClient
+from SmartBudgetAI.smalltalk import SMALLTALK, classify_smalltalk, smalltalk_reply
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hi", "greeting"),
+    ("Heyyy!!", "greeting"),
+    ("what's up bro", "greeting"),
+    ("thanks", "thanks"),
+    ("ty fam 🙏", "thanks"),
+    ("lol", "laugh"),
+    ("hahaha 💀", "laugh"),
+    ("ok cool", "ack"),
+    ("bet", "ack"),
+    ("how r u", "how_are_you"),
+    ("gn", "bye"),
+    ("what can you do?", "help"),
+    # open-ended or financial: not small talk
+    ("hi can you explain compound interest", None),
+    ("lol Alex owes me 20", None),
+    ("thanks for covering lunch Sam", None),
+    ("", None),
+])
+def test_classification(text, expected):
+    assert classify_smalltalk(text) == expected
+
+
+def test_replies_come_from_the_class_pool():
+    rng = random.Random(1)
+    _, templates, emojis = SMALLTALK["thanks"]
+    expected = {t.format(emoji=e) for t in templates for e in emojis}
+
+    replies = {smalltalk_reply("thx", rng=rng) for _ in range(50)}
+    assert replies <= expected and len(replies) > 1
+    assert smalltalk_reply("what's the best index fund") is None
+
+
+def test_chat_answers_small_talk_without_the_llm(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+    with FakeOllama(reply=lambda payload: '{"intent": "clarify"}') as server:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=server.url))
+
+        _, templates, emojis = SMALLTALK["greeting"]
+        assert handle_user_message("hey", user_id=1) in {t.format(emoji=e) for t in templates for e in emojis}
+
+        # Chit-chat while a confirmation is pending keeps the reminder suffix
+        handle_user_message("Lent John 50", user_id=2)
+        reply = handle_user_message("haha", user_id=2)
+        assert "still pending" in reply
+
+        assert server.requests == []
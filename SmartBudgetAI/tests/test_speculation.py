@@ -0,0 +1,96 @@
+import threading
+import time
+import pytest
+from SmartBudgetAI import chat_engine, llm_client, llm_fallback
+from SmartBudgetAI.chat_engine import handle_user_message, handle_user_message_stream
+from SmartBudgetAI.llm_client import OllamaClient, llm_deadline, remaining_budget
+from SmartBudgetAI.speculation import Speculation
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+PERSONA = "lol idk man " * 20
+
+
+def _parts(closed, n=5, delay=0.0, fail_at=None):
+    try:
+        for i in range(n):
+            if i == fail_at:
+                raise ValueError("boom")
+            time.sleep(delay)
+            yield f"{i} "
+    finally:
+        closed.set()
+
+
+def test_yields_parts_and_errors_in_order():
+    closed = threading.Event()
+    assert list(Speculation(_parts, closed)) == ["0 ", "1 ", "2 ", "3 ", "4 "]
+    assert closed.is_set()
+
+    parts = iter(Speculation(lambda: _parts(threading.Event(), fail_at=2)))
+    assert [next(parts), next(parts)] == ["0 ", "1 "]
+    with pytest.raises(ValueError):
+        next(parts)
+
+
+def test_cancel_closes_the_generator_and_keeps_the_deadline():
+    closed = threading.Event()
+    with llm_deadline(time.monotonic() + 30):
+        speculation = Speculation(lambda: [remaining_budget()])
+    assert 29 < list(speculation)[0] <= 30
+
+    speculation = Speculation(lambda: _parts(closed, n=1000, delay=0.01))
+    time.sleep(0.05)
+    speculation.cancel()
+    speculation.wait(timeout=1)
+    assert closed.is_set()
+
+
+def _reply(parse_intent):
+    def reply(payload):
+        if "financial parser" in payload["messages"][0]["content"]:
+            return f'{{"intent": "{parse_intent}", "entity": "John", "amount": 50}}'
+        return PERSONA
+    return reply
+
+
+@pytest.fixture
+def speculative(monkeypatch, tmp_path):
+    monkeypatch.setattr(chat_engine, "SPECULATIVE_PERSONA", True)
+    monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+
+    def serve(parse_intent, **timing):
+        fake = FakeOllama(reply=_reply(parse_intent), parallel=2, **timing).start()
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=fake.url))
+        return fake
+
+    servers = []
+    yield lambda *args, **kwargs: servers.append(serve(*args, **kwargs)) or servers[-1]
+    for fake in servers:
+        fake.stop()
+
+
+def test_party_turn_overlaps_parse_and_persona(speculative):
+    server = speculative("clarify", latency=0.3)
+
+    start = time.perf_counter()
+    reply = handle_user_message("tell me a joke", user_id=1)
+    elapsed = time.perf_counter() - start
+
+    assert reply == PERSONA
+    assert server.max_in_flight == 2
+    assert elapsed < 0.5  # one round trip, not two (~0.6 s)
+    assert "".join(handle_user_message_stream("any tips for saving?", user_id=1)) == PERSONA
+
+
+def test_money_turn_cancels_the_persona(speculative):
+    server = speculative("loan_given", latency=0.1, token_latency=0.05)
+
+    reply = handle_user_message("put 50 on john's tab", user_id=1)
+    assert reply == "Do you want to record that you lend John $50?"
+
+    # The 80-token persona stream (~4 s) is dropped at its next token
+    deadline = time.monotonic() + 1
+    while server.in_flight and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert server.in_flight == 0
+    assert sorted(p["stream"] for p in server.requests) == [False, True]
@@ -0,0 +1,63 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from SmartBudgetAI import db, llm_client, llm_fallback
+from SmartBudgetAI.api.main import app
+from SmartBudgetAI.chat_engine import handle_user_message, handle_user_message_stream
+from SmartBudgetAI.llm_client import OllamaClient
+from SmartBudgetAI.tests.fake_ollama import FakeOllama
+
+PERSONA = "yo what's good? 💸 nothing much here"
+
+
+def _reply(payload):
+    if "financial parser" in payload["messages"][0]["content"]:
+        return '{"intent": "clarify"}'
+    return PERSONA
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    with FakeOllama(reply=_reply) as fake:
+        monkeypatch.setattr(llm_client, "_CLIENT", OllamaClient(url=fake.url))
+        monkeypatch.setattr(llm_fallback, "TRAINING_FILE", str(tmp_path / "none.jsonl"))
+        yield fake
+
+
+def test_client_yields_tokens(server):
+    tokens = list(llm_client.get_client().chat_stream("m", [{"role": "user", "content": "hi"}]))
+    assert len(tokens) == 7
+    assert "".join(tokens) == PERSONA
+    assert server.requests[-1]["stream"] is True
+
+
+def test_reminder_header_comes_before_any_llm_call(server):
+    db.add_reminder(1, "pay rent", "2026-01-01T08:00:00", created_at="2025-12-30T08:00:00")
+
+    parts = handle_user_message_stream("tell me a joke", user_id=1)
+    header = next(parts)
+    assert "pay rent" in header and header.endswith("---\n")
+    assert server.requests == []
+
+    assert "".join(parts) == PERSONA
+
+
+def test_stream_and_plain_replies_match(server):
+    turns = ["Lent John 50", "tell me a joke", "yes", "any tips for saving?"]
+    plain = [handle_user_message(t, user_id=1) for t in turns]
+
+    streamed = ["".join(handle_user_message_stream(t, user_id=2)) for t in turns]
+    assert streamed == plain
+    assert plain[1].startswith(PERSONA) and "still pending" in plain[1]
+
+
+def test_sse_endpoint(server):
+    with TestClient(app) as client:
+        with client.stream("POST", "/chat/stream", json={"user_id": 3, "message": "tell me a joke"}) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = [line for line in response.iter_lines() if line]
+
+    assert events[-2:] == ["event: done", "data: {}"]
+    deltas = [json.loads(line[len("data: "):])["delta"] for line in events[:-2]]
+    assert len(deltas) > 1
+    assert "".join(deltas) == PERSONA
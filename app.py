@@ -1,6 +1,6 @@
 import streamlit as st
 import time
-from SmartBudgetAI.chat_engine import handle_user_message
+from SmartBudgetAI.chat_engine import handle_user_message_stream
 
 # Page Config
 st.set_page_config(
@@ -44,18 +44,17 @@ if prompt := st.chat_input("Type a message (e.g., 'Lent John 50' or 'Spot Alex 2
     st.chat_message("user").write(prompt)
     st.session_state.messages.append({"role": "user", "content": prompt})
 
-    # 2. Get Bot Response (The Backend Logic)
-    # We show a spinner because the LLM fallback might take ~10-20s
-    with st.spinner("Thinking..."):
-        response = handle_user_message(prompt, user_id=USER_ID)
-    
-    if response is None:
-        response = "⚠️ Error: The bot returned nothing. Please check chat_engine.py."
-    
-
-    # 3. Show Bot Response
+    # 2. Get Bot Response (The Backend Logic), streamed as it's generated.
+    # Reminders and fixed text show up instantly; persona replies arrive
+    # token by token instead of after the whole ~10-20s generation.
     with st.chat_message("assistant"):
-        st.markdown(response)
+        response = st.write_stream(handle_user_message_stream(prompt, user_id=USER_ID))
+
+        if not response:
+            response = "⚠️ Error: The bot returned nothing. Please check chat_engine.py."
+            st.markdown(response)
+
+    # 3. Remember Bot Response
     st.session_state.messages.append({"role": "assistant", "content": response})
 
     # 4. Notification Logic (The Pop-up)